@@ -0,0 +1,145 @@
+"""
+Benchmark of the shared Biome stream reading of scripts/biome_streams.py.
+
+Writes a synthetic set of Biome streams in SEGB v2 files, then reads them the way the biome
+artifacts did, each file with the ccl_segb2 stream reader and blackboxprotobuf, and with
+get_biome_records. Prints the time of each and checks that they returned the same records.
+
+Usage: python admin/scripts/benchmark_biome_streams.py [number of records, default 100000]
+"""
+
+import glob
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from datetime import timezone
+
+# Get the root directory of the repository (2 directories above the script location)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+import blackboxprotobuf
+
+from scripts import biome_streams
+from scripts.ccl_segb import ccl_segb2
+from scripts.ccl_segb.ccl_segb_common import EntryState
+
+STREAMS = ('_DKEvent.App.InFocus', 'App.InFocus', '_DKEvent.Safari.History', 'NowPlaying', 'Backlight',
+           'Device.Wireless.WiFi', '_DKEvent.Device.BatteryPercentage', 'Notification')
+FILES_PER_STREAM = 10
+COCOA_EPOCH_OFFSET = 978307200
+
+# Typedef of the App.InFocus records of biomeDKInfocus, simplified
+TYPEDEF = {
+    '1': {'type': 'message', 'message_typedef': {
+        '1': {'type': 'str', 'name': ''},
+        '2': {'type': 'message', 'message_typedef': {
+            '1': {'type': 'int', 'name': ''},
+            '2': {'type': 'int', 'name': ''}}, 'name': ''}}, 'name': ''},
+    '2': {'type': 'double', 'name': ''},
+    '3': {'type': 'double', 'name': ''},
+    '4': {'type': 'message', 'message_typedef': {
+        '3': {'type': 'str', 'name': ''}}, 'name': ''},
+    '5': {'type': 'str', 'name': ''},
+    '8': {'type': 'double', 'name': ''},
+    '10': {'type': 'int', 'name': ''}}
+
+def get_encoding_typedef(typedef):
+    '''blackboxprotobuf encodes the str fields as bytes fields'''
+    encoding_typedef = {}
+    for field_number, field_type in typedef.items():
+        field_type = dict(field_type)
+        if field_type['type'] == 'str':
+            field_type['type'] = 'bytes'
+        if 'message_typedef' in field_type:
+            field_type['message_typedef'] = get_encoding_typedef(field_type['message_typedef'])
+        encoding_typedef[field_number] = field_type
+    return encoding_typedef
+
+ENCODING_TYPEDEF = get_encoding_typedef(TYPEDEF)
+
+def generate_message(rnd, index):
+    start = 700000000.0 + index * 10
+    value = {'1': {'1': b'/app/inFocus', '2': {'1': 1, '2': 2}}, '2': start, '3': start + rnd.random() * 600,
+             '4': {'3': rnd.choice((b'com.apple.mobilesafari', b'com.apple.Maps', b'net.whatsapp.WhatsApp'))},
+             '5': f'{rnd.getrandbits(128):032X}'.encode(), '8': start + 1, '10': 1}
+    return blackboxprotobuf.encode_message(value, ENCODING_TYPEDEF)
+
+def write_segb2_file(path, messages, rnd):
+    '''Writes a SEGB v2 file, with one record out of 20 deleted'''
+    entries = bytearray()
+    trailer = []
+    for message in messages:
+        state = EntryState.Deleted if rnd.random() < 0.05 else EntryState.Written
+        entries += struct.pack('<Ii', zlib.crc32(message), 0) + message
+        trailer.append(struct.pack('<2id', len(entries), state, rnd.uniform(700000000.0, 800000000.0)))
+        entries += b'\x00' * (-len(entries) % 4)
+    with open(path, 'wb') as segb_file:
+        segb_file.write(struct.pack('<4sid16s', ccl_segb2.MAGIC, len(messages), 700000000.0, b'\x00' * 16))
+        segb_file.write(entries)
+        segb_file.write(b''.join(trailer))
+
+def generate_streams(folder, record_count):
+    rnd = random.Random(0)
+    records_per_file = max(1, record_count // (len(STREAMS) * FILES_PER_STREAM))
+    index = 0
+    for stream in STREAMS:
+        stream_folder = os.path.join(folder, 'Biome', 'streams', 'restricted', stream, 'local')
+        os.makedirs(stream_folder)
+        for file_index in range(FILES_PER_STREAM):
+            messages = [generate_message(rnd, index + i) for i in range(records_per_file)]
+            index += records_per_file
+            write_segb2_file(os.path.join(stream_folder, str(COCOA_EPOCH_OFFSET + file_index)), messages, rnd)
+    return index
+
+def read_streams_former(folder):
+    '''Former reading of the biome artifacts: each artifact globs its stream and decodes each file'''
+    records = []
+    for stream in STREAMS:
+        for file_found in glob.glob(os.path.join(folder, '*', 'streams', 'restricted', stream, 'local', '*')):
+            filename = os.path.basename(file_found)
+            if filename.startswith('.') or 'tombstone' in file_found or not os.path.isfile(file_found):
+                continue
+            for record in ccl_segb2.read_segb2_file(file_found):
+                ts = record.timestamp1.replace(tzinfo=timezone.utc)
+                if record.state == EntryState.Written:
+                    protostuff, types = blackboxprotobuf.decode_message(record.data, TYPEDEF)
+                    records.append((ts, record.state, protostuff, file_found, record.data_start_offset))
+                elif record.state == EntryState.Deleted:
+                    records.append((ts, record.state, None, file_found, record.data_start_offset))
+    return records
+
+def read_streams_shared(folder):
+    records = []
+    for stream in STREAMS:
+        files_found = glob.glob(os.path.join(folder, '*', 'streams', 'restricted', stream, 'local', '*'))
+        stream_records, report_file = biome_streams.get_biome_records(files_found, TYPEDEF)
+        records.extend((record.timestamp, record.state, record.protostuff, record.file_path, record.data_start_offset)
+                       for record in stream_records)
+    return records
+
+def benchmark(read_streams, folder):
+    start = time.perf_counter()
+    records = read_streams(folder)
+    return time.perf_counter() - start, records
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as temp_folder:
+        print(f'Generating {record_count:,} records in {len(STREAMS) * FILES_PER_STREAM} SEGB files...')
+        generate_streams(temp_folder, record_count)
+
+        former_time, former_records = benchmark(read_streams_former, temp_folder)
+        shared_time, shared_records = benchmark(read_streams_shared, temp_folder)
+
+        sort_key = lambda record: (record[3], record[4])
+        same_records = sorted(former_records, key=sort_key) == sorted(shared_records, key=sort_key)
+        print(f'former: {former_time:.2f}s, shared: {shared_time:.2f}s ({former_time / shared_time:.1f}x faster), '
+              f'{len(former_records):,} records, same records: {same_records}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+"""
+Benchmark of the reading of LevelDB databases by scripts/ccl_leveldb.py.
+
+Writes a synthetic LevelDB database of snappy compressed table files and a log file, then iterates
+its records with the former stream based snappy decompression, with the pure Python decompression
+of ccl_simplesnappy, with the native snappy implementation when it is installed and again from the
+block cache. Then looks up keys and prefixes of keys in the database, with a full scan of the
+records and with the index of the table files, and compares the live records of the database with
+the ones found by a full scan. Prints the time of each and checks that they returned the same
+records.
+
+Usage: python admin/scripts/benchmark_leveldb.py [number of records, default 200000]
+"""
+
+import io
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+
+# Get the root directory of the repository (2 directories above the script location)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts import ccl_leveldb, ccl_simplesnappy
+
+RECORDS_PER_FILE = 20000
+BLOCK_SIZE = 4096
+RESTART_INTERVAL = 16
+LOG_BLOCK_SIZE = 32768
+KEY_PREFIX = b'_https://www.example.com\x00\x01'
+LOOKUPS = 100
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+def encode_literal(out, literal):
+    length = len(literal) - 1
+    if length < 60:
+        out.append(length << 2)
+    else:
+        length_bytes = length.to_bytes((length.bit_length() + 7) // 8, 'little')
+        out.append((59 + len(length_bytes)) << 2)
+        out += length_bytes
+    out += literal
+
+def snappy_compress(data):
+    '''Greedy snappy compression, matching 4 bytes sequences with backreferences of 2 bytes offsets'''
+    out = bytearray(encode_varint(len(data)))
+    table = {}
+    pos = literal_start = 0
+    while pos + 4 <= len(data):
+        candidate = table.get(data[pos:pos + 4])
+        table[data[pos:pos + 4]] = pos
+        if candidate is None or pos - candidate >= 0x10000:
+            pos += 1
+            continue
+        length = 4
+        while pos + length < len(data) and length < 64 and data[candidate + length] == data[pos + length]:
+            length += 1
+        if literal_start < pos:
+            encode_literal(out, data[literal_start:pos])
+        out.append(((length - 1) << 2) | ccl_simplesnappy.ElementType.CopyTwoByte)
+        out += struct.pack('<H', pos - candidate)
+        pos += length
+        literal_start = pos
+    if literal_start < len(data):
+        encode_literal(out, data[literal_start:])
+    return bytes(out)
+
+def encode_block(entries):
+    '''Encodes the (key, value) entries of a block, with the keys prefix compressed'''
+    out = bytearray()
+    restarts = []
+    previous_key = b''
+    for index, (key, value) in enumerate(entries):
+        if index % RESTART_INTERVAL == 0:
+            restarts.append(len(out))
+            shared = 0
+        else:
+            shared = len(os.path.commonprefix((previous_key, key)))
+        out += encode_varint(shared) + encode_varint(len(key) - shared) + encode_varint(len(value))
+        out += key[shared:] + value
+        previous_key = key
+    out += b''.join(struct.pack('<I', restart) for restart in restarts or [0])
+    out += struct.pack('<I', len(restarts or [0]))
+    return bytes(out)
+
+def write_table(path, entries):
+    '''Writes a table file of snappy compressed data blocks, its index block is not compressed'''
+    with open(path, 'wb') as table_file:
+        def write_block(block, compressed):
+            offset = table_file.tell()
+            data = snappy_compress(block) if compressed else block
+            table_file.write(data + bytes([1 if compressed else 0]) + b'\x00' * 4)
+            return encode_varint(offset) + encode_varint(len(data))
+
+        index_entries = []
+        block_entries = []
+        block_size = 0
+        for key, value in entries:
+            block_entries.append((key, value))
+            block_size += len(key) + len(value)
+            if block_size >= BLOCK_SIZE:
+                index_entries.append((key, write_block(encode_block(block_entries), True)))
+                block_entries = []
+                block_size = 0
+        if block_entries:
+            index_entries.append((block_entries[-1][0], write_block(encode_block(block_entries), True)))
+        meta_index_handle = write_block(encode_block([]), False)
+        index_handle = write_block(encode_block(index_entries), False)
+        footer = (meta_index_handle + index_handle).ljust(40, b'\x00')
+        table_file.write(footer + struct.pack('<Q', ccl_leveldb.LdbFile.MAGIC))
+
+def write_log(path, batches):
+    '''Writes a log file of write batches of (state, key, value) entries, 1 = live value, 0 = deletion'''
+    with open(path, 'wb') as log_file:
+        for seq, entries in batches:
+            batch = bytearray(struct.pack('<QI', seq, len(entries)))
+            for state, key, value in entries:
+                batch += bytes([state]) + encode_varint(len(key)) + key
+                if state:
+                    batch += encode_varint(len(value)) + value
+            # batches are split in fragments at the end of the log blocks, the end of a block too short for the
+            # header of a fragment is padded
+            first = True
+            while first or batch:
+                block_left = LOG_BLOCK_SIZE - log_file.tell() % LOG_BLOCK_SIZE
+                if block_left < 7:
+                    log_file.write(b'\x00' * block_left)
+                    block_left = LOG_BLOCK_SIZE
+                fragment, batch = batch[:block_left - 7], batch[block_left - 7:]
+                if first:
+                    entry_type = ccl_leveldb.LogEntryType.First if batch else ccl_leveldb.LogEntryType.Full
+                else:
+                    entry_type = ccl_leveldb.LogEntryType.Middle if batch else ccl_leveldb.LogEntryType.Last
+                log_file.write(struct.pack('<IHB', 0, len(fragment), entry_type) + fragment)
+                first = False
+
+def get_user_key(index):
+    return KEY_PREFIX + f'message:{index:09d}'.encode()
+
+def generate_value(rnd, index):
+    return b'\x01{"id": %d, "text": "%s", "read": %s}' % (
+        index, rnd.choice((b'Hello', b'See you tomorrow', b'On my way')) * rnd.randint(1, 4),
+        rnd.choice((b'true', b'false')))
+
+def generate_database(folder, record_count):
+    '''Writes the records in table files of consecutive keys, then updates and deletes one record out of 50 of
+    them in a log file'''
+    rnd = random.Random(0)
+    for file_index, start in enumerate(range(0, record_count, RECORDS_PER_FILE)):
+        entries = []
+        for index in range(start, min(start + RECORDS_PER_FILE, record_count)):
+            # internal key: user key, then the sequence number and the type (1 = live value)
+            key = get_user_key(index) + struct.pack('<Q', ((index + 1) << 8) | 1)
+            entries.append((key, generate_value(rnd, index)))
+        write_table(os.path.join(folder, f'{file_index + 5:06d}.ldb'), entries)
+
+    batches = []
+    seq = record_count + 1
+    for index in rnd.sample(range(record_count), record_count // 50):
+        state = rnd.choice((0, 1))
+        batches.append((seq, [(state, get_user_key(index), generate_value(rnd, index) if state else b'')]))
+        seq += 1
+    write_log(os.path.join(folder, f'{file_index + 6:06d}.log'), batches)
+
+def read_records(folder):
+    with ccl_leveldb.RawLevelDb(folder) as db:
+        return [(record.key, record.value, record.seq) for record in db.iterate_records_raw()]
+
+def benchmark(folder):
+    ccl_leveldb.block_cache = ccl_leveldb.BlockCache(ccl_leveldb.BLOCK_CACHE_SIZE)
+    start = time.perf_counter()
+    records = read_records(folder)
+    return time.perf_counter() - start, records
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as temp_folder:
+        print(f'Generating {record_count:,} records in {-(-record_count // RECORDS_PER_FILE)} table files...')
+        generate_database(temp_folder, record_count)
+
+        native_snappy = ccl_simplesnappy.native_snappy
+        decompress_bytes = ccl_simplesnappy.decompress_bytes
+        try:
+            ccl_simplesnappy.decompress_bytes = lambda data: ccl_simplesnappy.decompress_stream(io.BytesIO(data))
+            former_time, former_records = benchmark(temp_folder)
+            ccl_simplesnappy.decompress_bytes = decompress_bytes
+            ccl_simplesnappy.native_snappy = None
+            python_time, python_records = benchmark(temp_folder)
+        finally:
+            ccl_simplesnappy.decompress_bytes = decompress_bytes
+            ccl_simplesnappy.native_snappy = native_snappy
+        results = f'former: {former_time:.2f}s, pure Python: {python_time:.2f}s ' \
+                  f'({former_time / python_time:.1f}x faster)'
+        same_records = former_records == python_records
+        if native_snappy is not None:
+            native_time, native_records = benchmark(temp_folder)
+            results += f', native: {native_time:.2f}s ({former_time / native_time:.1f}x faster)'
+            same_records = same_records and native_records == former_records
+
+        # Records read twice from the same open database, the second time from the block cache
+        ccl_leveldb.block_cache = ccl_leveldb.BlockCache(ccl_leveldb.BLOCK_CACHE_SIZE)
+        with ccl_leveldb.RawLevelDb(temp_folder) as db:
+            first_records = [(record.key, record.value, record.seq) for record in db.iterate_records_raw()]
+            start = time.perf_counter()
+            cached_records = [(record.key, record.value, record.seq) for record in db.iterate_records_raw()]
+            cached_time = time.perf_counter() - start
+        same_records = same_records and first_records == cached_records == former_records
+        print(f'{results}, from the block cache: {cached_time:.2f}s, {len(former_records):,} records, '
+              f'same records: {same_records}')
+
+        benchmark_lookups(temp_folder, record_count)
+
+def get_records(records):
+    return [(record.key, record.value, record.seq, record.state) for record in records]
+
+def benchmark_lookups(folder, record_count):
+    rnd = random.Random(1)
+    user_keys = [get_user_key(rnd.randrange(record_count)) for index in range(LOOKUPS)]
+    # prefixes of about 100 keys
+    prefixes = [get_user_key(rnd.randrange(record_count))[:-2] for index in range(LOOKUPS)]
+
+    ccl_leveldb.block_cache = ccl_leveldb.BlockCache(ccl_leveldb.BLOCK_CACHE_SIZE)
+    start = time.perf_counter()
+    with ccl_leveldb.RawLevelDb(folder) as db:
+        scanned_records = [get_records(record for record in db.iterate_records_raw() if record.user_key == user_key)
+                           for user_key in user_keys[:3]]
+    scan_time = (time.perf_counter() - start) / 3
+
+    ccl_leveldb.block_cache = ccl_leveldb.BlockCache(ccl_leveldb.BLOCK_CACHE_SIZE)
+    start = time.perf_counter()
+    with ccl_leveldb.RawLevelDb(folder) as db:
+        looked_up_records = [get_records(db.get_records_raw(user_key)) for user_key in user_keys]
+        lookup_time = (time.perf_counter() - start) / LOOKUPS
+        prefix_records = [get_records(db.iterate_records_raw_by_prefix(prefix)) for prefix in prefixes]
+        scanned_prefix_records = [get_records(record for record in db.iterate_records_raw()
+                                              if record.user_key.startswith(prefix)) for prefix in prefixes[:3]]
+
+        start = time.perf_counter()
+        live_records = get_records(db.iterate_live_records())
+        live_time = time.perf_counter() - start
+        newest_records = {}
+        for record in db.iterate_records_raw():
+            if record.user_key not in newest_records or newest_records[record.user_key].seq < record.seq:
+                newest_records[record.user_key] = record
+        scanned_live_records = get_records(sorted(
+            (record for record in newest_records.values() if record.state != ccl_leveldb.KeyState.Deleted),
+            key=lambda record: record.user_key))
+
+    same_records = looked_up_records[:3] == scanned_records and prefix_records[:3] == scanned_prefix_records \
+        and live_records == scanned_live_records
+    print(f'key lookup: full scan: {scan_time * 1000:.0f}ms, with the index: {lookup_time * 1000:.1f}ms '
+          f'({scan_time / lookup_time:.0f}x faster), live records: {live_time:.2f}s, '
+          f'{len(live_records):,} live records, same records: {same_records}')
+
+if __name__ == '__main__':
+    main()
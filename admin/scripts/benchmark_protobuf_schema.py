@@ -0,0 +1,50 @@
+"""
+Benchmark of the compiled protobuf decoders of scripts/protobuf_schema.py.
+
+Generates synthetic App.InFocus Biome records, see benchmark_biome_streams.py, and decodes them
+with blackboxprotobuf.decode_message and with protobuf_schema.decode_message, with the full
+typedef of the records, with a typedef of some of their fields only and without typedef. Prints
+the time of each and checks that they returned the same values.
+
+Usage: python admin/scripts/benchmark_protobuf_schema.py [number of records, default 50000]
+"""
+
+import os
+import random
+import sys
+import time
+
+# Get the root directory of the repository (2 directories above the script location)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import blackboxprotobuf
+
+from benchmark_biome_streams import TYPEDEF, generate_message
+from scripts import protobuf_schema
+
+TYPEDEFS = (
+    ('full typedef', TYPEDEF),
+    ('partial typedef', {'2': {'type': 'double', 'name': ''}, '3': {'type': 'double', 'name': ''}}),
+    ('no typedef', None))
+
+def benchmark(decode_message, messages, typedef):
+    start = time.perf_counter()
+    values = [decode_message(message, typedef)[0] for message in messages]
+    return time.perf_counter() - start, values
+
+def main():
+    record_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rnd = random.Random(0)
+    print(f'Generating {record_count:,} records...')
+    messages = [generate_message(rnd, index) for index in range(record_count)]
+
+    for typedef_name, typedef in TYPEDEFS:
+        blackboxprotobuf_time, expected_values = benchmark(blackboxprotobuf.decode_message, messages, typedef)
+        compiled_time, values = benchmark(protobuf_schema.decode_message, messages, typedef)
+        print(f'{typedef_name}: blackboxprotobuf: {blackboxprotobuf_time:.2f}s, compiled: {compiled_time:.2f}s '
+              f'({blackboxprotobuf_time / compiled_time:.1f}x faster), same values: {values == expected_values}')
+
+if __name__ == '__main__':
+    main()
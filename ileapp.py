@@ -1,6 +1,8 @@
 import json
 import argparse
+import concurrent.futures
 import io
+import multiprocessing
 import pytz
 import os.path
 import typing
@@ -10,6 +12,9 @@ import sys
 
 import scripts.plugin_loader as plugin_loader
 
+from scripts.artifact_profiler import ArtifactProfiler, get_resource_usage, get_usage_delta
+from scripts.run_manifest import OutputListing, RunManifest
+
 from shutil import copyfile
 from scripts.search_files import *
 from scripts.ilapfuncs import *
@@ -52,6 +57,13 @@ def validate_args(args):
             raise argparse.ArgumentError(None, f'INPUT path \'{args.input_path}\' is not a file. Type "file" requires a '
                                                f'single file input. Run the program again.')
 
+    if args.workers < 1:
+        raise argparse.ArgumentError(None, 'The number of workers must be at least 1. Run the program again.')
+
+    if args.incremental and not args.custom_output_folder:
+        raise argparse.ArgumentError(None, 'The report folder to update must be set with --custom_output_folder '
+                                           'when using --incremental. Run the program again.')
+
     if args.load_case_data and not os.path.exists(args.load_case_data):
         raise argparse.ArgumentError(None, 'LEAPP Case Data file not found! Run the program again.')
 
@@ -176,13 +188,31 @@ def main():
                         help=("Generate a text file list of artifact paths. "
                               "This argument is meant to be used alone, without any other arguments."))
     parser.add_argument('--custom_output_folder', required=False, action="store", help="Custom name for the output folder")
+    parser.add_argument('--workers', required=False, action="store", type=int, default=1,
+                        help=("Number of worker processes running artifacts in parallel. "
+                              "Default is 1, artifacts are run one after another."))
+    parser.add_argument('--no_listing_cache', required=False, action="store_true",
+                        help=("Build the file listing of the input again instead of loading it from the cache "
+                              "of previous runs, and don't save it in the cache."))
+    parser.add_argument('--parquet', required=False, action="store_true",
+                        help=("Also export the data of all artifacts to Parquet files in the _Parquet Exports folder "
+                              "of the report, with their dates typed. Requires pyarrow."))
+    parser.add_argument('--profile', required=False, action="store_true",
+                        help=("Also run each artifact under cProfile and write its stats to the _Profiles folder "
+                              "of the report, as <module>_<artifact>.pstats files. The time, CPU, memory, I/O "
+                              "and rows of each artifact are always written to _profile.json."))
+    parser.add_argument('--incremental', '--resume', required=False, action="store_true",
+                        help=("Update the report of a previous run in --custom_output_folder: only the artifacts "
+                              "whose module or input files changed since that run are run again, the outputs "
+                              "of the others are kept. An interrupted run is resumed after the last artifact "
+                              "it completed. See _run_manifest.json in the report folder."))
 
     available_plugins = []
     loader = plugin_loader.PluginLoader()
     for plugin in sorted(loader.plugins, key=lambda p: p.category):
         if (plugin.module_name == 'iTunesBackupInfo'
-                or plugin.name == 'lastBuild'
-                or plugin.module_name == 'logarchive' and plugin.name != 'logarchive'):
+                or loader.provides_common_dependency(plugin)
+                or plugin.is_derived):
             continue
         else:
             available_plugins.append(plugin)
@@ -311,17 +341,171 @@ def main():
         if input_path[1] == ':' and extracttype =='fs': input_path = '\\\\?\\' + input_path.replace('/', '\\')
         if output_path[1] == ':': output_path = '\\\\?\\' + output_path.replace('/', '\\')
 
-    out_params = OutputParameters(output_path, custom_output_folder)
+    incremental = args.incremental and os.path.isdir(os.path.join(output_path, custom_output_folder))
+    out_params = OutputParameters(output_path, custom_output_folder, incremental)
+
+    if args.parquet:
+        enable_parquet_export()
 
     initialize_lava(input_path, out_params.report_folder_base, extracttype)
 
-    crunch_artifacts(selected_plugins, extracttype, input_path, out_params, wrap_text, loader, casedata, time_offset, profile_filename)
+    crunch_artifacts(selected_plugins, extracttype, input_path, out_params, wrap_text, loader, casedata, time_offset, profile_filename, args.workers,
+                     not args.no_listing_cache, args.profile, incremental)
 
     lava_finalize_output(out_params.report_folder_base)
 
+# Seeker and plugins used by the worker processes. Set before the process pool is created so
+# that the forked workers inherit them.
+worker_state = {}
+
+def create_worker_pool(workers, seeker, loader, profiler, report_folder_base):
+    '''Returns a process pool to run artifacts in, or None if fork is not available'''
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        logfunc('Worker processes are not supported on this platform, artifacts will be run one after another.')
+        return None
+    worker_state['seeker'] = seeker
+    worker_state['loader'] = loader
+    worker_state['profiler'] = profiler
+    worker_state['listing'] = OutputListing(report_folder_base)
+    logfunc(f'Starting {workers} worker processes')
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                                  initializer=init_worker)
+
+def init_worker():
+    '''Reopens the archive read by the seeker in each worker process. The handles inherited from
+       the main process share their file offset with it and with the other workers, so artifacts
+       searching files while others are extracted would read the archive at the wrong offset.'''
+    worker_state['seeker'].reopen()
+
+def can_run_in_worker(plugin, loader):
+    '''Artifacts can run in a worker process when their output is written by artifact_processor
+       and they don't use the LAVA db, either to check in media or as their source file. Artifacts
+       providing common dependencies, like the iOS version, must run in this process.'''
+    if (not hasattr(plugin.method, 'run_artifact') or plugin.search is None
+            or loader.provides_common_dependency(plugin)):
+        return False
+    module_globals = plugin.method.__wrapped__.__globals__
+    return 'check_in_media' not in module_globals and 'check_in_embedded_media' not in module_globals
+
+def run_artifact_in_worker(plugin_name, files_found, report_folder, wrap_text, time_offset):
+    '''Collects the data of an artifact in a worker process. Returns the data, the error and
+       its traceback if the artifact failed, the device info found by the artifact, the
+       resources used by the worker to run it and the files it wrote in its report folder'''
+    identifiers.clear()
+    plugin = worker_state['loader'][plugin_name]
+    listing = worker_state['listing']
+    output_folder = os.path.relpath(report_folder, listing.report_folder_base)
+    files_before = listing.get_files(output_folder)
+
+    def collect_data():
+        data_headers, data_list, source_path = plugin.method.run_artifact(
+            files_found, report_folder, worker_state['seeker'], wrap_text, time_offset)
+        if not isinstance(data_list, (list, tuple)):
+            # Rows yielded by the artifact are collected here to be sent to this main process
+            data_list = list(data_list)
+        return data_headers, data_list, source_path
+
+    start = get_resource_usage()
+    try:
+        result = worker_state['profiler'].profile_call(plugin, collect_data)
+        error = None
+    except Exception as ex:
+        result = None
+        error = (str(ex), traceback.format_exc())
+    # Worker processes do not close their logs, a message still repeated by the artifact is counted here
+    flush_logs()
+    written_files = sorted(listing.get_files(output_folder) - files_before)
+    return result, error, dict(identifiers), get_usage_delta(start, get_resource_usage()), written_files
+
+def log_artifact_error(plugin_name, error, traceback_text):
+    logfunc('Reading {} artifact had errors!'.format(plugin_name), LOG_ERROR)
+    logfunc('Error was {}'.format(error), LOG_ERROR)
+    logfunc('Exception Traceback: {}'.format(traceback_text), LOG_ERROR)
+
+def run_plugin(plugin, files_found, category_folder, seeker, wrap_text, time_offset, profiler, manifest):
+    '''Runs an artifact in this process. Returns True if it produced data, artifacts not using
+       artifact_processor are assumed to have produced data.'''
+    manifest.start_outputs(plugin, files_found, seeker)
+    start = get_resource_usage()
+    try:
+        if hasattr(plugin.method, 'run_artifact'):
+            result = profiler.profile_call(plugin, plugin.method.run_artifact,
+                                           files_found, category_folder, seeker, wrap_text, time_offset)
+            record_count = profiler.profile_call(plugin, plugin.method.write_output, category_folder, *result)
+        else:
+            profiler.profile_call(plugin, plugin.method, files_found, category_folder, seeker, wrap_text, time_offset)
+            record_count = None
+    except Exception as ex:
+        profiler.add_usage(plugin, get_usage_delta(start, get_resource_usage()))
+        profiler.set_status(plugin, 'error')
+        log_artifact_error(plugin.name, str(ex), traceback.format_exc())
+        manifest.add_outputs(plugin, 'error', False)
+        return False
+    profiler.add_usage(plugin, get_usage_delta(start, get_resource_usage()))
+    # The time spent writing each output type is only known for artifacts using artifact_processor
+    profiler.add_output(plugin, record_count, output_times if record_count is not None else {})
+    manifest.add_outputs(plugin, 'completed', record_count != 0)
+    logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+    return record_count != 0
+
+def write_worker_results(pending, scheduler, seeker, wrap_text, time_offset, profiler, manifest, return_when=None):
+    '''Writes the output of the artifacts completed by the worker processes. HTML, TSV, timeline
+       and LAVA outputs, device info and icons are all written by this (main) process.
+       Doesn't wait for the workers unless return_when is FIRST_COMPLETED or ALL_COMPLETED.'''
+    if return_when is None:
+        done, _ = concurrent.futures.wait(pending, timeout=0)
+    else:
+        done, _ = concurrent.futures.wait(pending, return_when=return_when)
+    for future in sorted(done, key=lambda future: pending[future][0]):
+        _, plugin, files_found, category_folder = pending.pop(future)
+        manifest.end_worker_outputs(category_folder)
+        try:
+            result, error, device_identifiers, usage, written_files = future.result()
+        except Exception as ex:
+            # The worker died or its data could not be sent back, run the artifact here instead
+            logfunc(f'{plugin.name} [{plugin.module_name}] could not be run in a worker process ({ex}), running it again')
+            scheduler.complete(plugin, run_plugin(plugin, files_found, category_folder, seeker, wrap_text, time_offset,
+                                                  profiler, manifest))
+            continue
+        manifest.start_outputs(plugin, files_found, seeker)
+        merge_device_info(device_identifiers)
+        profiler.add_usage(plugin, usage, 'worker')
+        if error:
+            log_artifact_error(plugin.name, *error)
+            profiler.set_status(plugin, 'error')
+            manifest.add_outputs(plugin, 'error', False, written_files)
+            scheduler.complete(plugin, False)
+            continue
+        try:
+            record_count = profiler.profile_call(plugin, plugin.method.write_output, category_folder, *result)
+        except Exception as ex:
+            log_artifact_error(plugin.name, str(ex), traceback.format_exc())
+            profiler.set_status(plugin, 'error')
+            manifest.add_outputs(plugin, 'error', False, written_files)
+            scheduler.complete(plugin, False)
+            continue
+        profiler.add_output(plugin, record_count, output_times)
+        manifest.add_outputs(plugin, 'completed', record_count > 0, written_files)
+        logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+        scheduler.complete(plugin, record_count > 0)
+
+def get_category_folder(plugin, out_params):
+    '''Returns the folder the report pages of an artifact are written in'''
+    return os.path.join(out_params.report_folder_base, '_HTML', plugin.category)
+
+def get_search_regexes(plugin):
+    '''Returns the list of search patterns of a plugin or None if it has no paths'''
+    if isinstance(plugin.search, list) or isinstance(plugin.search, tuple):
+        return plugin.search
+    elif plugin.search is None:
+        return plugin.search
+    else:
+        return [plugin.search]
+
 def crunch_artifacts(
         plugins: typing.Sequence[plugin_loader.PluginSpec], extracttype, input_path, out_params, wrap_text,
-        loader: plugin_loader.PluginLoader, casedata, time_offset, profile_filename):
+        loader: plugin_loader.PluginLoader, casedata, time_offset, profile_filename, workers=1,
+        use_listing_cache=True, profile_artifacts=False, incremental=False):
     start = process_time()
     start_wall = perf_counter()
  
@@ -335,21 +519,23 @@ def crunch_artifacts(
     logdevinfo()
     
     seeker = None
+    # File listings are kept across runs, except for single files which have nothing to list
+    listing_cache = FileListingCache() if use_listing_cache and extracttype in ('fs', 'tar', 'gz', 'itunes') else None
     try:
         if extracttype == 'fs':
-            seeker = FileSeekerDir(input_path, out_params.data_folder)
+            seeker = FileSeekerDir(input_path, out_params.data_folder, listing_cache)
 
         elif extracttype == 'file':
             seeker = FileSeekerFile(input_path, out_params.data_folder)
             
         elif extracttype in ('tar', 'gz'):
-            seeker = FileSeekerTar(input_path, out_params.data_folder)
+            seeker = FileSeekerTar(input_path, out_params.data_folder, listing_cache)
 
         elif extracttype == 'zip':
             seeker = FileSeekerZip(input_path, out_params.data_folder)
 
         elif extracttype == 'itunes':
-            seeker = FileSeekerItunes(input_path, out_params.data_folder)
+            seeker = FileSeekerItunes(input_path, out_params.data_folder, listing_cache)
 
         else:
             logfunc('Error on argument -o (input type)')
@@ -366,6 +552,8 @@ def crunch_artifacts(
     # add lastBuild at the start except for iTunes backups
     if extracttype != 'itunes':
         plugins.insert(0, loader["lastBuild"])
+    # add the artifacts deriving their data from the selected ones, e.g. from the logarchive table
+    plugins = loader.with_derived_plugins(plugins)
 
     logfunc(f'Info: {len(loader) - 2} modules loaded.') # excluding lastbuild and iTunesBackupInfo
     if profile_filename:
@@ -380,6 +568,11 @@ def crunch_artifacts(
     
     parsed_modules = 0
     lava_only = False
+    # Artifacts run and their outputs, with --incremental those of the previous run are reused
+    manifest = RunManifest(out_params.report_folder_base,
+                           {'ileapp_version': ileapp_version, 'input_path': input_path, 'extraction_type': extracttype,
+                            'timezone': time_offset, 'wrap_text': wrap_text},
+                           incremental)
     # Special processing for iTunesBackup Info.plist as it is a seperate entity, not part of the Manifest.db. Seeker won't find it
     if extracttype == 'itunes':
         info_plist_path = os.path.join(input_path, 'Info.plist')
@@ -393,7 +586,10 @@ def crunch_artifacts(
                 except (FileExistsError, FileNotFoundError) as ex:
                     logfunc('Error creating report directory at path {}'.format(report_folder))
                     logfunc('Error was {}'.format(str(ex)))
+            manifest.remove_outputs("iTunesBackupInfo")
+            manifest.start_outputs(loader["iTunesBackupInfo"], [info_plist_path], seeker)
             loader["iTunesBackupInfo"].method([info_plist_path], report_folder, seeker, wrap_text, time_offset)
+            manifest.add_outputs(loader["iTunesBackupInfo"], 'completed', True)
             report_folder = os.path.join(out_params.report_folder_base, '_HTML', 'Installed Apps')
             if not os.path.exists(report_folder):
                 try:
@@ -401,86 +597,156 @@ def crunch_artifacts(
                 except (FileExistsError, FileNotFoundError) as ex:
                     logfunc('Error creating report directory at path {}'.format(report_folder))
                     logfunc('Error was {}'.format(str(ex)))
+            manifest.remove_outputs("iTunesBackupInstalledApplications")
+            manifest.start_outputs(loader["iTunesBackupInstalledApplications"], [info_plist_path], seeker)
             loader["iTunesBackupInstalledApplications"].method([info_plist_path], report_folder, seeker, wrap_text, time_offset)
+            manifest.add_outputs(loader["iTunesBackupInstalledApplications"], 'completed', True)
             #del search_list['lastBuild'] # removing lastBuild as this takes its place
             print([info_plist_path])  # TODO Remove special consideration for itunes? Merge into main search
         else:
             logfunc('Info.plist not found for iTunes Backup!')
             log.write('Info.plist not found for iTunes Backup!')
 
-    # Search for the files per the arguments
-    for plugin_number, plugin in enumerate(plugins, start=1):
-        logfunc()
-        logfunc('[{}/{}] {} [{}] artifact started'.format(plugin_number, len(plugins),
-                                                              plugin.name, plugin.module_name))
-        output_types = plugin.artifact_info.get('output_types', '')
-        if isinstance(plugin.search, list) or isinstance(plugin.search, tuple):
-            search_regexes = plugin.search
-        elif plugin.search is None:
-            search_regexes = plugin.search
-        else:
-            search_regexes = [plugin.search]
-        parsed_modules += 1
-        GuiWindow.SetProgressBar(parsed_modules, len(plugins))
-        files_found = []
-        log.write(f'<b>For {plugin.name} module</b>')
-        if search_regexes is None:
-            log.write(f'<ul><li>No search regexes provided for {plugin.name} module.')
-            log.write("<ul><li><i>'_lava_artifacts.db'</i> used as source file.</li></ul></li></ul>")
-            files_found = [os.path.join(out_params.report_folder_base, '_lava_artifacts.db')]
-        else:
-            for artifact_search_regex in search_regexes:
-                found = seeker.search(artifact_search_regex)
-                if not found:
-                    if plugin.name == 'logarchive' and extracttype != 'fs' and extracttype != 'file':
-                        src = os.path.join(os.path.dirname(input_path), "logarchive.json")
-                        dst = os.path.join(out_params.data_folder, "logarchive.json")
-                        if os.path.exists(src):
-                            copyfile(src, dst)
-                            files_found.append(dst)
-                    log.write(f'<ul><li>No file found for regex <i>{artifact_search_regex}</i></li></ul>')
-                else:
-                    log.write(f'<ul><li>{len(found)} {"files" if len(found) > 1 else "file"} for regex <i>{artifact_search_regex}</i> located at:')
-                    for pathh in found:
-                        if pathh.startswith('\\\\?\\'):
-                            pathh = pathh[4:]
-                        log.write(f'<ul><li>{pathh}</li></ul>')
-                    log.write(f'</li></ul>')
-                    files_found.extend(found)
-        if files_found:
+    # Resolve the search patterns of all the selected artifacts at once, so that the seeker
+    # extracts the matched files in a single pass. The searches below are then cache hits.
+    logfunc('Resolving search patterns for all artifacts...')
+    seeker.search_many([search_regex for plugin in plugins for search_regex in get_search_regexes(plugin) or []])
+    logfunc('Search patterns resolved')
+
+    # Resources used by each artifact, and with --profile their cProfile stats
+    profiler = ArtifactProfiler(out_params.report_folder_base,
+                                os.path.join(out_params.report_folder_base, '_Profiles') if profile_artifacts else None)
+    executor = None
+    pending = {}  # future -> (plugin_number, plugin, files_found, category_folder) for artifacts run in workers
+    scheduler = plugin_loader.PluginScheduler(plugins, loader)
+    plugin_number = 0
+    # One artifact at a time writes in a category folder, so that the files written in it by an
+    # artifact run in a worker are known. Ready artifacts whose category folder is in use by a
+    # worker are deferred, the other ready artifacts are run meanwhile.
+    deferred = []
+
+    # Run the artifacts as soon as the artifacts they depend on are completed
+    while scheduler:
+        busy_folders = {pending_folder for *_, pending_folder in pending.values()}
+        ready = deferred + scheduler.ready()
+        deferred = [plugin for plugin in ready if get_category_folder(plugin, out_params) in busy_folders]
+        ready = [plugin for plugin in ready if plugin not in deferred]
+        if not ready:
+            if not pending:
+                break
+            # The remaining artifacts depend on artifacts still running in workers
+            write_worker_results(pending, scheduler, seeker, wrap_text, time_offset, profiler, manifest,
+                                 concurrent.futures.FIRST_COMPLETED)
+            continue
+
+        for plugin in ready:
+            category_folder = get_category_folder(plugin, out_params)
+            if any(pending_folder == category_folder for *_, pending_folder in pending.values()):
+                # Another artifact of this category was just sent to a worker
+                deferred.append(plugin)
+                continue
+            plugin_number += 1
+            logfunc()
+            logfunc('[{}/{}] {} [{}] artifact started'.format(plugin_number, len(plugins),
+                                                                  plugin.name, plugin.module_name))
+            output_types = plugin.artifact_info.get('output_types', '')
+            search_regexes = get_search_regexes(plugin)
+            parsed_modules += 1
+            GuiWindow.SetProgressBar(parsed_modules, len(plugins))
+            if not scheduler.has_input(plugin):
+                logfunc('No data found by the artifacts it depends on, artifact skipped')
+                log.write(f'<b>For {plugin.name} module</b>')
+                log.write(f'<ul><li>Skipped, no data found by {", ".join(plugin.depends_on)}.</li></ul>')
+                profiler.set_status(plugin, 'skipped')
+                manifest.remove_outputs(plugin.name)
+                scheduler.complete(plugin, False)
+                continue
+            files_found = []
+            search_start = perf_counter()
+            log.write(f'<b>For {plugin.name} module</b>')
+            if search_regexes is None:
+                log.write(f'<ul><li>No search regexes provided for {plugin.name} module.')
+                log.write("<ul><li><i>'_lava_artifacts.db'</i> used as source file.</li></ul></li></ul>")
+                files_found = [os.path.join(out_params.report_folder_base, '_lava_artifacts.db')]
+            else:
+                for artifact_search_regex in search_regexes:
+                    found = seeker.search(artifact_search_regex)
+                    if not found:
+                        if plugin.name == 'logarchive' and extracttype != 'fs' and extracttype != 'file':
+                            src = os.path.join(os.path.dirname(input_path), "logarchive.json")
+                            dst = os.path.join(out_params.data_folder, "logarchive.json")
+                            if os.path.exists(src):
+                                copyfile(src, dst)
+                                files_found.append(dst)
+                        log.write(f'<ul><li>No file found for regex <i>{artifact_search_regex}</i></li></ul>')
+                    else:
+                        log.write(f'<ul><li>{len(found)} {"files" if len(found) > 1 else "file"} for regex <i>{artifact_search_regex}</i> located at:')
+                        for pathh in found:
+                            if pathh.startswith('\\\\?\\'):
+                                pathh = pathh[4:]
+                            log.write(f'<ul><li>{pathh}</li></ul>')
+                        log.write(f'</li></ul>')
+                        files_found.extend(found)
+            profiler.add_search(plugin, files_found, perf_counter() - search_start)
+            if not files_found:
+                profiler.set_status(plugin, 'no file found')
+                manifest.remove_outputs(plugin.name)
+                logfunc(f"No file found")
+                logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+                scheduler.complete(plugin, False)
+                continue
             if not lava_only and 'lava_only' in output_types:
                 lava_only = True
-            category_folder = os.path.join(out_params.report_folder_base, '_HTML', plugin.category)
+            previous_run = manifest.get_reusable(plugin, files_found, seeker, loader)
+            if previous_run:
+                manifest.reuse(plugin, previous_run)
+                profiler.set_status(plugin, 'reused')
+                logfunc('Module and input files unchanged since the previous run, its output is kept')
+                scheduler.complete(plugin, previous_run['produced_data'])
+                continue
+            manifest.remove_outputs(plugin.name)
             if not os.path.exists(category_folder):
                 try:
                     os.makedirs(category_folder)
                 except (FileExistsError, FileNotFoundError) as ex:
                     logfunc('Error creating {} report directory at path {}'.format(plugin.name, category_folder))
                     logfunc('Error was {}'.format(str(ex)))
+                    scheduler.complete(plugin, False)
                     continue  # cannot do work
-            try:
-                plugin.method(files_found, category_folder, seeker, wrap_text, time_offset)
-                if plugin.name == 'logarchive':
-                    lava_db_path = os.path.join(out_params.report_folder_base, '_lava_artifacts.db')
-                    if does_table_exist_in_db(lava_db_path, 'logarchive'):
-                        loader["logarchive_artifacts"].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
-                    if does_table_exist_in_db(lava_db_path, 'logarchive_artifacts'):
-                        unifed_logs_artifacts = []
-                        unifed_logs_artifacts = [plugin.name for plugin in loader.plugins
-                                                 if plugin.module_name=='logarchive'
-                                                 and plugin.name != 'logarchive'
-                                                 and plugin.name != 'logarchive_artifacts']
-                        for unifed_log_artifact in unifed_logs_artifacts:
-                            loader[unifed_log_artifact].method([lava_db_path], category_folder, seeker, wrap_text, time_offset)
-            except Exception as ex:
-                logfunc('Reading {} artifact had errors!'.format(plugin.name))
-                logfunc('Error was {}'.format(str(ex)))
-                logfunc('Exception Traceback: {}'.format(traceback.format_exc()))
-                continue  # nope
-        else:
-            logfunc(f"No file found")
-        logfunc('{} [{}] artifact completed'.format(plugin.name, plugin.module_name))
+            if workers > 1 and can_run_in_worker(plugin, loader):
+                if executor is None:
+                    executor = create_worker_pool(workers, seeker, loader, profiler, out_params.report_folder_base)
+                    if executor is None:
+                        workers = 1
+                if executor:
+                    future = executor.submit(run_artifact_in_worker, plugin.name, files_found, category_folder,
+                                             wrap_text, time_offset)
+                    pending[future] = (plugin_number, plugin, files_found, category_folder)
+                    manifest.start_worker_outputs(category_folder)
+                    continue  # completion is logged once its output is written
+            if pending and search_regexes is None and not plugin.depends_on:
+                # This artifact reads the LAVA db without declaring what it needs from it, all the
+                # artifacts still running in workers must be written first
+                write_worker_results(pending, scheduler, seeker, wrap_text, time_offset, profiler, manifest,
+                                     concurrent.futures.ALL_COMPLETED)
+            if search_regexes is None:
+                # The LAVA db is read through another connection, it must see all the data written so far
+                lava_commit()
+            scheduler.complete(plugin, run_plugin(plugin, files_found, category_folder, seeker, wrap_text, time_offset,
+                                                  profiler, manifest))
+
+        if pending:
+            write_worker_results(pending, scheduler, seeker, wrap_text, time_offset, profiler, manifest)
+    if executor:
+        executor.shutdown()
+    # Media checked in by artifacts not using artifact_processor
+    wait_for_media_copies()
+    # Artifacts of the previous run not selected in this one
+    manifest.remove_previous_outputs()
+    manifest.save()
+    timeline_finalize()
     log.close()
+    profiler.write()
 
     write_device_info()
     if lava_only:
@@ -498,6 +764,8 @@ def crunch_artifacts(
 
     logfunc('')
     logfunc('Report generation started.')
+    # The script log is read to build the index page
+    flush_logs()
     # remove the \\?\ prefix we added to input and output paths, so it does not reflect in report
     if is_platform_windows(): 
         if out_params.report_folder_base.startswith('\\\\?\\'):
@@ -505,7 +773,8 @@ def crunch_artifacts(
         if input_path.startswith('\\\\?\\'):
             input_path = input_path[4:]
     
-    report.generate_report(out_params.report_folder_base, run_time_secs, run_time_HMS, extracttype, input_path, casedata, profile_filename, icons, lava_only)
+    report.generate_report(out_params.report_folder_base, run_time_secs, run_time_HMS, extracttype, input_path, casedata, profile_filename, icons, lava_only,
+                           manifest.get_reused_pages())
     logfunc('Report generation Completed.')
     logfunc('')
     logfunc(f'Report location: {out_params.report_folder_base}')
@@ -20,15 +20,14 @@ def pickModules():
     '''Create a list of available modules:
         - iTunesBackupInfo, iTunesBackupInstalledApplications, lastBuild and Ph100-UFED-device-values-Plist that need 
         to be executed first are excluded
-        - logarchive_artifacts is also excluded as it uses the LAVA SQLite database to extract 
-        relevant event messages from the logarchive table and must be executed only if logarchive 
-        module has been already executed
+        - derived artifacts, like logarchive_artifacts, are also excluded as they read the data of the 
+        artifacts they depend on (declared in their depends_on key) and are added to the run with them
         - ones that take a long time to run are deselected by default'''
     global mlist
     for plugin in sorted(loader.plugins, key=lambda p: p.category.upper()):
         if (plugin.module_name == 'iTunesBackupInfo'
-                or plugin.name == 'lastBuild'
-                or plugin.module_name == 'logarchive' and plugin.name != 'logarchive'):
+                or loader.provides_common_dependency(plugin)
+                or plugin.is_derived):
             continue
         # Items that take a long time to execute are deselected by default
         # and referenced in the modules_to_exclude list in an external file (modules_to_exclude.py).
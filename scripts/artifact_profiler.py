@@ -0,0 +1,241 @@
+'''Per-artifact resource usage: time, CPU, memory, I/O and rows, written to _profile.json
+   and to the Performance page of the report. Optionally dumps the cProfile stats of each
+   artifact to _Profiles/<module>_<artifact>.pstats.'''
+
+import cProfile
+import json
+import os
+import pstats
+import threading
+
+from time import perf_counter, process_time, sleep
+
+import scripts.artifact_report as artifact_report
+from scripts.ilapfuncs import icons, logfunc, sanitize_file_name
+
+# Output types in the order of the columns of the Performance page
+OUTPUT_TYPES = ('html', 'tsv', 'timeline', 'lava', 'kml', 'parquet')
+# Seconds between two samples of the RSS of the process by RssSampler
+RSS_SAMPLE_INTERVAL = 0.02
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def get_current_rss():
+    '''Returns the resident set size of this process, or None where /proc is not available'''
+    try:
+        with open('/proc/self/statm', 'rt') as statm_file:
+            return int(statm_file.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+class RssSampler:
+    '''Samples the RSS of this process in a background thread, so that the peak RSS reached
+       while an artifact runs is known. The process wide ru_maxrss only tells when an artifact
+       raised the highest RSS of the whole run.'''
+    def __init__(self, rss):
+        self.pid = os.getpid()
+        self.peak = rss
+        self.lock = threading.Lock()
+        threading.Thread(target=self.sample, name='RssSampler', daemon=True).start()
+
+    def sample(self):
+        while True:
+            sleep(RSS_SAMPLE_INTERVAL)
+            rss = get_current_rss()
+            if rss is None:
+                continue
+            with self.lock:
+                self.peak = max(self.peak, rss)
+
+    def restart(self, rss):
+        '''Returns the peak RSS since the previous restart, then measures it again from rss'''
+        with self.lock:
+            peak = max(self.peak, rss)
+            self.peak = rss
+        return peak
+
+rss_sampler = None
+
+def sample_rss():
+    '''Returns the current RSS of this process and its peak since the previous call, sampled
+       by an RssSampler started on first use in each process'''
+    global rss_sampler
+    rss = get_current_rss()
+    if rss is None:
+        return None, None
+    if rss_sampler is None or rss_sampler.pid != os.getpid():
+        # Threads are not inherited by forked worker processes
+        rss_sampler = RssSampler(rss)
+        return rss, rss
+    return rss, rss_sampler.restart(rss)
+
+def get_resource_usage():
+    '''Returns the wall clock, CPU time, RSS and I/O counters of this process, and its peak RSS
+       since the previous call. Values not available on this platform are None.'''
+    rss, peak_rss = sample_rss()
+    usage = {'wall': perf_counter(), 'cpu': process_time(), 'rss': rss, 'peak_rss': peak_rss,
+             'read_bytes': None, 'write_bytes': None}
+    try:
+        # Bytes read and written through system calls, including reads served from the page cache
+        with open('/proc/self/io', 'rt') as io_file:
+            counters = dict(line.split(': ') for line in io_file.read().splitlines())
+        usage['read_bytes'] = int(counters['rchar'])
+        usage['write_bytes'] = int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        pass
+    return usage
+
+def get_usage_delta(start, end):
+    '''Returns the resources used between two consecutive get_resource_usage() samples. The peak
+       RSS increase is how far the RSS went above its value at the start.'''
+    def delta(key, start_key=None):
+        if start[start_key or key] is None or end[key] is None:
+            return None
+        return end[key] - start[start_key or key]
+    return {'wall_time': delta('wall'), 'cpu_time': delta('cpu'), 'peak_rss_increase': delta('peak_rss', 'rss'),
+            'read_bytes': delta('read_bytes'), 'write_bytes': delta('write_bytes')}
+
+def get_files_size(files_found):
+    '''Returns the total size of the files matched for an artifact'''
+    size = 0
+    for path in files_found:
+        try:
+            if os.path.isfile(path):
+                size += os.path.getsize(path)
+        except OSError:
+            pass
+    return size
+
+def get_pstats_path(pstats_folder, plugin_name, module_name):
+    return os.path.join(pstats_folder, sanitize_file_name(f'{module_name}_{plugin_name}') + '.pstats')
+
+class ArtifactProfiler:
+    '''Collects the resource usage of each artifact of a run. With pstats_folder set, the
+       artifacts are also run under cProfile, see profile_call().'''
+    def __init__(self, report_folder_base, pstats_folder=None):
+        self.report_folder_base = report_folder_base
+        self.pstats_folder = pstats_folder
+        self.records = {}
+        if pstats_folder:
+            os.makedirs(pstats_folder, exist_ok=True)
+
+    def get_record(self, plugin):
+        '''Returns the record of an artifact, created with all its measures unset'''
+        record = self.records.get(plugin.name)
+        if record is None:
+            record = {'name': plugin.name, 'module': plugin.module_name, 'category': plugin.category,
+                      'process': 'main', 'files_matched': 0, 'input_bytes': 0, 'search_time': 0,
+                      'wall_time': None, 'cpu_time': None, 'peak_rss_increase': None,
+                      'read_bytes': None, 'write_bytes': None, 'rows': None, 'output_times': {},
+                      'status': 'not run'}
+            self.records[plugin.name] = record
+        return record
+
+    def add_search(self, plugin, files_found, search_time):
+        record = self.get_record(plugin)
+        record['files_matched'] = len(files_found)
+        record['input_bytes'] = get_files_size(files_found)
+        record['search_time'] = search_time
+
+    def add_usage(self, plugin, usage, process='main'):
+        '''Adds the resources used to run an artifact, usage being a get_usage_delta() dict'''
+        record = self.get_record(plugin)
+        record['process'] = process
+        for key, value in usage.items():
+            if value is None:
+                continue
+            if record[key] is None:
+                record[key] = value
+            elif key == 'peak_rss_increase':
+                record[key] = max(record[key], value)
+            else:
+                record[key] += value
+
+    def add_output(self, plugin, rows, output_times, status='completed'):
+        '''Adds the rows written by an artifact and the seconds spent writing each output type'''
+        record = self.get_record(plugin)
+        record['rows'] = rows
+        record['output_times'] = dict(output_times)
+        record['status'] = status
+
+    def set_status(self, plugin, status):
+        self.get_record(plugin)['status'] = status
+
+    def profile_call(self, plugin, func, *args):
+        '''Calls func(*args), under cProfile when the pstats dumps are enabled. The stats of
+           several calls for the same artifact are added to the same dump.'''
+        if not self.pstats_folder:
+            return func(*args)
+        return profile_call(get_pstats_path(self.pstats_folder, plugin.name, plugin.module_name), func, *args)
+
+    def get_total_time(self, record):
+        '''Returns the seconds spent searching, running and writing an artifact'''
+        total = record['search_time'] + (record['wall_time'] or 0)
+        if record['process'] == 'worker':
+            # The outputs of artifacts run in workers are written by the main process
+            total += sum(record['output_times'].values())
+        return total
+
+    def write_json(self):
+        records = sorted(self.records.values(), key=self.get_total_time, reverse=True)
+        for record in records:
+            record['total_time'] = self.get_total_time(record)
+        with open(os.path.join(self.report_folder_base, '_profile.json'), 'wt', encoding='utf-8') as profile_file:
+            json.dump({'artifacts': records, 'pstats_folder': self.pstats_folder}, profile_file, indent=1)
+
+    def write_html(self):
+        '''Writes the Performance page of the report, its table can be sorted by any column'''
+        report_folder = os.path.join(self.report_folder_base, '_HTML', 'Performance')
+        os.makedirs(report_folder, exist_ok=True)
+
+        data_headers = ('Artifact', 'Module', 'Category', 'Status', 'Process', 'Files Matched', 'Input MB',
+                        'Search (s)', 'Run Wall (s)', 'Run CPU (s)', 'Peak RSS Increase (MB)', 'Read MB', 'Written MB',
+                        'Rows') + tuple(f'{output_type.upper()} (s)' for output_type in OUTPUT_TYPES) + ('Total (s)',)
+        data_list = []
+        for record in sorted(self.records.values(), key=self.get_total_time, reverse=True):
+            data_list.append(
+                (record['name'], record['module'], record['category'], record['status'], record['process'],
+                 record['files_matched'], format_megabytes(record['input_bytes']), format_seconds(record['search_time']),
+                 format_seconds(record['wall_time']), format_seconds(record['cpu_time']),
+                 format_megabytes(record['peak_rss_increase']), format_megabytes(record['read_bytes']),
+                 format_megabytes(record['write_bytes']), '' if record['rows'] is None else record['rows'])
+                + tuple(format_seconds(record['output_times'].get(output_type)) for output_type in OUTPUT_TYPES)
+                + (format_seconds(self.get_total_time(record)),))
+
+        description = ('Time and resources used by each artifact, slowest first. Run times of artifacts '
+                       'run in workers exclude the time spent writing their outputs, which is shown by output type. '
+                       'The peak RSS increase is the highest RSS sampled while the artifact ran, above the RSS of '
+                       'its process when it started.')
+        icons.setdefault('Performance', {})['Artifact Performance'] = 'activity'
+        report = artifact_report.ArtifactHtmlReport('Artifact Performance')
+        report.start_artifact_report(report_folder, 'Artifact Performance', description)
+        report.add_script()
+        report.write_artifact_data_table(data_headers, data_list, os.path.join(self.report_folder_base, '_profile.json'))
+        report.end_artifact_report()
+
+    def write(self):
+        if not self.records:
+            return
+        self.write_json()
+        self.write_html()
+        if self.pstats_folder:
+            logfunc(f'cProfile stats of the artifacts written to {self.pstats_folder}')
+
+def profile_call(pstats_path, func, *args):
+    '''Calls func(*args) under cProfile and adds its stats to the dump at pstats_path'''
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        if os.path.exists(pstats_path):
+            # e.g. the run of an artifact and the writing of its output
+            stats = pstats.Stats(profiler)
+            stats.add(pstats_path)
+            stats.dump_stats(pstats_path)
+        else:
+            profiler.dump_stats(pstats_path)
+
+def format_seconds(seconds):
+    return '' if seconds is None else f'{seconds:.3f}'
+
+def format_megabytes(size):
+    return '' if size is None else f'{size / 1048576:.2f}'
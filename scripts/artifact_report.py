@@ -1,10 +1,66 @@
 import html
+import json
 import os
 import sys
+from urllib.parse import quote
 from scripts.html_parts import *
 #from scripts.ilapfuncs import is_platform_windows
 from scripts.version_info import ileapp_version
 
+try:
+    # C implementation of the escaping, used when installed
+    from markupsafe import escape as markupsafe_escape
+except ImportError:
+    markupsafe_escape = None
+
+# Width reserved for the total number of entries of tables written before the total is known
+TOTAL_PLACEHOLDER_WIDTH = 20
+
+# Rows of a table after the first DATA_SHARD_THRESHOLD are written to data shards in _HTML/_data,
+# loaded by the page once shown, DATA_SHARD_ROWS rows per shard. Set the threshold to None to
+# write all the rows in the page.
+DATA_SHARD_THRESHOLD = 5000
+DATA_SHARD_ROWS = 10000
+DATA_SHARDS_FOLDER = '_data'
+
+# Buffer size of the report files and number of rows encoded for each write
+REPORT_BUFFER_SIZE = 1024 * 1024
+ROWS_PER_WRITE = 1000
+
+escape_html = markupsafe_escape if markupsafe_escape else html.escape
+
+class HtmlRowEncoder:
+    '''Encodes the rows of a table as HTML. Which columns are escaped is determined once for
+       the table, from html_escape and the html_no_escape column names.'''
+
+    def __init__(self, data_headers, html_escape=True, html_no_escape=()):
+        self.html_escape = html_escape
+        no_escape = set(html_no_escape) if html_escape else set()
+        # None when all the columns are treated the same way
+        self.escape_flags = tuple(header not in no_escape for header in data_headers) if no_escape else None
+
+    def encode_cells(self, row):
+        '''Returns the HTML content of the cells of a row, None and 'N/A' values are left empty'''
+        cells = ['' if x is None or x == 'N/A' else str(x) for x in row]
+        if self.escape_flags is not None:
+            return [escape_html(cell) if escape else cell for cell, escape in zip(cells, self.escape_flags)]
+        if self.html_escape:
+            return [escape_html(cell) for cell in cells]
+        return cells
+
+    def encode_rows(self, rows):
+        '''Returns the <tr> tags of rows'''
+        if self.html_escape and self.escape_flags is None and rows:
+            # All the cells are escaped at once, separated by control characters then replaced by
+            # the tags, unless a cell contains one of them
+            text = '\x01'.join(['\x00'.join(['' if x is None or x == 'N/A' else str(x) for x in row]) for row in rows])
+            if text.count('\x00') == sum(map(len, rows)) - len(rows) and text.count('\x01') == len(rows) - 1:
+                text = str.replace(escape_html(text), '\x00', '</td><td>')
+                return '<tr><td>' + text.replace('\x01', '</td></tr><tr><td>') + '</td></tr>'
+        encode_cells = self.encode_cells
+        return ''.join(['<tr><td>' + '</td><td>'.join(cells) + '</td></tr>' if cells else '<tr></tr>'
+                        for cells in map(encode_cells, rows)])
+
 class ArtifactHtmlReport:
 
     def __init__(self, artifact_name, artifact_category=''):
@@ -13,6 +69,15 @@ class ArtifactHtmlReport:
         self.script_code = ''
         self.artifact_name = artifact_name
         self.artifact_category = artifact_category # unused
+        self.num_entries = 0
+        self.total_position = None
+        self.data_shard_threshold = DATA_SHARD_THRESHOLD
+        self.data_shards_folder = ''
+        self.data_shards_url = ''
+        self.table_count = 0
+        self.table_id = ''
+        self.shard_rows = []
+        self.shard_urls = []
 
     def __del__(self):
         if self.report_file:
@@ -21,11 +86,16 @@ class ArtifactHtmlReport:
     def start_artifact_report(self, report_folder, artifact_file_name, artifact_description=''):
         '''Creates the report HTML file and writes the artifact name as a heading'''
         # artifact_file_name =  artifact_file_name.replace(" ", "_") # Replace " " with "_" in HTML filenames
-        self.report_file = open(os.path.join(report_folder, f'{artifact_file_name}.temphtml'), 'w', encoding='utf8')
+        self.report_file = open(os.path.join(report_folder, f'{artifact_file_name}.temphtml'), 'w', encoding='utf8',
+                                buffering=REPORT_BUFFER_SIZE)
+        # The page is moved to the _HTML folder by report.generate_report(), with _ for spaces in its name
+        page_name = artifact_file_name.replace(' ', '_')
+        self.data_shards_folder = os.path.join(os.path.dirname(report_folder), DATA_SHARDS_FOLDER, page_name)
+        self.data_shards_url = f'{DATA_SHARDS_FOLDER}/{quote(page_name)}'
         self.report_file.write(page_header.format(f'iLEAPP - {self.artifact_name} report'))
         self.report_file.write(body_start.format(f'iLEAPP {ileapp_version}'))
         self.report_file.write(body_sidebar_setup)
-        self.report_file.write(body_sidebar_dynamic_data_placeholder) # placeholder for sidebar data
+        self.report_file.write(body_sidebar_nav_script) # sidebar data, shared by all the pages
         self.report_file.write(body_sidebar_trailer)
         self.report_file.write(body_main_header)
         self.report_file.write(body_main_data_title.format(f'{self.artifact_name} report', artifact_description))
@@ -78,12 +148,43 @@ class ArtifactHtmlReport:
 
             html_no_escape  : if html_escape=True, list of columns not to escape
         '''
+        self.start_artifact_data_table(data_headers, source_path, len(data_list), write_total, write_location,
+                                       table_responsive, table_style, table_id)
+        self.add_artifact_data_rows(data_headers, data_list, html_escape, html_no_escape)
+        self.end_artifact_data_table(data_headers, cols_repeated_at_bottom, table_responsive)
+
+    def start_artifact_data_table(
+        self,
+        data_headers,
+        source_path,
+        num_entries=None,
+        write_total=True,
+        write_location=True,
+        table_responsive=True,
+        table_style='',
+        table_id='dtBasicExample'
+    ):
+        ''' Writes info about data and the table header. Rows are then written with add_artifact_data_rows()
+            and the table is closed with end_artifact_data_table(). When num_entries is None, the total
+            number of entries is written by end_artifact_data_table(), once all the rows are written.
+        '''
         if (not self.report_file):
             raise ValueError('Output report file is closed/unavailable!')
 
-        num_entries = len(data_list)
+        self.num_entries = 0
+        self.total_position = None
+        self.table_count += 1
+        self.table_id = table_id
+        self.shard_rows = []
+        self.shard_urls = []
         if write_total:
-            self.write_minor_header(f'Total number of entries: {num_entries}', 'h6')
+            if num_entries is None:
+                # Placeholder, overwritten when the number of entries is known
+                self.report_file.write('<h6>Total number of entries: ')
+                self.total_position = self.report_file.tell()
+                self.report_file.write(' ' * TOTAL_PLACEHOLDER_WIDTH + '</h6>')
+            else:
+                self.write_minor_header(f'Total number of entries: {num_entries}', 'h6')
         if write_location:
             if sys.platform == 'win32':
                 source_path = source_path.replace('/', '\\')
@@ -103,20 +204,42 @@ class ArtifactHtmlReport:
             '<tr>' + ''.join(('<th class="th-sm">{}</th>'.format(html.escape(str(x))) for x in data_headers)) + '</tr>')
         self.report_file.write('</thead><tbody>')
 
-        if html_escape:
-            for row in data_list:
-                if html_no_escape:
-                    self.report_file.write('<tr>' + ''.join(('<td>{}</td>'.format(html.escape(
-                        str(x) if x not in [None, 'N/A'] else '')) if h not in html_no_escape else '<td>{}</td>'.format(
-                        str(x) if x not in [None, 'N/A'] else '') for x, h in zip(row, data_headers))) + '</tr>')
-                else:
-                    self.report_file.write('<tr>' + ''.join(
-                        ('<td>{}</td>'.format(html.escape(str(x) if x not in [None, 'N/A'] else '')) for x in
-                         row)) + '</tr>')
-        else:
-            for row in data_list:
-                self.report_file.write('<tr>' + ''.join( ('<td>{}</td>'.format(str(x) if x not in [None, 'N/A'] else '') for x in row) ) + '</tr>')
-        
+    def add_artifact_data_rows(self, data_headers, data_list, html_escape=True, html_no_escape=[]):
+        '''Writes rows in the table started by start_artifact_data_table(). The rows after the first
+           data_shard_threshold ones are written to data shards instead of the page.'''
+        if self.data_shard_threshold is not None and self.num_entries + len(data_list) > self.data_shard_threshold:
+            inline_count = max(self.data_shard_threshold - self.num_entries, 0)
+            self.add_data_shard_rows(data_headers, data_list[inline_count:], html_escape, html_no_escape)
+            data_list = data_list[:inline_count]
+        self.num_entries += len(data_list)
+        encoder = HtmlRowEncoder(data_headers, html_escape, html_no_escape)
+        for start in range(0, len(data_list), ROWS_PER_WRITE):
+            self.report_file.write(encoder.encode_rows(data_list[start:start + ROWS_PER_WRITE]))
+
+    def add_data_shard_rows(self, data_headers, data_list, html_escape=True, html_no_escape=[]):
+        '''Adds rows to the data shards of the table, the cells are the HTML of the <td> tags'''
+        self.num_entries += len(data_list)
+        encoder = HtmlRowEncoder(data_headers, html_escape, html_no_escape)
+        for row in data_list:
+            self.shard_rows.append(encoder.encode_cells(row))
+            if len(self.shard_rows) >= DATA_SHARD_ROWS:
+                self.write_data_shard()
+
+    def write_data_shard(self):
+        if not self.shard_rows:
+            return
+        os.makedirs(self.data_shards_folder, exist_ok=True)
+        shard_name = f'{self.table_count}_{len(self.shard_urls) + 1}.js'
+        with open(os.path.join(self.data_shards_folder, shard_name), 'w', encoding='utf8') as shard_file:
+            shard_file.write(f'addDataShard({json.dumps(self.table_id)}, ')
+            json.dump(self.shard_rows, shard_file, ensure_ascii=False, separators=(',', ':'))
+            shard_file.write(');\n')
+        self.shard_urls.append(f'{self.data_shards_url}/{shard_name}')
+        self.shard_rows = []
+
+    def end_artifact_data_table(self, data_headers, cols_repeated_at_bottom=True, table_responsive=True):
+        '''Closes the table started by start_artifact_data_table()'''
+        self.write_data_shard()
         self.report_file.write('</tbody>')
         if cols_repeated_at_bottom:
             self.report_file.write('<tfoot><tr>' + ''.join(
@@ -124,6 +247,19 @@ class ArtifactHtmlReport:
         self.report_file.write('</table>')
         if table_responsive:
             self.report_file.write("</div>")
+        if self.shard_urls:
+            self.report_file.write(f'<p id="{html.escape(self.table_id)}-loading" class="text-muted">'
+                                   f'Loading the remaining entries...</p>')
+            if data_shards_loader_script not in self.script_code:
+                self.script_code += data_shards_loader_script
+            self.script_code += data_shards_script.format(table_id=json.dumps(self.table_id),
+                                                          shard_urls=json.dumps(self.shard_urls))
+        if self.total_position is not None:
+            end_position = self.report_file.tell()
+            self.report_file.seek(self.total_position)
+            self.report_file.write(str(self.num_entries).ljust(TOTAL_PLACEHOLDER_WIDTH))
+            self.report_file.seek(end_position)
+            self.total_position = None
 
     def add_section_heading(self, heading, size='h2'):
         heading = html.escape(heading)
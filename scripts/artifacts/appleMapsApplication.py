@@ -15,8 +15,8 @@ __artifacts_v2__ = {
 }
 
 
-import blackboxprotobuf
 from scripts.ilapfuncs import artifact_processor, get_file_path, get_plist_file_content
+from scripts.protobuf_schema import decode_message
 
 @artifact_processor
 def appleMapsApplication(files_found, report_folder, seeker, wrap_text, timezone_offset):
@@ -34,7 +34,7 @@ def appleMapsApplication(files_found, report_folder, seeker, wrap_text, timezone
     
     protobuf = plist.get('__internal__LastActivityCamera', None)
     if protobuf:
-        internal_plist, _ = blackboxprotobuf.decode_message(protobuf,types)
+        internal_plist, _ = decode_message(protobuf,types)
         latitude = (internal_plist['Latitude'])
         longitude = (internal_plist['Longitude'])
         
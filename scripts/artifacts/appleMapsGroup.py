@@ -14,8 +14,8 @@ __artifacts_v2__ = {
     }
 }
 
-import blackboxprotobuf
 from scripts.ilapfuncs import artifact_processor, get_file_path, get_plist_file_content
+from scripts.protobuf_schema import decode_message
 
 @artifact_processor
 def appleMapsGroup(files_found, report_folder, seeker, wrap_text, timezone_offset):
@@ -38,7 +38,7 @@ def appleMapsGroup(files_found, report_folder, seeker, wrap_text, timezone_offse
                                 '7': {'type': 'int', 'name': ''}},
                         'name': ''}
                 }    
-        internal_deserialized_plist, di = blackboxprotobuf.decode_message(maps_activity, types)
+        internal_deserialized_plist, di = decode_message(maps_activity, types)
         latitude = (internal_deserialized_plist['1']['5']['Latitude'])
         longitude = (internal_deserialized_plist['1']['5']['Longitude'])
         data_list.append((latitude, longitude))
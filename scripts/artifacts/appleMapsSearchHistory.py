@@ -5,15 +5,16 @@ import pprint
 
 from scripts.artifact_report import ArtifactHtmlReport
 from scripts.ilapfuncs import logfunc, tsv, timeline, is_platform_windows
+from scripts.protobuf_schema import decode_message
 
 def longbase64proto(longstuff, longtypes):
     longstuff = longstuff.split('placeRequest=')[1]
-    longstuff, t = blackboxprotobuf.decode_message(base64.b64decode(longstuff), longtypes)
+    longstuff, t = decode_message(base64.b64decode(longstuff), longtypes)
     return longstuff
 
 def shortbase64proto(shortstuff, shorttypes):
     shortstuff = shortstuff.split('=')[1]
-    shortstuff, t = blackboxprotobuf.decode_message(base64.b64decode(shortstuff), shorttypes)
+    shortstuff, t = decode_message(base64.b64decode(shortstuff), shorttypes)
     return shortstuff
 
 def get_appleMapsSearchHistory(files_found, report_folder, seeker, wrap_text, timezone_offset):
@@ -14,10 +14,7 @@ __artifacts_v2__ = {
 }
 
 
-import os
-from datetime import timezone
-import blackboxprotobuf
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor, webkit_timestampsconv, convert_utc_human_to_timezone
 
@@ -28,46 +25,32 @@ def get_biomeBattperc(files_found, report_folder, seeker, wrap_text, timezone_of
     typess = {'1': {'type': 'message', 'message_typedef': {'1': {'type': 'str', 'name': ''}, '2': {'type': 'message', 'message_typedef': {'1': {'type': 'int', 'name': ''}, '2': {'type': 'int', 'name': ''}}, 'name': ''}}, 'name': ''}, '2': {'type': 'double', 'name': ''}, '3': {'type': 'double', 'name': ''}, '4': {'type': 'message', 'message_typedef': {'1': {'type': 'message', 'message_typedef': {'1': {'type': 'int', 'name': ''}, '2': {'type': 'int', 'name': ''}}, 'name': ''}, '5': {'type': 'double', 'name': ''}}, 'name': ''}, '5': {'type': 'str', 'name': ''}, '8': {'type': 'double', 'name': ''}, '10': {'type': 'int', 'name': ''}}
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
-            else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
-
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
-
-            if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
-                
-                activity = (protostuff['1']['1'])
-                timestart = (webkit_timestampsconv(protostuff['2']))
-                timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
-                
-                timeend = (webkit_timestampsconv(protostuff['3']))
-                timeend = convert_utc_human_to_timezone(timeend, timezone_offset)
-                
-                timewrite = (webkit_timestampsconv(protostuff['8']))
-                timewrite = convert_utc_human_to_timezone(timewrite, timezone_offset)
-                
-                percent = (protostuff['4']['5'])
-                actionguid = (protostuff['5'])
-                
-                data_list.append((ts, timestart, timeend, timewrite, record.state.name, activity, percent, actionguid,
-                                  filename, record.data_start_offset))
-
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, None, None, None, record.state.name, None, None, None, filename,
-                                  record.data_start_offset))
+    records, report_file = get_biome_records(files_found, typess)
+    for record in records:
+        ts = record.timestamp
+
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
+
+            activity = (protostuff['1']['1'])
+            timestart = (webkit_timestampsconv(protostuff['2']))
+            timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
+
+            timeend = (webkit_timestampsconv(protostuff['3']))
+            timeend = convert_utc_human_to_timezone(timeend, timezone_offset)
+
+            timewrite = (webkit_timestampsconv(protostuff['8']))
+            timewrite = convert_utc_human_to_timezone(timewrite, timezone_offset)
+
+            percent = (protostuff['4']['5'])
+            actionguid = (protostuff['5'])
+
+            data_list.append((ts, timestart, timeend, timewrite, record.state.name, activity, percent, actionguid,
+                              record.filename, record.data_start_offset))
+
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, None, None, None, record.state.name, None, None, None, record.filename,
+                              record.data_start_offset))
 
 
     data_headers = (('SEGB Timestamp', 'datetime'), ('Time Start', 'datetime'), ('Time End', 'datetime'),
@@ -14,10 +14,8 @@ __artifacts_v2__ = {
 }
 
 
-import os
-import blackboxprotobuf
 from datetime import *
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor
 
@@ -26,36 +24,22 @@ from scripts.ilapfuncs import artifact_processor
 def get_biomeBluetooth(files_found, report_folder, seeker, wrap_text, timezone_offset):
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
+    records, report_file = get_biome_records(files_found)
+    for record in records:
+        ts = record.timestamp
+
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
+
+            mac = protostuff['1'].decode()
+            if isinstance(protostuff['2'], dict):
+                desc = protostuff['2']
             else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
-
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
-
-            if record.state == EntryState.Written:
-                protostuff, _ = blackboxprotobuf.decode_message(record.data)
-                
-                mac = protostuff['1'].decode()
-                if isinstance(protostuff['2'], dict):
-                    desc = protostuff['2']
-                else:
-                    desc = protostuff['2'].decode()
-                data_list.append((ts, record.state.name, mac, desc, filename, record.data_start_offset))
-
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, record.state.name, None, None, filename, record.data_start_offset))
+                desc = protostuff['2'].decode()
+            data_list.append((ts, record.state.name, mac, desc, record.filename, record.data_start_offset))
+
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, record.state.name, None, None, record.filename, record.data_start_offset))
 
     data_headers = (('SEGB Timestamp', 'datetime'), 'SEGB State', 'MAC', 'Name', 'Filename', 'Offset')
 
@@ -14,10 +14,7 @@ __artifacts_v2__ = {
 }
 
 
-import os
-from datetime import timezone
-import blackboxprotobuf
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor, webkit_timestampsconv, convert_utc_human_to_timezone
 
@@ -51,53 +48,39 @@ def get_biomeDKInfocus(files_found, report_folder, seeker, wrap_text, timezone_o
         '10': {'type': 'int', 'name': ''}}
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
-            else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
+    records, report_file = get_biome_records(files_found, typess)
+    for record in records:
+        ts = record.timestamp
+
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
+
+            activity = (protostuff['1']['1'])
+            timestart = (webkit_timestampsconv(protostuff['2']))
+            timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
 
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
+            timeend = (webkit_timestampsconv(protostuff['3']))
+            timeend = convert_utc_human_to_timezone(timeend, timezone_offset)
 
-            if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
-                
-                activity = (protostuff['1']['1'])
-                timestart = (webkit_timestampsconv(protostuff['2']))
-                timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
-                
-                timeend = (webkit_timestampsconv(protostuff['3']))
-                timeend = convert_utc_human_to_timezone(timeend, timezone_offset)
-                
-                timewrite = (webkit_timestampsconv(protostuff['8']))
-                timewrite = convert_utc_human_to_timezone(timewrite, timezone_offset)
-                
-                actionguid = (protostuff['5'])
-                bundleid = (protostuff['4']['3'])
-                if protostuff.get('7', '') != '':
-                    if isinstance(protostuff['7'], list):
-                        transition = (protostuff['7'][0]['2']['3'])
-                    else:
-                        transition = (protostuff['7']['2']['3'])
+            timewrite = (webkit_timestampsconv(protostuff['8']))
+            timewrite = convert_utc_human_to_timezone(timewrite, timezone_offset)
+
+            actionguid = (protostuff['5'])
+            bundleid = (protostuff['4']['3'])
+            if protostuff.get('7', '') != '':
+                if isinstance(protostuff['7'], list):
+                    transition = (protostuff['7'][0]['2']['3'])
                 else:
-                    transition = ''
+                    transition = (protostuff['7']['2']['3'])
+            else:
+                transition = ''
 
-                data_list.append((ts, timestart, timeend, timewrite, record.state.name, activity, bundleid, transition,
-                                  actionguid, filename, record.data_start_offset))
+            data_list.append((ts, timestart, timeend, timewrite, record.state.name, activity, bundleid, transition,
+                              actionguid, record.filename, record.data_start_offset))
 
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, None, None, None, record.state.name, None, None, None, None, filename,
-                                  record.data_start_offset))
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, None, None, None, record.state.name, None, None, None, None, record.filename,
+                              record.data_start_offset))
 
     data_headers = (('SEGB Timestamp', 'datetime'), ('Time Start', 'datetime'), ('Time End', 'datetime'),
                     ('Time Write', 'datetime'), 'SEGB State', 'Activity', 'Bundle ID', 'Transition', 'Action GUID',
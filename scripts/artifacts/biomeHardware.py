@@ -14,10 +14,7 @@ __artifacts_v2__ = {
 }
 
 
-import os
-from datetime import timezone
-import blackboxprotobuf
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor, webkit_timestampsconv, convert_utc_human_to_timezone
 
@@ -28,37 +25,23 @@ def get_biomeHardware(files_found, report_folder, seeker, wrap_text, timezone_of
     typess = {'1': {'type': 'str', 'name': ''}}
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
-            else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
+    records, report_file = get_biome_records(files_found, typess)
+    for record in records:
+        ts = record.timestamp
 
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
 
-            if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
-                
-                #pp = pprint.PrettyPrinter(indent=4)
-                #pp.pprint(protostuff)
-                #print(types)
-                
-                hardware = (protostuff['1'])
-                
-                data_list.append((ts, record.state.name, hardware, filename, record.data_start_offset))
+            #pp = pprint.PrettyPrinter(indent=4)
+            #pp.pprint(protostuff)
+            #print(types)
 
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, record.state.name, None, filename, record.data_start_offset))
+            hardware = (protostuff['1'])
+
+            data_list.append((ts, record.state.name, hardware, record.filename, record.data_start_offset))
+
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, record.state.name, None, record.filename, record.data_start_offset))
 
     data_headers = (('SEGB Record Time', 'datetime'), 'SEGB State', 'Hardware', 'Filename', 'Offset')
 
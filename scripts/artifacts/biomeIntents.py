@@ -18,7 +18,7 @@ __artifacts_v2__ = {
 import os
 import blackboxprotobuf
 import nska_deserialize as nd
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.artifact_report import ArtifactHtmlReport
 from scripts.ilapfuncs import tsv, timeline, convert_utc_human_to_timezone, convert_time_obj_to_utc
@@ -53,9 +53,10 @@ def get_biomeIntents(files_found, report_folder, seeker, wrap_text, timezone_off
 
         file_data_list_tsv = []
         file_data_list = []
-        for record in read_segb_file(file_found):
+        records, _ = get_biome_records([file_found], keep_data=True)
+        for record in records:
             if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data)
+                protostuff = record.protostuff
                 offset = record.data_start_offset
 
                 #Write raw protobuf to file
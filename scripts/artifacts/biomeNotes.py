@@ -16,10 +16,8 @@ __artifacts_v2__ = {
 
 
 import os
-from datetime import timezone
-import blackboxprotobuf
 from pathlib import Path
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.artifact_report import ArtifactHtmlReport
 from scripts.ilapfuncs import webkit_timestampsconv, tsv, timeline, convert_utc_human_to_timezone, convert_time_obj_to_utc
@@ -52,12 +50,12 @@ def get_biomeNotes(files_found, report_folder, seeker, wrap_text, timezone_offse
 
         file_data_list_html = []
         file_data_list = []
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
+        records, _ = get_biome_records([file_found])
+        for record in records:
+            ts = record.timestamp
 
             if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data)
+                protostuff = record.protostuff
                 record_counter += 1
                 time = (webkit_timestampsconv(protostuff['3']))
                 time = convert_utc_human_to_timezone(time, timezone_offset)
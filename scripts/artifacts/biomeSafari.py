@@ -14,10 +14,7 @@ __artifacts_v2__ = {
 }
 
 
-import os
-from datetime import timezone
-import blackboxprotobuf
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor, webkit_timestampsconv, convert_utc_human_to_timezone
 
@@ -28,43 +25,29 @@ def get_biomeSafari(files_found, report_folder, seeker, wrap_text, timezone_offs
     typess = {'1': {'type': 'message', 'message_typedef': {'1': {'type': 'str', 'name': ''}, '2': {'type': 'message', 'message_typedef': {'1': {'type': 'int', 'name': ''}, '2': {'type': 'int', 'name': ''}}, 'name': ''}}, 'name': ''}, '2': {'type': 'double', 'name': ''}, '3': {'type': 'double', 'name': ''}, '4': {'type': 'message', 'message_typedef': {'1': {'type': 'message', 'message_typedef': {'1': {'type': 'int', 'name': ''}, '2': {'type': 'int', 'name': ''}}, 'name': ''}, '3': {'type': 'str', 'name': ''}}, 'name': ''}, '5': {'type': 'str', 'name': ''}, '6': {'type': 'message', 'message_typedef': {'1': {'type': 'str', 'name': ''}, '2': {'type': 'str', 'name': ''}, '3': {'type': 'str', 'name': ''}, '4': {'type': 'str', 'name': ''}, '6': {'type': 'int', 'name': ''}}, 'name': ''}, '7': {'type': 'message', 'message_typedef': {'1': {'type': 'message', 'message_typedef': {}, 'name': ''}, '2': {'type': 'message', 'message_typedef': {'1': {'type': 'message', 'message_typedef': {'1': {'type': 'int', 'name': ''}, '2': {'type': 'int', 'name': ''}}, 'name': ''}, '3': {'type': 'str', 'name': ''}}, 'name': ''}, '3': {'type': 'int', 'name': ''}}, 'name': ''}, '8': {'type': 'fixed64', 'name': ''}, '10': {'type': 'int', 'name': ''}}
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
-            else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
-
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
-
-            if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
-                activity = (protostuff['1']['1'])
-                timestart = (webkit_timestampsconv(protostuff['2']))
-                url = (protostuff['4']['3'])
-                guid = (protostuff['5'])
-                detail1 = (protostuff['6']['1'])
-                detail2 = (protostuff['6']['2'])
-                detail3 = (protostuff['6']['4'])
-                title = (protostuff['7']['2']['3'])
-
-                data_list.append((ts, timestart, record.state.name, activity, title, url, detail1, detail2, detail3, guid, filename,
-                                  record.data_start_offset))
-
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, None, record.state.name, None, None, None, None, None, None, None, filename,
-                                  record.data_start_offset))
-
-        data_headers = (('SEGB Timestamp', 'datetime'), ('Timestamp', 'datetime'), 'SEGB State', 'Activity', 'Title',
-                        'URL', 'Detail', 'Detail 2', 'Detail 3', 'GUID', "Filename", "Offset")
-
-        return data_headers, data_list, report_file
+    records, report_file = get_biome_records(files_found, typess)
+    for record in records:
+        ts = record.timestamp
+
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
+            activity = (protostuff['1']['1'])
+            timestart = (webkit_timestampsconv(protostuff['2']))
+            url = (protostuff['4']['3'])
+            guid = (protostuff['5'])
+            detail1 = (protostuff['6']['1'])
+            detail2 = (protostuff['6']['2'])
+            detail3 = (protostuff['6']['4'])
+            title = (protostuff['7']['2']['3'])
+
+            data_list.append((ts, timestart, record.state.name, activity, title, url, detail1, detail2, detail3, guid, record.filename,
+                              record.data_start_offset))
+
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, None, record.state.name, None, None, None, None, None, None, None, record.filename,
+                              record.data_start_offset))
+
+    data_headers = (('SEGB Timestamp', 'datetime'), ('Timestamp', 'datetime'), 'SEGB State', 'Activity', 'Title',
+                    'URL', 'Detail', 'Detail 2', 'Detail 3', 'GUID', "Filename", "Offset")
+
+    return data_headers, data_list, report_file
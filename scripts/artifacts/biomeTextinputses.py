@@ -16,10 +16,7 @@ __artifacts_v2__ = {
 }
 
 
-import os
-from datetime import timezone
-import blackboxprotobuf
-from scripts.ccl_segb.ccl_segb import read_segb_file
+from scripts.biome_streams import get_biome_records
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import artifact_processor, convert_utc_human_to_timezone, convert_ts_int_to_timezone, webkit_timestampsconv
 
@@ -30,42 +27,28 @@ def get_biomeTextinputses(files_found, report_folder, seeker, wrap_text, timezon
     typess = {'1': {'type': 'double', 'name': ''}, '2': {'type': 'double', 'name': ''}, '3': {'type': 'str', 'name': ''}, '4': {'type': 'int', 'name': ''}}
 
     data_list = []
-    report_file = 'Unknown'
-    for file_found in files_found:
-        file_found = str(file_found)
-        filename = os.path.basename(file_found)
-        if filename.startswith('.'):
-            continue
-        if os.path.isfile(file_found):
-            if 'tombstone' in file_found:
-                continue
-            else:
-                report_file = os.path.dirname(file_found)
-        else:
-            continue
+    records, report_file = get_biome_records(files_found, typess)
+    for record in records:
+        ts = record.timestamp
 
-        for record in read_segb_file(file_found):
-            ts = record.timestamp1
-            ts = ts.replace(tzinfo=timezone.utc)
+        if record.state == EntryState.Written:
+            protostuff = record.protostuff
 
-            if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
+            duration = protostuff['1']
+            # Records in "restricted" folder seem to have time in Unix time, whereas public was cocoa time
+            if 'restricted' in record.file_path:
+                timestart = (convert_ts_int_to_timezone(protostuff['2'], timezone_offset))
+            else:
+                timestart = (webkit_timestampsconv(protostuff['2']))
+                timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
 
-                duration = protostuff['1']
-                # Records in "restricted" folder seem to have time in Unix time, whereas public was cocoa time
-                if 'restricted' in file_found:
-                    timestart = (convert_ts_int_to_timezone(protostuff['2'], timezone_offset))
-                else:
-                    timestart = (webkit_timestampsconv(protostuff['2']))
-                    timestart = convert_utc_human_to_timezone(timestart, timezone_offset)
+            bundleid = (protostuff.get('3',''))
 
-                bundleid = (protostuff.get('3',''))
-                
-                data_list.append((ts, timestart, record.state.name, bundleid, duration, filename,
-                                  record.data_start_offset))
+            data_list.append((ts, timestart, record.state.name, bundleid, duration, record.filename,
+                              record.data_start_offset))
 
-            elif record.state == EntryState.Deleted:
-                data_list.append((ts, None, record.state.name, None, None, filename, record.data_start_offset))
+        elif record.state == EntryState.Deleted:
+            data_list.append((ts, None, record.state.name, None, None, record.filename, record.data_start_offset))
 
     data_headers = (('SEGB Timestamp', 'datetime'), ('Time Start', 'datetime'), 'SEGB State', 'Bundle ID', 'Duration',
                     'Filename', 'Offset')
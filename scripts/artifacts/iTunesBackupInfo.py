@@ -10,7 +10,8 @@ __artifacts_v2__ = {
         "notes": "",
         "paths": ('info.plist',),
         "output_types": ["html", "tsv", "lava"],
-        "artifact_icon": "refresh-cw"
+        "artifact_icon": "refresh-cw",
+        "provides": ("ios_version",)
     },
     "iTunesBackupInstalledApplications": {
         "name": "iTunes Backup - Installed Applications",
@@ -23,7 +24,8 @@ __artifacts_v2__ = {
         "notes": "",
         "paths": ('info.plist',),
         "output_types": ["html", "tsv", "lava"],
-        "artifact_icon": "package"
+        "artifact_icon": "package",
+        "depends_on": ("iTunesBackupInfo",)
     }
 }
 
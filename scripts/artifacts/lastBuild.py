@@ -12,7 +12,8 @@ __artifacts_v2__ = {
             '*/installd/Library/MobileInstallation/LastBuildInfo.plist', 
             '*/logs/SystemVersion/SystemVersion.plist'),
         "output_types": ["html", "tsv", "lava"],
-        "artifact_icon": "git-commit"
+        "artifact_icon": "git-commit",
+        "provides": ("ios_version",)
     }
 }
 
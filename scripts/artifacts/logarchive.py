@@ -11,6 +11,7 @@ __artifacts_v2__ = {
         "paths": ('*/logarchive*.json',),
         "output_types": "lava_only",
         "artifact_icon": "database",
+        "provides": ("logarchive",),
     },
     "logarchive_artifacts": {
         "name": "logarchive artifacts",
@@ -24,6 +25,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "lava_only",
         "artifact_icon": "database",
+        "depends_on": ("logarchive",),
     },
     "logarchive_time_change": {
         "name": "logarchive time change",
@@ -37,6 +39,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "clock",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_flashlight": {
         "name": "logarchive flashlight",
@@ -50,6 +53,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "sun",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_executed_apps": {
         "name": "logarchive executed apps",
@@ -63,6 +67,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "code",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_tethering": {
         "name": "logarchive personal hotspot",
@@ -76,6 +81,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "wifi",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_airplane_mode": {
         "name": "logarchive airplane mode",
@@ -89,6 +95,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "wifi-off",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_lock_status": {
         "name": "logarchive lock status",
@@ -102,6 +109,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "lock",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_wifi_status": {
         "name": "logarchive wifi status",
@@ -115,6 +123,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "wifi",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_bluetooth_status": {
         "name": "logarchive bluetooth status",
@@ -128,6 +137,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "bluetooth",
+        "depends_on": ("logarchive_artifacts",),
     },
     "logarchive_audio_status": {
         "name": "logarchive audio status",
@@ -141,6 +151,7 @@ __artifacts_v2__ = {
         "paths": None,
         "output_types": "standard",
         "artifact_icon": "headphones",
+        "depends_on": ("logarchive_artifacts",),
     }
 }
 
@@ -181,10 +192,10 @@ def truncate_after_last_bracket(file_path):
 @artifact_processor
 def logarchive(files_found, report_folder, seeker, wrap_text, timezone_offset):
     source_path = get_file_path(files_found, 'logarchive*.json')
-    data_list = []
 
-    incval = 0
-    if source_path:
+    def get_data_list():
+        # Rows are yielded, logarchives can hold millions of entries
+        incval = 0
         truncate_after_last_bracket(source_path)
         with open(source_path, 'rb') as f:
             for record in ijson.items(f, 'item', multiple_values=True ): # if the json is a list
@@ -200,11 +211,11 @@ def logarchive(files_found, report_folder, seeker, wrap_text, timezone_offset):
                     traceid = str(record.get('traceID', ''))
                     
                     t0 = ( timestamp, incval,  process_image_path,  processid,  subsystem,  category,  eventmessage,  traceid)
-                    data_list.append(t0)
+                    yield t0
 
     data_headers = (('Timestamp', 'datetime'), 'Row Number', 'Process Image Path', 'Process ID',
                     'Subsystem', 'Category', 'Event Message', 'Trace ID')
-    return data_headers, data_list, source_path
+    return data_headers, get_data_list() if source_path else [], source_path
 
 @artifact_processor
 def logarchive_artifacts(files_found, report_folder, seeker, wrap_text, timezone_offset):
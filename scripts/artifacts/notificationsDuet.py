@@ -16,13 +16,13 @@ __artifacts_v2__ = {
 
 
 import os
-import blackboxprotobuf
 from datetime import timezone
 from scripts.ccl_segb.ccl_segb import read_segb_file
 from scripts.ccl_segb.ccl_segb_common import EntryState
 from scripts.ilapfuncs import webkit_timestampsconv, convert_utc_human_to_timezone, tsv
 from scripts.artifact_report import ArtifactHtmlReport
 from scripts.lavafuncs import lava_process_artifact, lava_insert_sqlite_data
+from scripts.protobuf_schema import decode_message
 
 
 def get_notificationsDuet(files_found, report_folder, seeker, wrap_text, timezone_offset):
@@ -84,7 +84,7 @@ def get_notificationsDuet(files_found, report_folder, seeker, wrap_text, timezon
             segb_time = segb_time.replace(tzinfo=timezone.utc)
 
             if record.state == EntryState.Written:
-                protostuff, types = blackboxprotobuf.decode_message(record.data, typess)
+                protostuff, types = decode_message(record.data, typess)
                 proto_time = webkit_timestampsconv(protostuff['1'].get('1'))
                 proto_time2 = webkit_timestampsconv(protostuff.get('3'))
                 guid = protostuff['1'].get('2')
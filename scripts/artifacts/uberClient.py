@@ -548,10 +548,9 @@ def get_ur_locations(file_found, report_folder, database, timezone_offset):
 def get_locations(ldb_path, report_folder, timezone_offset):
     data_list = []
 
-    leveldb_records = ccl_leveldb.RawLevelDb(ldb_path)
-    for record in leveldb_records.iterate_records_raw():
-        # key "UBLocationNode.__DEFAULT_INDEX"
-        if record.user_key.decode() == 'UBLocationNode.__DEFAULT_INDEX':
+    with ccl_leveldb.RawLevelDb(ldb_path) as leveldb_records:
+        # all the versions, live and deleted, of the key "UBLocationNode.__DEFAULT_INDEX"
+        for record in leveldb_records.get_records_raw(b'UBLocationNode.__DEFAULT_INDEX'):
             # location
             try:
                 plist = load_plist_from_string(record.value)
@@ -607,27 +606,27 @@ def parse_leveldb(manifest_path, report_folder, timezone_offset):
     # com.ubercab.UberClient
     base_path = os.path.dirname(manifest_path)
 
-    leveldb_records = ccl_leveldb.RawLevelDb(manifest_path)
-    for record in leveldb_records.iterate_records_raw():
-        key = record.user_key.decode()
+    with ccl_leveldb.RawLevelDb(manifest_path) as leveldb_records:
+        for record in leveldb_records.iterate_records_raw():
+            key = record.user_key.decode()
 
-        # plist
-        plist = load_plist_from_string(record.value)
+            # plist
+            plist = load_plist_from_string(record.value)
 
-        # name
-        name = plist.get('_name')
-        # uuid (leveldb folder name)
-        uuid = plist.get('_uuid')
+            # name
+            name = plist.get('_name')
+            # uuid (leveldb folder name)
+            uuid = plist.get('_uuid')
 
-        if not bool(name) or not bool(uuid):
-            continue
+            if not bool(name) or not bool(uuid):
+                continue
 
-        # uuid path
-        ldb_path = os.path.join(base_path, uuid)
+            # uuid path
+            ldb_path = os.path.join(base_path, uuid)
         
-        # locations
-        if key == 'UBPersistenceMetadata.com.uber.location.UBDeviceLocationSource':
-            get_locations(ldb_path, report_folder, timezone_offset)
+            # locations
+            if key == 'UBPersistenceMetadata.com.uber.location.UBDeviceLocationSource':
+                get_locations(ldb_path, report_folder, timezone_offset)
 
 
 # uber client
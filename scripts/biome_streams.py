@@ -0,0 +1,68 @@
+'''Shared reading of the Biome streams. An artifact passes the SEGB files of the streams it
+   matched and the typedef of their protobuf records to get_biome_records(), and receives the
+   records of all the files in timestamp order, with the data of the written records decoded.
+
+   The files are read with ccl_segb_mmap.read_segb_files, which maps each of them once.'''
+
+import functools
+import os
+import typing
+from datetime import datetime, timezone
+
+from scripts.ccl_segb.ccl_segb_common import EntryState
+from scripts.ccl_segb.ccl_segb_mmap import read_segb_files
+from scripts.protobuf_schema import decode_message
+
+class BiomeRecord(typing.NamedTuple):
+    '''A record of a Biome stream. protostuff is the decoded data of written records and None
+       for deleted ones, data is their raw protobuf data when it was asked for.'''
+    timestamp: datetime  # SEGB timestamp, in UTC
+    state: EntryState
+    protostuff: dict | None
+    file_path: str
+    data_start_offset: int
+    data: bytes | None
+
+    @property
+    def filename(self):
+        return os.path.basename(self.file_path)
+
+def get_stream_files(files_found):
+    '''Returns the SEGB files of the streams among the files matched by an artifact, without
+       the hidden files, the directories and the tombstones'''
+    stream_files = []
+    for file_found in files_found:
+        file_found = str(file_found)
+        if os.path.basename(file_found).startswith('.') or 'tombstone' in file_found:
+            continue
+        if os.path.isfile(file_found):
+            stream_files.append(file_found)
+    return sorted(stream_files)
+
+def get_stream_source(stream_files):
+    '''Returns the source path reported for the files of a stream'''
+    return os.path.dirname(stream_files[-1]) if stream_files else 'Unknown'
+
+def decode_biome_record(typedef, keep_data, record):
+    '''Returns the state, decoded data and, if keep_data, data of a written or deleted record.
+       Called with the records of read_segb_files.'''
+    if record.state == EntryState.Written:
+        data = bytes(record.data)
+        protostuff, types = decode_message(data, typedef)
+        return record.state, protostuff, data if keep_data else None
+    if record.state == EntryState.Deleted:
+        return record.state, None, b'' if keep_data else None
+    return None
+
+def get_biome_records(files_found, typedef=None, keep_data=False):
+    '''Returns the written and deleted records of the Biome streams among files_found, in
+       timestamp order, and the source path to report for them. Without typedef, the types of
+       the fields of written records are guessed like blackboxprotobuf does. The raw data of the
+       records is only kept with keep_data.'''
+    stream_files = get_stream_files(files_found)
+    records = []
+    for segb_record in read_segb_files(stream_files, functools.partial(decode_biome_record, typedef, keep_data)):
+        state, protostuff, data = segb_record.value
+        records.append(BiomeRecord(segb_record.timestamp.replace(tzinfo=timezone.utc), state, protostuff,
+                                   segb_record.file_path, segb_record.data_start_offset, data))
+    return records, get_stream_source(stream_files)
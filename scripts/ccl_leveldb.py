@@ -23,12 +23,15 @@ SOFTWARE.
 import typing
 import struct
 import re
+import bisect
+import heapq
+import itertools
 import os
 import io
 import pathlib
 import dataclasses
 import enum
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from types import MappingProxyType
 
 import scripts.ccl_simplesnappy as ccl_simplesnappy
@@ -37,6 +40,10 @@ __version__ = "0.4"
 __description__ = "A module for reading LevelDB databases"
 __contact__ = "Alex Caithness"
 
+# Name of the default comparator of leveldb, which orders the user keys bytewise. The records of databases using
+# another comparator (eg. Chrome's IndexedDB "idb_cmp1") are not ordered bytewise in their table files.
+BYTEWISE_COMPARATOR = "leveldb.BytewiseComparator"
+
 
 def _read_le_varint(stream: typing.BinaryIO, *, is_google_32bit=False) -> typing.Optional[typing.Tuple[int, bytes]]:
     """Read varint from a stream.
@@ -78,6 +85,15 @@ def read_length_prefixed_blob(stream: typing.BinaryIO):
     return data
 
 
+def get_prefix_end(prefix: bytes) -> typing.Optional[bytes]:
+    """Returns the smallest key greater than all the keys starting with prefix, or None if there is none (the
+    prefix is empty or only made of 0xff bytes)"""
+    prefix = prefix.rstrip(b"\xff")
+    if not prefix:
+        return None
+    return prefix[:-1] + bytes([prefix[-1] + 1])
+
+
 @dataclasses.dataclass(frozen=True)
 class BlockHandle:
     """See: https://github.com/google/leveldb/blob/master/doc/table_format.md
@@ -149,6 +165,11 @@ class Record:
             state = KeyState.Unknown
         return cls(key, value, seq, state, FileType.Ldb, origin_file, offset, was_compressed)
 
+    @property
+    def sort_key(self) -> typing.Tuple[bytes, int]:
+        """Key ordering records by user key (bytewise), then from the newest to the oldest sequence number"""
+        return self.user_key, -self.seq
+
     @classmethod
     def log_record(cls, key: bytes, value: bytes, seq: int, state: KeyState,
                    origin_file: os.PathLike, offset: int):
@@ -198,6 +219,46 @@ class Block:
                 yield RawBlockEntry(key, value, start_offset)
 
 
+class BlockCache:
+    """Least recently used cache of the blocks read from table files, shared by the LdbFile objects so that the
+    memory used is bounded by max_size bytes of block data however many files are open. Blocks are cached by the
+    path of their file and their offset, as their decompressed data and whether they were compressed, so that the
+    cache does not keep the LdbFile objects, and their open files, of the databases which are not closed."""
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._blocks = OrderedDict()
+        self._size = 0
+
+    def get(self, path: pathlib.Path, offset: int) -> typing.Optional[typing.Tuple[bytes, bool]]:
+        cached = self._blocks.get((path, offset))
+        if cached is not None:
+            self._blocks.move_to_end((path, offset))
+        return cached
+
+    def put(self, path: pathlib.Path, offset: int, raw: bytes, was_compressed: bool):
+        if len(raw) > self.max_size:
+            return
+        previous = self._blocks.pop((path, offset), None)
+        if previous is not None:
+            self._size -= len(previous[0])
+        self._blocks[(path, offset)] = raw, was_compressed
+        self._size += len(raw)
+        while self._size > self.max_size:
+            key, (evicted, was_compressed) = self._blocks.popitem(last=False)
+            self._size -= len(evicted)
+
+    def discard_file(self, path: pathlib.Path):
+        """Removes the blocks of a file, when it is closed"""
+        for key in [key for key in self._blocks if key[0] == path]:
+            self._size -= len(self._blocks.pop(key)[0])
+
+
+# Decompressed blocks are cached so that iterating a table file again, or reading blocks already read by a
+# lookup, does not read and decompress them again
+BLOCK_CACHE_SIZE = 64 * 1024 * 1024
+block_cache = BlockCache(BLOCK_CACHE_SIZE)
+
+
 class LdbFile:
     """A leveldb table (.ldb or .sst) file."""
     BLOCK_TRAILER_SIZE = 5
@@ -222,6 +283,8 @@ class LdbFile:
             raise ValueError(f"Invalid magic number in {file}")
 
         self._index = self._read_index()
+        # user keys of the index entries, each one is the user key of the last record of its block or greater
+        self._index_user_keys = [key[:-8] if len(key) >= 8 else key for key, handle in self._index]
 
     def _read_block(self, handle: BlockHandle):
         # block is the size in the blockhandle plus the trailer
@@ -239,11 +302,19 @@ class LdbFile:
 
         is_compressed = trailer[0] != 0
         if is_compressed:
-            with io.BytesIO(raw_block) as buff:
-                raw_block = ccl_simplesnappy.decompress(buff)
+            raw_block = ccl_simplesnappy.decompress_bytes(raw_block)
 
         return Block(raw_block, is_compressed, self, handle.offset)
 
+    def _get_block(self, handle: BlockHandle) -> Block:
+        """Returns a data block, from the block cache when it was read recently"""
+        cached = block_cache.get(self.path, handle.offset)
+        if cached is not None:
+            return Block(*cached, self, handle.offset)
+        block = self._read_block(handle)
+        block_cache.put(self.path, handle.offset, block._raw, block.was_compressed)
+        return block
+
     def _read_index(self) -> typing.Tuple[typing.Tuple[bytes, BlockHandle], ...]:
         index_block = self._read_block(self._index_handle)
         # key is earliest key, value is BlockHandle to that data block
@@ -253,14 +324,34 @@ class LdbFile:
     def __iter__(self) -> typing.Iterable[Record]:
         """Iterate Records in this Table file"""
         for block_key, handle in self._index:
-            block = self._read_block(handle)
+            block = self._get_block(handle)
+            for entry in block:
+                yield Record.ldb_record(
+                    entry.key, entry.value, self.path,
+                    block.offset if block.was_compressed else block.offset + entry.block_offset,
+                    block.was_compressed)
+
+    def iterate_range(self, start: typing.Optional[bytes] = None,
+                      end: typing.Optional[bytes] = None) -> typing.Iterable[Record]:
+        """Iterate the Records in this Table file whose user key is from start (inclusive) to end (exclusive), in
+        the order of the file. The blocks before start are found in the index and not read, and the reading stops
+        at end, so the keys must be ordered by the bytewise comparator."""
+        first_block = bisect.bisect_left(self._index_user_keys, start) if start is not None else 0
+        for block_key, handle in self._index[first_block:]:
+            block = self._get_block(handle)
             for entry in block:
+                user_key = entry.key[:-8] if len(entry.key) >= 8 else entry.key
+                if start is not None and user_key < start:
+                    continue
+                if end is not None and user_key >= end:
+                    return
                 yield Record.ldb_record(
                     entry.key, entry.value, self.path,
                     block.offset if block.was_compressed else block.offset + entry.block_offset,
                     block.was_compressed)
 
     def close(self):
+        block_cache.discard_file(self.path)
         self._f.close()
 
 
@@ -475,7 +566,10 @@ class ManifestFile:
         self.path = path
 
         self.file_to_level = {}
+        self.comparator = None
         for edit in self:
+            if edit.comparator is not None:
+                self.comparator = edit.comparator
             if edit.new_files:
                 for nf in edit.new_files:
                     self.file_to_level[nf.file_no] = nf.level
@@ -559,6 +653,8 @@ class RawLevelDb:
                     latest_manifest = (manifest_no, file)
 
         self.manifest = ManifestFile(latest_manifest[1]) if latest_manifest[1] is not None else None
+        # records of the log files by user key, see _get_log_records
+        self._log_records = {}
 
     def __enter__(self):
         return self
@@ -570,10 +666,83 @@ class RawLevelDb:
     def in_dir_path(self) -> pathlib.Path:
         return self._in_dir
 
+    @property
+    def is_bytewise_ordered(self) -> bool:
+        """True if the keys are ordered by the default bytewise comparator (assumed if there is no manifest), the
+        ranges of keys are then looked up in the index of the table files rather than scanned"""
+        return self.manifest is None or self.manifest.comparator in (None, BYTEWISE_COMPARATOR)
+
     def iterate_records_raw(self, *, reverse=False) -> typing.Iterable[Record]:
         for file_containing_records in sorted(self._files, reverse=reverse, key=lambda x: x.file_no):
             yield from file_containing_records
 
+    def _get_log_records(self, log_file: LogFile) -> typing.Tuple[typing.List[bytes], typing.List[int],
+                                                                  typing.List[Record]]:
+        """Returns the records of a log file, read once, and the user keys and indexes of the records sorted by
+        user key"""
+        if log_file not in self._log_records:
+            records = list(log_file)
+            indexes = sorted(range(len(records)), key=lambda x: records[x].user_key)
+            self._log_records[log_file] = [records[index].user_key for index in indexes], indexes, records
+        return self._log_records[log_file]
+
+    def _iterate_file_range(self, file_containing_records: typing.Union[LdbFile, LogFile],
+                            start: typing.Optional[bytes], end: typing.Optional[bytes], *,
+                            ordered: bool) -> typing.Iterable[Record]:
+        """Iterate the Records of a file whose user key is from start (inclusive) to end (exclusive), in the order
+        of the file, or ordered by Record.sort_key if ordered is True"""
+        if isinstance(file_containing_records, LogFile):
+            user_keys, indexes, records = self._get_log_records(file_containing_records)
+            first = bisect.bisect_left(user_keys, start) if start is not None else 0
+            last = bisect.bisect_left(user_keys, end) if end is not None else len(user_keys)
+            records = [records[index] for index in sorted(indexes[first:last])]
+            yield from sorted(records, key=lambda x: x.sort_key) if ordered else records
+        elif self.is_bytewise_ordered:
+            yield from file_containing_records.iterate_range(start, end)
+        else:
+            records = (record for record in file_containing_records
+                       if (start is None or record.user_key >= start) and (end is None or record.user_key < end))
+            yield from sorted(records, key=lambda x: x.sort_key) if ordered else records
+
+    def iterate_records_raw_by_range(self, start: typing.Optional[bytes] = None, end: typing.Optional[bytes] = None,
+                                     *, reverse=False) -> typing.Iterable[Record]:
+        """Iterate the Records, live and deleted, whose user key is from start (inclusive) to end (exclusive), in
+        the same order as iterate_records_raw. Only the data blocks of the table files which can contain these
+        keys are read."""
+        for file_containing_records in sorted(self._files, reverse=reverse, key=lambda x: x.file_no):
+            yield from self._iterate_file_range(file_containing_records, start, end, ordered=False)
+
+    def iterate_records_raw_by_prefix(self, prefix: bytes, *, reverse=False) -> typing.Iterable[Record]:
+        """Iterate the Records, live and deleted, whose user key starts with prefix, in the same order as
+        iterate_records_raw"""
+        return self.iterate_records_raw_by_range(prefix, get_prefix_end(prefix), reverse=reverse)
+
+    def get_records_raw(self, user_key: bytes, *, reverse=False) -> typing.List[Record]:
+        """Returns the Records, live and deleted, of a user key, in the same order as iterate_records_raw"""
+        return list(self.iterate_records_raw_by_range(user_key, user_key + b"\x00", reverse=reverse))
+
+    def iterate_live_records(self, start: typing.Optional[bytes] = None,
+                             end: typing.Optional[bytes] = None) -> typing.Iterable[Record]:
+        """Iterate the current Record of each user key from start (inclusive) to end (exclusive), in user key
+        order: the records of all the log and table files are merged, and for each user key the record with the
+        highest sequence number is yielded unless it is a deletion."""
+        merged = heapq.merge(
+            *(self._iterate_file_range(file_containing_records, start, end, ordered=True)
+              for file_containing_records in self._files),
+            key=lambda x: x.sort_key)
+        for user_key, records in itertools.groupby(merged, key=lambda x: x.user_key):
+            record = next(records)
+            if record.state != KeyState.Deleted:
+                yield record
+
+    def iterate_live_records_by_prefix(self, prefix: bytes) -> typing.Iterable[Record]:
+        """Iterate the current Record of each user key starting with prefix, in user key order"""
+        return self.iterate_live_records(prefix, get_prefix_end(prefix))
+
+    def get_live_record(self, user_key: bytes) -> typing.Optional[Record]:
+        """Returns the current Record of a user key, or None if it has none or it was deleted"""
+        return next(iter(self.iterate_live_records(user_key, user_key + b"\x00")), None)
+
     def close(self):
         for file in self._files:
             file.close()
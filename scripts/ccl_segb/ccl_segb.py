@@ -23,15 +23,13 @@ import os
 import pathlib
 from . import ccl_segb1
 from . import ccl_segb2
+from . import ccl_segb_mmap
 
 
 def read_segb_file(file_path: pathlib.Path | os.PathLike | str):
-    if ccl_segb1.file_matches_segbv1_signature(file_path):
-        return ccl_segb1.read_segb1_file(file_path)
-    elif ccl_segb2.file_matches_segbv2_signature(file_path):
-        return ccl_segb2.read_segb2_file(file_path)
-    else:
-        raise ValueError("File is not a SEGB File", file_path)
+    # The file is memory-mapped, the entries are the same as the ones of the stream readers of
+    # ccl_segb1 and ccl_segb2
+    return ccl_segb_mmap.read_segb_file(file_path)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,239 @@
+"""
+Memory-mapped reader for SEGB v1 and v2 files.
+
+Each file is mapped once. The headers and the trailer are unpacked in place, and the data of
+each record is a memoryview of the mapping, so it is not copied (see iter_segb_records). The
+entries yielded by read_segb_file are the same as the ones of the ccl_segb1 and ccl_segb2
+stream readers.
+
+read_segb_files reads many SEGB files and returns the records of all of them in timestamp order.
+"""
+
+import mmap
+import os
+import pathlib
+import struct
+import typing
+import zlib
+
+from . import ccl_segb1
+from . import ccl_segb2
+from .ccl_segb_common import decode_cocoa_time, EntryState
+
+SEGB1_RECORD_HEADER = struct.Struct("<iiddIi")
+SEGB2_HEADER = struct.Struct("<4sid16s")
+SEGB2_TRAILER_ENTRY = struct.Struct("<2id")
+SEGB2_ENTRY_HEADER = struct.Struct("<Ii")
+
+
+class SegbRecordView:
+    """
+    A record of a SEGB file whose data is a memoryview of the mapped file. The view is only valid
+    until the file is closed, once all its records are read; to_entry() copies the data.
+    """
+    __slots__ = ("version", "state", "timestamp1", "timestamp2", "data_start_offset", "metadata_crc", "data",
+                 "unknown_value", "metadata")
+
+    def __init__(self, version, state, timestamp1, timestamp2, data_start_offset, metadata_crc, data,
+                 unknown_value, metadata=None):
+        self.version = version
+        self.state = state
+        self.timestamp1 = timestamp1
+        self.timestamp2 = timestamp2
+        self.data_start_offset = data_start_offset
+        self.metadata_crc = metadata_crc
+        self.data = data
+        self.unknown_value = unknown_value
+        self.metadata = metadata  # trailer entry of SEGB v2 records
+
+    @property
+    def actual_crc(self):
+        return zlib.crc32(self.data)
+
+    @property
+    def crc_passed(self):
+        return self.metadata_crc == self.actual_crc
+
+    def to_entry(self) -> ccl_segb1.Segb1Entry | ccl_segb2.Segb2Entry:
+        """
+        Returns the record as the entry yielded by the ccl_segb1 or ccl_segb2 readers, with its data copied
+        """
+        if self.version == 1:
+            return ccl_segb1.Segb1Entry(
+                self.timestamp1, self.timestamp2, self.data_start_offset, self.metadata_crc, self.actual_crc,
+                bytes(self.data), self.state, _unknown_value=self.unknown_value)
+        return ccl_segb2.Segb2Entry(
+            self.metadata, self.data_start_offset, self.metadata_crc, self.actual_crc, bytes(self.data),
+            _unknown_value=self.unknown_value)
+
+
+class SegbFileRecord(typing.NamedTuple):
+    """
+    A record returned by read_segb_files: the file it was read from and the value returned for it
+    by decode_record
+    """
+    timestamp: object
+    file_path: str
+    data_start_offset: int
+    value: object
+
+
+def get_segb_version(buffer) -> int | None:
+    """
+    Returns the version of the SEGB data in buffer, 1 or 2, or None if it is not SEGB data
+    """
+    if len(buffer) >= ccl_segb1.HEADER_LENGTH and buffer[ccl_segb1.HEADER_LENGTH - 4:ccl_segb1.HEADER_LENGTH] == ccl_segb1.MAGIC:
+        return 1
+    if len(buffer) >= ccl_segb2.HEADER_LENGTH and buffer[0:4] == ccl_segb2.MAGIC:
+        return 2
+    return None
+
+
+def iter_segb1_records(view: memoryview) -> typing.Iterable[SegbRecordView]:
+    end_of_data_offset, = struct.unpack_from("<I", view, 0)
+    size = len(view)
+    offset = ccl_segb1.HEADER_LENGTH
+
+    while offset < end_of_data_offset:
+        record_length, entry_state_raw, timestamp1_raw, timestamp2_raw, crc32_stored, unknown_raw = \
+            SEGB1_RECORD_HEADER.unpack(view[offset:offset + ccl_segb1.RECORD_HEADER_LENGTH])
+        record_offset = offset + ccl_segb1.RECORD_HEADER_LENGTH
+        # A negative length reads up to the end of the file, like stream.read() does
+        record_end = min(record_offset + record_length, size) if record_length >= 0 else size
+        yield SegbRecordView(1, EntryState(entry_state_raw), decode_cocoa_time(timestamp1_raw),
+                             decode_cocoa_time(timestamp2_raw), record_offset, crc32_stored,
+                             view[record_offset:record_end], unknown_raw)
+
+        # align to 8 bytes
+        offset = max(record_end, record_offset)
+        if (remainder := offset % ccl_segb1.ALIGNMENT_BYTES_LENGTH) != 0:
+            offset += ccl_segb1.ALIGNMENT_BYTES_LENGTH - remainder
+
+
+def iter_segb2_records(view: memoryview) -> typing.Iterable[SegbRecordView]:
+    magic_number, entries_count, creation_timestamp_raw, unknown_padding = SEGB2_HEADER.unpack_from(view, 0)
+    size = len(view)
+
+    trailer_offset = size - ccl_segb2.TRAILER_ENTRY_LENGTH * entries_count
+    if entries_count < 0 or trailer_offset < 0:
+        raise ValueError(f"Invalid number of entries in SEGB v2 header: {entries_count}")
+    trailer_list = [
+        ccl_segb2.EntryMetadata(trailer_offset + index * ccl_segb2.TRAILER_ENTRY_LENGTH, entry_end_offset,
+                                EntryState(entry_state_raw), decode_cocoa_time(entry_timestamp_raw))
+        for index, (entry_end_offset, entry_state_raw, entry_timestamp_raw)
+        in enumerate(SEGB2_TRAILER_ENTRY.iter_unpack(view[trailer_offset:]))]
+
+    # go through the trailer list in order of offset:
+    trailer_list.sort(key=lambda x: x.end_offset)
+    offset = ccl_segb2.HEADER_LENGTH
+    for trailer_entry in trailer_list:
+        # State 4 is an empty record
+        if trailer_entry.state == 4:
+            continue
+
+        # NB end offset is relative to the start of entry area, a negative length reads up to
+        # the end of the file like stream.read() does
+        entry_length = trailer_entry.end_offset - offset + ccl_segb2.HEADER_LENGTH
+        entry_end = min(offset + entry_length, size) if entry_length >= 0 else size
+        crc32_stored, unknown_raw = SEGB2_ENTRY_HEADER.unpack(
+            view[offset:min(offset + ccl_segb2.ENTRY_HEADER_LENGTH, entry_end)])
+        yield SegbRecordView(2, trailer_entry.state, trailer_entry.creation, None, offset, crc32_stored,
+                             view[offset + ccl_segb2.ENTRY_HEADER_LENGTH:entry_end], unknown_raw, trailer_entry)
+
+        # align to 4 bytes
+        offset = max(entry_end, offset)
+        if (remainder := trailer_entry.end_offset % 4) != 0:
+            offset += 4 - remainder
+
+
+def open_segb_file(path: pathlib.Path | os.PathLike | str) -> tuple[mmap.mmap, int]:
+    """
+    Maps a SEGB file in memory and returns the mapping and the SEGB version of the file
+
+    :param path: the path of the file to be mapped
+    :return: the mapping, to be closed by the caller, and the version, 1 or 2
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < ccl_segb2.HEADER_LENGTH:
+            raise ValueError("File is not a SEGB File", path)
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    version = get_segb_version(mapping)
+    if version is None:
+        mapping.close()
+        raise ValueError("File is not a SEGB File", path)
+    return mapping, version
+
+
+def iter_mapped_records(mapping: mmap.mmap, version: int) -> typing.Iterable[SegbRecordView]:
+    """
+    Yields the records of a file mapped by open_segb_file and closes the mapping once they are all read
+    """
+    view = memoryview(mapping)
+    try:
+        yield from iter_segb1_records(view) if version == 1 else iter_segb2_records(view)
+    finally:
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            # Views of records are still referenced, the file is unmapped once they are released
+            pass
+
+
+def iter_segb_records(path: pathlib.Path | os.PathLike | str) -> typing.Iterable[SegbRecordView]:
+    """
+    Reads a SEGB v1 or v2 file and yields a SegbRecordView for each record, their data not being copied
+
+    :param path: the path of the file to be read
+    :return: an iterable of SegbRecordView objects
+    """
+    return iter_mapped_records(*open_segb_file(path))
+
+
+def read_segb_file(path: pathlib.Path | os.PathLike | str) -> typing.Iterable[ccl_segb1.Segb1Entry | ccl_segb2.Segb2Entry]:
+    """
+    Reads a SEGB v1 or v2 file and yields a Segb1Entry or Segb2Entry object for each record. Raises
+    ValueError if the file is not a SEGB file.
+
+    :param path: the path of the file to be read
+    :return: an iterable of Segb1Entry or Segb2Entry objects
+    """
+    return (record.to_entry() for record in iter_segb_records(path))
+
+
+def to_entry(record: SegbRecordView):
+    return record.to_entry()
+
+
+def read_segb_file_records(path: str, decode_record: typing.Callable) -> list[tuple]:
+    """
+    Returns the timestamp, offset and value returned by decode_record of the records of a SEGB file,
+    those for which it returns None being left out
+    """
+    records = []
+    for record in iter_segb_records(path):
+        value = decode_record(record)
+        if value is not None:
+            records.append((record.timestamp1, record.data_start_offset, value))
+    return records
+
+
+def read_segb_files(paths: typing.Iterable[pathlib.Path | os.PathLike | str],
+                    decode_record: typing.Callable = to_entry) -> list[SegbFileRecord]:
+    """
+    Reads many SEGB files and returns their records in timestamp order. decode_record is called with
+    the SegbRecordView of each record, while its file is mapped, and what it returns is kept as the
+    value of the record. Records for which it returns None are left out.
+
+    :param paths: the paths of the files to be read
+    :param decode_record: returns the value kept for a record, by default its Segb1Entry or Segb2Entry
+    :return: a list of SegbFileRecord, sorted by timestamp, then by file and offset
+    """
+    paths = [str(path) for path in paths]
+    file_records = [read_segb_file_records(path, decode_record) for path in paths]
+
+    records = [(timestamp, file_index, offset, value)
+               for file_index, records in enumerate(file_records) for timestamp, offset, value in records]
+    records.sort(key=lambda record: record[:3])
+    return [SegbFileRecord(timestamp, paths[file_index], offset, value)
+            for timestamp, file_index, offset, value in records]
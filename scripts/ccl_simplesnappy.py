@@ -26,6 +26,12 @@ import io
 import typing
 import enum
 
+try:
+    # Optional native implementation (python-snappy), used when it is installed
+    import snappy as native_snappy
+except ImportError:
+    native_snappy = None
+
 __version__ = "0.1"
 __description__ = "Pure Python reimplementation of Google's Snappy decompression"
 __contact__ = "Alex Caithness"
@@ -101,8 +107,9 @@ def read_byte(stream: typing.BinaryIO) -> typing.Optional[int]:
     return None
 
 
-def decompress(data: typing.BinaryIO) -> bytes:
-    """Decompresses the snappy compressed data stream"""
+def decompress_stream(data: typing.BinaryIO) -> bytes:
+    """Decompresses the snappy compressed data stream, reading it element by element. This is the reference
+    implementation of the decompression, decompress_bytes is used by decompress."""
     uncompressed_length = read_le_varint(data)
     log(f"Uncompressed length: {uncompressed_length}")
 
@@ -189,6 +196,102 @@ def decompress(data: typing.BinaryIO) -> bytes:
     return result
 
 
+def _decompress_python(data: typing.Union[bytes, bytearray, memoryview]) -> bytes:
+    """Decompresses snappy compressed data, working on the whole buffer: the literals and the backreferences are
+    copied as slices rather than read from a stream"""
+    data = bytes(data)
+    data_length = len(data)
+
+    uncompressed_length = 0
+    pos = 0
+    shift = 0
+    while True:
+        if pos >= data_length or shift >= 70:
+            raise ValueError("Couldn't read the uncompressed length")
+        byte = data[pos]
+        pos += 1
+        uncompressed_length |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+
+    out = bytearray()
+    out_length = 0
+    while pos < data_length:
+        type_byte = data[pos]
+        pos += 1
+        tag = type_byte & 0x03
+
+        if tag == 0:  # ElementType.Literal
+            length = (type_byte >> 2) + 1
+            if length > 60:
+                # length of the length in the following 1 to 4 bytes
+                length_size = length - 60
+                if pos + length_size > data_length:
+                    raise ValueError("Couldn't read the literal length")
+                length = int.from_bytes(data[pos:pos + length_size], "little") + 1
+                pos += length_size
+            if pos + length > data_length:
+                raise ValueError("Couldn't read enough literal data")
+            out += data[pos:pos + length]
+            pos += length
+            out_length += length
+            continue
+
+        if tag == 1:  # ElementType.CopyOneByte
+            if pos >= data_length:
+                raise ValueError("Couldn't read the backreference offset")
+            length = ((type_byte >> 2) & 0x07) + 4
+            offset = ((type_byte >> 5) << 8) | data[pos]
+            pos += 1
+        elif tag == 2:  # ElementType.CopyTwoByte
+            if pos + 2 > data_length:
+                raise ValueError("Couldn't read the backreference offset")
+            length = (type_byte >> 2) + 1
+            offset = data[pos] | (data[pos + 1] << 8)
+            pos += 2
+        else:  # ElementType.CopyFourByte
+            if pos + 4 > data_length:
+                raise ValueError("Couldn't read the backreference offset")
+            length = (type_byte >> 2) + 1
+            offset = int.from_bytes(data[pos:pos + 4], "little")
+            pos += 4
+
+        if offset == 0:
+            raise ValueError("Offset cannot be 0")
+        if offset > out_length:
+            raise ValueError("Backreference offset is before the start of the uncompressed data")
+
+        start = out_length - offset
+        if offset >= length:
+            out += out[start:start + length]
+        else:
+            # the backreference overlaps the data it writes: its last offset bytes are repeated
+            out += (out[start:] * (length // offset + 1))[:length]
+        out_length += length
+
+    if uncompressed_length != out_length:
+        raise ValueError("Wrong data length in uncompressed data")
+
+    return bytes(out)
+
+
+def decompress_bytes(data: typing.Union[bytes, bytearray, memoryview]) -> bytes:
+    """Decompresses snappy compressed data, with the native implementation when it is installed"""
+    if native_snappy is not None:
+        try:
+            return native_snappy.decompress(bytes(data))
+        except Exception:
+            # The pure Python decompression raises the ValueError for invalid data
+            pass
+    return _decompress_python(data)
+
+
+def decompress(data: typing.BinaryIO) -> bytes:
+    """Decompresses the snappy compressed data stream"""
+    return decompress_bytes(data.read())
+
+
 def main(path):
     import pathlib
     import hashlib
@@ -111,6 +111,8 @@ body_sidebar_dynamic_data = \
                         </li>
 """
 body_sidebar_dynamic_data_placeholder = '<!--__INSERT-NAV-BAR-DATA-HERE__-->'
+# Sidebar data of artifact pages, shared by all the pages of the report, see nav_js
+body_sidebar_nav_script = '<script src="nav.js"></script>'
 body_sidebar_trailer = \
 """
                     </ul>
@@ -309,6 +311,30 @@ nav_bar_script = \
     </script>
 """
 
+# Written to _HTML/nav.js by report.generate_report() with the sidebar data as a JS string.
+# Writes the sidebar where the script tag is, marks the link to the current page as active and
+# restores the scroll position of the sidebar (see nav_bar_script).
+nav_js = \
+"""document.write({0});
+(function() {{
+    var page = decodeURIComponent(window.location.pathname.split('/').pop());
+    var links = document.querySelectorAll('#sidebar_id a.nav-link');
+    for (var i = 0; i < links.length; i++) {{
+        if (links[i].getAttribute('href') === page) {{
+            links[i].classList.add('active');
+        }}
+    }}
+    feather.replace();
+    var element = document.getElementById("sidebar_id");
+    var searchParams = new URLSearchParams(window.location.search);
+    if (searchParams.has('navpos')) {{
+        var nav_pos = parseInt(searchParams.get('navpos'));
+        if (!isNaN(nav_pos))
+            element.scrollTop = nav_pos;
+    }}
+}})();
+"""
+
 nav_bar_script_footer = \
 """
     <script>
@@ -334,6 +360,7 @@ default_responsive_table_script = \
                 //"scrollX": "10%",
                 //"scrollCollapse": true,
                 "aLengthMenu": [[ 15, 50, 100, -1 ], [ 15, 50, 100, "All" ]],
+                "deferRender": true,
             });
             $('.dataTables_length').addClass('bs-select');
             $('#mySpinner').remove();
@@ -342,6 +369,49 @@ default_responsive_table_script = \
     </script>
 """
 
+# Loads the rows of a table written to data shards by ArtifactHtmlReport, one shard after the other.
+# Each shard is a script calling addDataShard() with its rows, which works for pages opened from
+# the file system where the data can't be fetched. Only the rows of the page shown are rendered.
+data_shards_loader_script = \
+"""
+    <script>
+        var dataShardTables = {};
+        function addDataShard(tableId, rows) {
+            var shards = dataShardTables[tableId];
+            shards.table.rows.add(rows).draw(false);
+            loadNextDataShard(tableId);
+        }
+        function loadNextDataShard(tableId) {
+            var shards = dataShardTables[tableId];
+            if (shards.next >= shards.urls.length) {
+                $('#' + tableId + '-loading').remove();
+                return;
+            }
+            var script = document.createElement('script');
+            script.src = shards.urls[shards.next++];
+            script.charset = 'utf-8';
+            document.body.appendChild(script);
+        }
+        function loadDataShards(tableId, urls) {
+            // The table is initialized by the other scripts of the page first
+            setTimeout(function() {
+                var selector = '#' + tableId;
+                var table = $.fn.dataTable.isDataTable(selector) ? $(selector).DataTable() : $(selector).DataTable({"deferRender": true});
+                dataShardTables[tableId] = {table: table, urls: urls, next: 0};
+                loadNextDataShard(tableId);
+            }, 0);
+        }
+    </script>
+"""
+data_shards_script = \
+"""
+    <script>
+        $(document).ready(function() {{
+            loadDataShards({table_id}, {shard_urls});
+        }});
+    </script>
+"""
+
 page_footer = \
 """
     </body>
@@ -1,5 +1,7 @@
 # common standard imports
+import atexit
 import codecs
+import concurrent.futures
 import csv
 import hashlib
 import inspect
@@ -26,14 +28,23 @@ import pytz
 import simplekml
 from scripts.filetype import guess_mime, guess_extension
 from functools import wraps
+from itertools import islice
+from time import perf_counter
 
 # LEAPP version unique imports
 import binascii
 from PIL import Image
 
+try:
+    # Optional, needed for the Parquet exports only
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
 from scripts.lavafuncs import lava_process_artifact, lava_insert_sqlite_data, lava_get_media_item, \
     lava_insert_sqlite_media_item, lava_insert_sqlite_media_references, lava_get_media_references, \
-    lava_get_full_media_info
+    lava_get_full_media_info, lava_get_full_media_infos, lava_set_record_count, lava_flush_media
 
 os.path.basename = lru_cache(maxsize=None)(os.path.basename)
 
@@ -44,6 +55,10 @@ thumb_size = 256, 256
 identifiers = {}
 icons = {}
 lava_only_artifacts = {}
+# Seconds spent writing each output type by the last call to write_output()
+output_times = {}
+# Parquet exports of all the artifacts, not only of those listing 'parquet' in their output types
+parquet_export = False
 
 class iOS:
     _version = None
@@ -66,7 +81,7 @@ class OutputParameters:
     nl = '\n'
     screen_output_file_path = ''
 
-    def __init__(self, output_folder, custom_folder_name=None):
+    def __init__(self, output_folder, custom_folder_name=None, reuse_folder=False):
         now = datetime.now()
         currenttime = str(now.strftime('%Y-%m-%d_%A_%H%M%S'))
         if custom_folder_name:
@@ -82,8 +97,14 @@ class OutputParameters:
         OutputParameters.screen_output_file_path_lava_only = os.path.join(
             self.report_folder_base, '_HTML', '_Script_Logs', 'Lava_only_artifacts_log.html')
 
-        os.makedirs(os.path.join(self.report_folder_base, '_HTML', '_Script_Logs'))
-        os.makedirs(self.data_folder)
+        if reuse_folder:
+            # Report folder of a previous run, updated by --incremental. Its logs are replaced.
+            for log_path in (OutputParameters.screen_output_file_path, OutputParameters.screen_output_file_path_devinfo,
+                             OutputParameters.screen_output_file_path_lava_only):
+                if os.path.exists(log_path):
+                    os.remove(log_path)
+        os.makedirs(os.path.join(self.report_folder_base, '_HTML', '_Script_Logs'), exist_ok=reuse_folder)
+        os.makedirs(self.data_folder, exist_ok=reuse_folder)
         
 class GuiWindow:
     '''This only exists to hold window handle if script is run from GUI'''
@@ -132,19 +153,105 @@ class MediaReferences():
         self.media_path = media_ref_info[5]
 
 
-def logfunc(message=""):
+# Levels of the messages of logfunc(), messages below log_level are not logged
+LOG_DEBUG = 10
+LOG_INFO = 20
+LOG_WARNING = 30
+LOG_ERROR = 40
+log_level = LOG_INFO
+
+# Screen_Output.html is kept open and written every LOG_FLUSH_INTERVAL seconds, and before
+# forking and reading it (see flush_logs). Worker processes write each message.
+LOG_FLUSH_INTERVAL = 1
+# A message logged more than LOG_REPEAT_LIMIT times in a row is then only counted
+LOG_REPEAT_LIMIT = 5
+
+log_file = None
+log_file_path = ''
+log_file_pid = None
+log_main_pid = os.getpid()
+log_last_flush = 0
+log_last_message = None
+log_repeat_count = 0
+log_gui_window = None
+
+def set_log_level(level):
+    global log_level
+    log_level = level
+
+def write_repeat_count():
+    '''Writes how many times the last message was repeated since it was last written'''
+    global log_repeat_count
+    if log_repeat_count > LOG_REPEAT_LIMIT:
+        repeat_count = log_repeat_count - LOG_REPEAT_LIMIT
+        # Further repeats of the message are counted from here
+        log_repeat_count = LOG_REPEAT_LIMIT
+        write_log_message(f'(Previous message repeated {repeat_count:,} more times)')
+
+def flush_logs():
+    '''Writes the buffered messages and the pending repeat count to Screen_Output.html'''
+    global log_last_flush
+    write_repeat_count()
+    if log_file is not None and log_file_pid == os.getpid():
+        log_file.flush()
+    log_last_flush = perf_counter()
+
+def close_log_file():
+    global log_file
+    if log_file is not None and log_file_pid == os.getpid():
+        log_file.close()
+    log_file = None
+
+def close_logs():
+    write_repeat_count()
+    close_log_file()
+
+def get_log_file():
+    '''Returns the Screen_Output.html file of the current output, opened on first use'''
+    global log_file, log_file_path, log_file_pid
+    if (log_file is None or log_file_path != OutputParameters.screen_output_file_path
+            or log_file_pid != os.getpid()):
+        close_log_file()
+        log_file = open(OutputParameters.screen_output_file_path, 'a', encoding='utf8')
+        log_file_path = OutputParameters.screen_output_file_path
+        log_file_pid = os.getpid()
+    return log_file
+
+def write_log_message(message):
+    global log_gui_window
     def redirect_logs(string):
         log_text.insert('end', string)
         log_text.see('end')
         log_text.update()
 
-    if GuiWindow.window_handle:
+    if GuiWindow.window_handle and GuiWindow.window_handle is not log_gui_window:
         log_text = GuiWindow.window_handle.nametowidget('logs_frame.log_text')
         sys.stdout.write = redirect_logs
+        log_gui_window = GuiWindow.window_handle
+
+    print(message)
+    get_log_file().write(message + '<br>' + OutputParameters.nl)
+    if os.getpid() != log_main_pid or perf_counter() - log_last_flush >= LOG_FLUSH_INTERVAL:
+        flush_logs()
+
+def logfunc(message="", level=LOG_INFO):
+    global log_last_message, log_repeat_count
+    if level < log_level:
+        return
+    if message and message == log_last_message:
+        log_repeat_count += 1
+        if log_repeat_count > LOG_REPEAT_LIMIT:
+            return
+    else:
+        write_repeat_count()
+        log_last_message = message
+        log_repeat_count = 1
+    write_log_message(message)
 
-    with open(OutputParameters.screen_output_file_path, 'a', encoding='utf8') as a:
-        print(message)
-        a.write(message + '<br>' + OutputParameters.nl)
+if hasattr(os, 'register_at_fork'):
+    # Messages buffered before a fork would otherwise be written by both processes
+    os.register_at_fork(before=flush_logs)
+atexit.register(close_logs)
 
 
 def strip_tuple_from_headers(data_headers):
@@ -158,8 +265,18 @@ def get_media_header_info(data_headers):
             media_header_info[index] = style
     return media_header_info
 
+def enable_parquet_export():
+    '''Writes the Parquet export of all the artifacts'''
+    global parquet_export
+    parquet_export = True
+
 def check_output_types(type, output_types):
-    if type in output_types or type == output_types or 'all' in output_types or 'all' == output_types:
+    if type in output_types or type == output_types:
+        return True
+    elif type == 'parquet':
+        # Not part of 'all' or 'standard', only written when enabled for the run
+        return parquet_export and output_types != 'none'
+    elif 'all' in output_types or 'all' == output_types:
         return True
     elif type != 'kml' and ('standard' in output_types or 'standard' == output_types):
         return True
@@ -178,15 +295,56 @@ def set_media_references(media_ref_id, media_id, module_name, artifact_name, nam
     ))
     lava_insert_sqlite_media_references(media_references)
 
+# Media files are copied to the report by a thread pool, the copies are waited for once the
+# output of the artifact is written, see wait_for_media_copies()
+MEDIA_COPY_WORKERS = 8
+media_copy_executor = None
+pending_media_copies = []
+
+# Index of files_found by file name, for the artifact checking in media, see find_media_file()
+media_files_index = (None, 0, {})
+
+def find_media_file(files_found, file_path):
+    '''Returns the first path of files_found matching file_path, like Path(path).match(file_path).
+       Only the paths with the same file name are matched, unless it contains wildcards.'''
+    global media_files_index
+    name = Path(file_path).name
+    if not name or any(char in name for char in '*?['):
+        return next((path for path in files_found if Path(path).match(file_path)), None)
+    indexed_files, indexed_count, index = media_files_index
+    if indexed_files is not files_found or indexed_count != len(files_found):
+        index = {}
+        for path in files_found:
+            index.setdefault(os.path.normcase(os.path.basename(path)), []).append(path)
+        media_files_index = (files_found, len(files_found), index)
+    return next((path for path in index.get(os.path.normcase(name), []) if Path(path).match(file_path)), None)
+
+def copy_media_file(source, destination):
+    try:
+        destination.hardlink_to(source)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def wait_for_media_copies():
+    '''Waits for the media files being copied to the report and inserts the batched media items
+       and references'''
+    for future in pending_media_copies:
+        try:
+            future.result()
+        except Exception as ex:
+            logfunc(f'Could not copy media file: {ex}')
+    pending_media_copies.clear()
+    lava_flush_media()
+
 def check_in_media(file_path, name="", converted_file_path=False):
+    global media_copy_executor
     report_folder = Context.get_report_folder()
     seeker = Context.get_seeker()
     files_found = Context.get_files_found()
     module_name = Context.get_module_name()
     artifact_name = Context.get_artifact_name()
 
-    extraction_path = next(
-        (path for path in files_found if Path(path).match(file_path)), None)
+    extraction_path = find_media_file(files_found, file_path)
     file_info = seeker.file_infos.get(extraction_path)
     if file_info:
         extraction_path = converted_file_path if converted_file_path else Path(extraction_path)
@@ -197,10 +355,9 @@ def check_in_media(file_path, name="", converted_file_path=False):
             if lava_media_ref:
                 return media_ref_id
             media_path = Path(report_folder).joinpath(media_ref_id).with_suffix(extraction_path.suffix)
-            try:
-                media_path.hardlink_to(extraction_path)
-            except OSError:
-                shutil.copy2(extraction_path, media_path)
+            if media_copy_executor is None:
+                media_copy_executor = concurrent.futures.ThreadPoolExecutor(max_workers=MEDIA_COPY_WORKERS)
+            pending_media_copies.append(media_copy_executor.submit(copy_media_file, extraction_path, media_path))
             lava_media_item = lava_get_media_item(media_id)
             if not lava_media_item:
                 media_item = MediaItem(media_id)
@@ -214,10 +371,10 @@ def check_in_media(file_path, name="", converted_file_path=False):
             set_media_references(media_ref_id, media_id, module_name, artifact_name, name, media_path)
             return media_ref_id
         else:
-            logfunc(f"{extraction_path} is not a file")
+            logfunc(f"{extraction_path} is not a file", LOG_WARNING)
             return None            
     else:
-        logfunc(f'No matching file found for "{file_path}"')
+        logfunc(f'No matching file found for "{file_path}"', LOG_WARNING)
         return None
 
 def check_in_embedded_media(source_file, data, name=""):
@@ -292,63 +449,94 @@ def get_data_list_with_media(media_header_info, data_list):
       - A data list with HTML code for HTML output
       - A data list with extraaction path of media items for TSV, KML and Timeline exports  
     '''
+    # The media info of all the media items of the rows is fetched at once
+    media_ref_ids = set()
+    for data in data_list:
+        for idx in media_header_info:
+            media_ref_id = data[idx]
+            if isinstance(media_ref_id, list):
+                media_ref_ids.update(media_ref_id)
+            elif media_ref_id:
+                media_ref_ids.add(media_ref_id)
+    media_items = lava_get_full_media_infos(media_ref_ids) if media_ref_ids else {}
+
     html_data_list = []
     txt_data_list = []
     for data in data_list:
         html_data = list(data)
         txt_data = list(data)
         for idx, style in media_header_info.items():
-            if html_data[idx]:
-                media_ref_id = html_data[idx]
-                if isinstance(media_ref_id, list):
-                    html_code = ''
-                    path_list = []
-                    for item in media_ref_id:
-                        media_item = lava_get_full_media_info(item)
-                        html_code += html_media_tag(
-                            media_item['media_path'], media_item['type'], style, media_item['name'])
-                        path_list.append(media_item[6])
-                    txt_code = ' | '.join(path_list)
-                else:
-                    media_item = lava_get_full_media_info(media_ref_id)
-                    html_code = html_media_tag(media_item['media_path'], media_item['type'], style, media_item['name'])
-                    txt_code = media_item[6]
-                html_data[idx] = html_code
-                txt_data[idx] = txt_code
-            else:
-                html_data[idx] = ''
-                txt_data[idx] = ''
+            media_ref_id = html_data[idx]
+            html_code = txt_code = ''
+            if media_ref_id:
+                path_list = []
+                for item in media_ref_id if isinstance(media_ref_id, list) else (media_ref_id,):
+                    media_item = media_items.get(item)
+                    if media_item is None:
+                        continue
+                    html_code += html_media_tag(media_item['media_path'], media_item['type'], style, media_item['name'])
+                    path_list.append(media_item['source_path'])
+                txt_code = ' | '.join(path_list)
+            html_data[idx] = html_code
+            txt_data[idx] = txt_code
         html_data_list.append(tuple(html_data))
         txt_data_list.append(tuple(txt_data))
     return html_data_list, txt_data_list
 
+# Rows yielded by an artifact are written to the outputs in chunks of this size
+OUTPUT_CHUNK_SIZE = 10000
+
+def add_output_time(output_type, start):
+    '''Adds the time elapsed since start to the time spent writing output_type'''
+    output_times[output_type] = output_times.get(output_type, 0) + perf_counter() - start
+
+def get_row_chunks(data_list):
+    '''Returns the data list of an artifact in chunks. Lists are a single chunk, other
+       iterables (e.g. generators yielding rows) are read OUTPUT_CHUNK_SIZE rows at a time.'''
+    if isinstance(data_list, list):
+        if data_list:
+            yield data_list
+        return
+    rows = iter(data_list)
+    while chunk := list(islice(rows, OUTPUT_CHUNK_SIZE)):
+        yield chunk
+
 def artifact_processor(func):
-    @wraps(func)
-    def wrapper(files_found, report_folder, seeker, wrap_text, timezone_offset):
-        module_name = func.__module__.split('.')[-1]
-        func_name = func.__name__
-        module_file_path = inspect.getfile(func)
+    '''Decorator running an artifact and writing its data to all the output types.
+       Both steps are also exposed on the wrapper as run_artifact() and write_output()
+       so that the artifact can be run in a worker process and its output written by
+       the main process.
+    '''
+    module_name = func.__module__.split('.')[-1]
+    func_name = func.__name__
 
+    def get_artifact_info():
         all_artifacts_info = func.__globals__.get('__artifacts_v2__', {})
-        artifact_info = all_artifacts_info.get(func_name, {})
+        return all_artifacts_info.get(func_name, {})
 
+    def run_artifact(files_found, report_folder, seeker, wrap_text, timezone_offset):
+        module_file_path = inspect.getfile(func)
+        artifact_info = get_artifact_info()
         artifact_name = artifact_info.get('name', func_name)
-        category = artifact_info.get('category', '')
-        description = artifact_info.get('description', '')
-        icon = artifact_info.get('artifact_icon', '')
-        html_columns = artifact_info.get('html_columns', [])
 
-        output_types = artifact_info.get('output_types', ['html', 'tsv', 'timeline', 'lava', 'kml'])
-        is_lava_only = 'lava_only' in output_types
+        def set_context():
+            Context.set_report_folder(report_folder)
+            Context.set_seeker(seeker)
+            Context.set_files_found(files_found)
+            Context.set_artifact_info(artifact_info)
+            Context.set_module_name(module_name)
+            Context.set_module_file_path(module_file_path)
+            Context.set_artifact_name(artifact_name)
+
+        def rows_in_context(rows):
+            '''Rows yielded by the artifact are produced while its output is written, with its context set'''
+            set_context()
+            try:
+                yield from rows
+            finally:
+                Context.clear()
 
-        Context.set_report_folder(report_folder)
-        Context.set_seeker(seeker)
-        Context.set_files_found(files_found)
-        Context.set_artifact_info(artifact_info)
-        Context.set_module_name(module_name)
-        Context.set_module_file_path(module_file_path)
-        Context.set_artifact_name(artifact_name)
-        
+        set_context()
         try:
             sig = inspect.signature(func)
             if len(sig.parameters) == 1:
@@ -357,62 +545,137 @@ def artifact_processor(func):
                 data_headers, data_list, source_path = func(files_found, report_folder, seeker, wrap_text, timezone_offset)
         finally:
             Context.clear()
-        
+        if not isinstance(data_list, (list, tuple)):
+            data_list = rows_in_context(data_list)
+        return data_headers, data_list, source_path
+
+    def write_output(report_folder, data_headers, data_list, source_path):
+        artifact_info = get_artifact_info()
+        artifact_name = artifact_info.get('name', func_name)
+        category = artifact_info.get('category', '')
+        description = artifact_info.get('description', '')
+        icon = artifact_info.get('artifact_icon', '')
+        html_columns = artifact_info.get('html_columns', [])
+
+        output_types = artifact_info.get('output_types', ['html', 'tsv', 'timeline', 'lava', 'kml'])
+        is_lava_only = 'lava_only' in output_types
+
         if not source_path:
             logfunc(f"No file found")
+            return 0
 
-        elif len(data_list):
-            if isinstance(data_list, tuple):
-                data_list, html_data_list = data_list
-            else:
-                html_data_list = data_list
-            logfunc(f"Found {len(data_list):,} {'records' if len(data_list)>1 else 'record'} for {artifact_name}")
-            icons.setdefault(category, {artifact_name: icon}).update({artifact_name: icon})
-
-            # Strip tuples from headers for HTML, TSV, and timeline
-            stripped_headers = strip_tuple_from_headers(data_headers)
-
-            # Check if headers contains a 'media' type
-            media_header_info = get_media_header_info(data_headers)
-            if media_header_info:
-                html_columns.extend([data_headers[idx][0] for idx in media_header_info])
-                html_data_list, txt_data_list = get_data_list_with_media(media_header_info, data_list)
-
-            if check_output_types('html', output_types):
-                report = artifact_report.ArtifactHtmlReport(artifact_name)
-                report.start_artifact_report(report_folder, artifact_name, description)
-                report.add_script()
-                report.write_artifact_data_table(stripped_headers, html_data_list, source_path, html_no_escape=html_columns)
-                report.end_artifact_report()
+        if isinstance(data_list, tuple):
+            data_list, html_data_list = data_list
+            chunks = [(data_list, html_data_list)] if len(data_list) else []
+        else:
+            chunks = ((chunk, chunk) for chunk in get_row_chunks(data_list))
+        # The number of records of artifacts yielding their rows is only known once all are written
+        known_count = len(data_list) if isinstance(data_list, list) else None
 
-            if check_output_types('tsv', output_types):
-                tsv(report_folder, stripped_headers, txt_data_list if media_header_info else data_list, artifact_name)
+        # Strip tuples from headers for HTML, TSV, and timeline
+        stripped_headers = strip_tuple_from_headers(data_headers)
 
-            if check_output_types('timeline', output_types):
-                timeline(report_folder, artifact_name, txt_data_list if media_header_info else data_list, stripped_headers)
+        # Check if headers contains a 'media' type
+        media_header_info = get_media_header_info(data_headers)
 
-            if check_output_types('lava', output_types):
-                table_name, object_columns, column_map = lava_process_artifact(category,
-                                                                               module_name,
-                                                                               artifact_name,
-                                                                               data_headers,
-                                                                               len(data_list),
-                                                                               data_views=artifact_info.get("data_views"),
-                                                                               artifact_icon=icon)
+        record_count = 0
+        writers = []
+        report = table_name = None
+        output_times.clear()
+        try:
+            for data_chunk, html_data_chunk in chunks:
+                if not record_count:
+                    # First rows, create the outputs
+                    icons.setdefault(category, {artifact_name: icon}).update({artifact_name: icon})
+
+                    if media_header_info:
+                        html_columns.extend([data_headers[idx][0] for idx in media_header_info])
+
+                    if check_output_types('html', output_types):
+                        report = artifact_report.ArtifactHtmlReport(artifact_name)
+                        report.start_artifact_report(report_folder, artifact_name, description)
+                        report.add_script()
+                        report.start_artifact_data_table(stripped_headers, source_path, known_count)
+
+                    if check_output_types('tsv', output_types):
+                        writers.append(TsvWriter(report_folder, stripped_headers, artifact_name))
+
+                    if check_output_types('timeline', output_types):
+                        writers.append(TimelineWriter(report_folder, artifact_name, stripped_headers))
+
+                    if check_output_types('lava', output_types):
+                        table_name, object_columns, column_map = lava_process_artifact(category,
+                                                                                       module_name,
+                                                                                       artifact_name,
+                                                                                       data_headers,
+                                                                                       known_count,
+                                                                                       data_views=artifact_info.get("data_views"),
+                                                                                       artifact_icon=icon)
+
+                    if check_output_types('kml', output_types):
+                        writers.append(KmlWriter(report_folder, artifact_name, stripped_headers))
+
+                    if check_output_types('parquet', output_types):
+                        if pyarrow:
+                            writers.append(ParquetWriter(report_folder, artifact_name, data_headers))
+                        else:
+                            logfunc('pyarrow is not installed, Parquet export skipped')
+
+                record_count += len(data_chunk)
+
+                if media_header_info:
+                    html_data_chunk, txt_data_chunk = get_data_list_with_media(media_header_info, data_chunk)
+                else:
+                    txt_data_chunk = data_chunk
+
+                if report:
+                    start = perf_counter()
+                    report.add_artifact_data_rows(stripped_headers, html_data_chunk, html_no_escape=html_columns)
+                    add_output_time('html', start)
+                for writer in writers:
+                    start = perf_counter()
+                    writer.write_rows(txt_data_chunk)
+                    add_output_time(writer.output_type, start)
+                if table_name:
+                    start = perf_counter()
+                    lava_insert_sqlite_data(table_name, data_chunk, object_columns, data_headers, column_map)
+                    add_output_time('lava', start)
+        finally:
+            # Also closes the outputs when an artifact yielding its rows fails
+            if report:
+                start = perf_counter()
+                report.end_artifact_data_table(stripped_headers)
+                report.end_artifact_report()
+                add_output_time('html', start)
+            for writer in writers:
+                start = perf_counter()
+                writer.close()
+                add_output_time(writer.output_type, start)
+            wait_for_media_copies()
+
+        if record_count:
+            logfunc(f"Found {record_count:,} {'records' if record_count>1 else 'record'} for {artifact_name}")
+            if table_name:
+                if known_count is None:
+                    lava_set_record_count(category, table_name, record_count)
                 if is_lava_only:
-                    lava_only_info(category, artifact_name, table_name, len(data_list))
-                lava_insert_sqlite_data(table_name, data_list, object_columns, data_headers, column_map)
-
-            if check_output_types('kml', output_types):
-                kmlgen(report_folder, artifact_name, txt_data_list if media_header_info else data_list, stripped_headers)
+                    lava_only_info(category, artifact_name, table_name, record_count)
 
         else:
             if output_types != 'none':
                 logfunc(f"No data found for {artifact_name}")
                 if is_lava_only:
                     lava_only_info(category, artifact_name, artifact_name, 0)
+        return record_count
 
+    @wraps(func)
+    def wrapper(files_found, report_folder, seeker, wrap_text, timezone_offset):
+        data_headers, data_list, source_path = run_artifact(files_found, report_folder, seeker, wrap_text, timezone_offset)
+        write_output(report_folder, data_headers, data_list, source_path)
         return data_headers, data_list, source_path
+
+    wrapper.run_artifact = run_artifact
+    wrapper.write_output = write_output
     return wrapper
 
 
@@ -654,118 +917,302 @@ def does_view_exist_in_db(path, table_name):
     return False
 
 
-def tsv(report_folder, data_headers, data_list, tsvname, source_file=None):
+def get_report_folder_base(report_folder):
     report_folder = report_folder.rstrip('/')
     report_folder = report_folder.rstrip('\\')
-    report_folder_base = os.path.dirname(os.path.dirname(report_folder))
-    tsv_report_folder = os.path.join(report_folder_base, '_TSV Exports')
+    return os.path.dirname(os.path.dirname(report_folder))
 
-    if os.path.isdir(tsv_report_folder):
-        pass
-    else:
-        os.makedirs(tsv_report_folder)
-    
-    with codecs.open(os.path.join(tsv_report_folder, tsvname + '.tsv'), 'a', 'utf-8-sig') as tsvfile:
-        tsv_writer = csv.writer(tsvfile, delimiter='\t')
-        tsv_writer.writerow(data_headers)
-        
-        for i in data_list:
-            tsv_writer.writerow(i)
-            
-def timeline(report_folder, tlactivity, data_list, data_headers):
-    report_folder = report_folder.rstrip('/')
-    report_folder = report_folder.rstrip('\\')
-    report_folder_base = os.path.dirname(os.path.dirname(report_folder))
+class TsvWriter:
+    '''Writes the TSV export of an artifact, rows can be written in several calls'''
+    output_type = 'tsv'
+
+    def __init__(self, report_folder, data_headers, tsvname):
+        tsv_report_folder = os.path.join(get_report_folder_base(report_folder), '_TSV Exports')
+
+        if os.path.isdir(tsv_report_folder):
+            pass
+        else:
+            os.makedirs(tsv_report_folder)
+
+        self.tsvfile = codecs.open(os.path.join(tsv_report_folder, tsvname + '.tsv'), 'a', 'utf-8-sig')
+        self.tsv_writer = csv.writer(self.tsvfile, delimiter='\t')
+        self.tsv_writer.writerow(data_headers)
+
+    def write_rows(self, data_list):
+        self.tsv_writer.writerows(data_list)
+
+    def close(self):
+        self.tsvfile.close()
+
+def tsv(report_folder, data_headers, data_list, tsvname, source_file=None):
+    tsv_writer = TsvWriter(report_folder, data_headers, tsvname)
+    tsv_writer.write_rows(data_list)
+    tsv_writer.close()
+
+# Connection to the timeline db kept open for the whole run, see get_timeline_db()
+timeline_db = None
+timeline_db_path = ''
+timeline_db_pid = None
+# Activities added to the timeline db and to the _latlong.db during the run
+timeline_activities = set()
+kml_activities = set()
+
+def get_timeline_db(report_folder_base):
+    '''Returns the connection to the timeline db of the report, opened on first use and kept open
+       until timeline_finalize(). Processes forked from the one which opened it get their own.'''
+    global timeline_db, timeline_db_path, timeline_db_pid
     tl_report_folder = os.path.join(report_folder_base, '_Timeline')
+    tldb = os.path.join(tl_report_folder, 'tl.db')
+    if timeline_db is not None and timeline_db_path == tldb and timeline_db_pid == os.getpid():
+        return timeline_db
+    if timeline_db is not None and timeline_db_pid == os.getpid():
+        timeline_finalize()
+    os.makedirs(tl_report_folder, exist_ok=True)
+    db = sqlite3.connect(tldb)
+    cursor = db.cursor()
+    # Committed once per artifact, synced so that an interrupted run can be resumed
+    cursor.execute('''PRAGMA synchronous = FULL''')
+    cursor.execute('''PRAGMA journal_mode = WAL''')
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data(key TEXT, activity TEXT, datalist TEXT, timestamp INTEGER)
+        """
+    )
+    db.commit()
+    timeline_db, timeline_db_path, timeline_db_pid = db, tldb, os.getpid()
+    return db
 
-    if os.path.isdir(tl_report_folder):
-        tldb = os.path.join(tl_report_folder, 'tl.db')
-        db = sqlite3.connect(tldb)
-        cursor = db.cursor()
-        cursor.execute('''PRAGMA synchronous = EXTRA''')
-        cursor.execute('''PRAGMA journal_mode = WAL''')
-        db.commit()
-    else:
-        os.makedirs(tl_report_folder)
-        # create database
-        tldb = os.path.join(tl_report_folder, 'tl.db')
-        db = sqlite3.connect(tldb, isolation_level = 'exclusive')
-        cursor = db.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE data(key TEXT, activity TEXT, datalist TEXT)
-            """
-        )
-        db.commit()
-    
-    for entry in data_list:
+def timeline_finalize():
+    '''Indexes the timeline db by timestamp and closes it'''
+    global timeline_db, timeline_db_path, timeline_db_pid
+    if timeline_db is None or timeline_db_pid != os.getpid():
+        return
+    timeline_db.execute('''CREATE INDEX IF NOT EXISTS data_timestamp ON data(timestamp)''')
+    timeline_db.commit()
+    try:
+        # Writes the WAL back to the db file, tl.db is then a single file again
+        timeline_db.execute('''PRAGMA journal_mode = DELETE''')
+    except sqlite3.OperationalError:
+        pass
+    timeline_db.close()
+    timeline_db, timeline_db_path, timeline_db_pid = None, '', None
+
+def timeline_get_activities(report_folder_base):
+    '''Returns the activities in the timeline db'''
+    if not os.path.exists(os.path.join(report_folder_base, '_Timeline', 'tl.db')):
+        return set()
+    db = get_timeline_db(report_folder_base)
+    return {row[0] for row in db.execute('SELECT DISTINCT activity FROM data')}
+
+def timeline_remove_activities(report_folder_base, activities):
+    '''Removes the rows of activities from the timeline db'''
+    if not os.path.exists(os.path.join(report_folder_base, '_Timeline', 'tl.db')):
+        return
+    db = get_timeline_db(report_folder_base)
+    db.executemany('DELETE FROM data WHERE activity = ?', ((activity,) for activity in activities))
+    db.commit()
+
+def get_timeline_timestamp(value):
+    '''Returns the seconds since epoch of the first value of a timeline row, None when it is not a
+       date. Dates without time zone are UTC.'''
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return None
+
+class TimelineWriter:
+    '''Adds the rows of an artifact to the timeline db, rows can be written in several calls'''
+    output_type = 'timeline'
+
+    def __init__(self, report_folder, tlactivity, data_headers):
+        self.tlactivity = tlactivity
+        self.data_headers = data_headers
+        self.db = get_timeline_db(get_report_folder_base(report_folder))
+        timeline_activities.add(tlactivity)
+
+    def get_row(self, entry):
+        timestamp = get_timeline_timestamp(entry[0]) if entry else None
         entry = [str(field) for field in entry]
-        
-        data_dict = dict(zip(data_headers, entry))
+        data_str = json.dumps(dict(zip(self.data_headers, entry)))
+        return entry[0] if entry else '', self.tlactivity, data_str, timestamp
 
-        data_str = json.dumps(data_dict)
-        cursor.executemany(
-            "INSERT INTO data VALUES(?,?,?)", [(str(entry[0]), tlactivity, data_str)])
+    def write_rows(self, data_list):
+        self.db.executemany("INSERT INTO data(key, activity, datalist, timestamp) VALUES(?,?,?,?)",
+                            map(self.get_row, data_list))
 
-    db.commit()
-    db.close()
+    def close(self):
+        # The connection stays open for the next artifacts
+        self.db.commit()
+
+def timeline(report_folder, tlactivity, data_list, data_headers):
+    timeline_writer = TimelineWriter(report_folder, tlactivity, data_headers)
+    timeline_writer.write_rows(data_list)
+    timeline_writer.close()
+
+class KmlWriter:
+    '''Writes the KML export of an artifact with Latitude and Longitude columns, and adds its
+       locations to the _latlong.db, rows can be written in several calls'''
+    output_type = 'kml'
+
+    def __init__(self, report_folder, kmlactivity, data_headers):
+        self.report_folder = report_folder
+        self.kmlactivity = kmlactivity
+        self.data_headers = data_headers
+        self.has_coordinates = 'Longitude' in data_headers and 'Latitude' in data_headers
+        self.kml = simplekml.Kml(open=1) if self.has_coordinates else None
+        self.data = []
+
+    def write_rows(self, data_list):
+        if not self.has_coordinates:
+            return
+        for row in data_list:
+            modifiedDict = dict(zip(self.data_headers, row))
+            lon = modifiedDict['Longitude']
+            lat = modifiedDict['Latitude']
+            times_header = "Timestamp"
+            if lat and lon:
+                pnt = self.kml.newpoint()
+                times = modifiedDict.get('Timestamp','N/A')
+                if times == 'N/A':
+                    for key, value in modifiedDict.items():
+                        if isinstance(value, datetime):
+                            times_header = key
+                            times = value
+                            break
+                pnt.name = times
+                pnt.description = f"{times_header}: {times} - {self.kmlactivity}"
+                pnt.coords = [(lon, lat)]
+                self.data.append((times, lat, lon, self.kmlactivity))
+
+    def close(self):
+        if len(self.data) > 0:
+            kml_report_folder = os.path.join(get_report_folder_base(self.report_folder), '_KML Exports')
+            if os.path.isdir(kml_report_folder):
+                latlongdb = os.path.join(kml_report_folder, '_latlong.db')
+                db = sqlite3.connect(latlongdb)
+                cursor = db.cursor()
+                cursor.execute('''PRAGMA synchronous = EXTRA''')
+                cursor.execute('''PRAGMA journal_mode = WAL''')
+                db.commit()
+            else:
+                os.makedirs(kml_report_folder)
+                latlongdb = os.path.join(kml_report_folder, '_latlong.db')
+                db = sqlite3.connect(latlongdb)
+                cursor = db.cursor()
+                cursor.execute(
+                """
+                CREATE TABLE data(timestamp TEXT, latitude TEXT, longitude TEXT, activity TEXT)
+                """
+                    )
+                db.commit()
+
+            cursor.executemany("INSERT INTO data VALUES(?, ?, ?, ?)", self.data)
+            db.commit()
+            db.close()
+            self.kml.save(os.path.join(kml_report_folder, f'{self.kmlactivity}.kml'))
+            kml_activities.add(self.kmlactivity)
 
 def kmlgen(report_folder, kmlactivity, data_list, data_headers):
-    if 'Longitude' not in data_headers or 'Latitude' not in data_headers:
+    kml_writer = KmlWriter(report_folder, kmlactivity, data_headers)
+    kml_writer.write_rows(data_list)
+    kml_writer.close()
+
+def kml_get_activities(report_folder_base):
+    '''Returns the activities in the _latlong.db'''
+    latlongdb = os.path.join(report_folder_base, '_KML Exports', '_latlong.db')
+    if not os.path.exists(latlongdb):
+        return set()
+    db = sqlite3.connect(latlongdb)
+    activities = {row[0] for row in db.execute('SELECT DISTINCT activity FROM data')}
+    db.close()
+    return activities
+
+def kml_remove_activities(report_folder_base, activities):
+    '''Removes the locations of activities from the _latlong.db'''
+    latlongdb = os.path.join(report_folder_base, '_KML Exports', '_latlong.db')
+    if not os.path.exists(latlongdb):
         return
+    db = sqlite3.connect(latlongdb)
+    db.executemany('DELETE FROM data WHERE activity = ?', ((activity,) for activity in activities))
+    db.commit()
+    db.close()
 
-    data = []
-    kml = simplekml.Kml(open=1)    
-    a = 0
-    length = len(data_list)
-    while a < length:
-        modifiedDict = dict(zip(data_headers, data_list[a]))
-        lon = modifiedDict['Longitude']
-        lat = modifiedDict['Latitude']
-        times_header = "Timestamp"
-        if lat and lon:
-            pnt = kml.newpoint()
-            times = modifiedDict.get('Timestamp','N/A')
-            if times == 'N/A':
-                for key, value in modifiedDict.items():
-                    if isinstance(value, datetime):
-                        times_header = key
-                        times = value
-                        break
-            pnt.name = times
-            pnt.description = f"{times_header}: {times} - {kmlactivity}"
-            pnt.coords = [(lon, lat)]
-            data.append((times, lat, lon, kmlactivity))
-        a += 1
-
-    if len(data) > 0:
-        report_folder = report_folder.rstrip('/')
-        report_folder = report_folder.rstrip('\\')
-        report_folder_base = os.path.dirname(os.path.dirname(report_folder))
-        kml_report_folder = os.path.join(report_folder_base, '_KML Exports')
-        if os.path.isdir(kml_report_folder):
-            latlongdb = os.path.join(kml_report_folder, '_latlong.db')
-            db = sqlite3.connect(latlongdb)
-            cursor = db.cursor()
-            cursor.execute('''PRAGMA synchronous = EXTRA''')
-            cursor.execute('''PRAGMA journal_mode = WAL''')
-            db.commit()
-        else:
-            os.makedirs(kml_report_folder)
-            latlongdb = os.path.join(kml_report_folder, '_latlong.db')
-            db = sqlite3.connect(latlongdb)
-            cursor = db.cursor()
-            cursor.execute(
-            """
-            CREATE TABLE data(timestamp TEXT, latitude TEXT, longitude TEXT, activity TEXT)
-            """
-                )
-            db.commit()
-        
-        cursor.executemany("INSERT INTO data VALUES(?, ?, ?, ?)", data)
-        db.commit()
-        db.close()
-        kml.save(os.path.join(kml_report_folder, f'{kmlactivity}.kml'))
+def get_parquet_datetime(value):
+    '''Returns value as a datetime, in UTC when it has no time zone'''
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        raise ValueError(f'{value!r} is not a datetime')
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def get_parquet_date(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    if not isinstance(value, date):
+        raise ValueError(f'{value!r} is not a date')
+    return value
+
+class ParquetWriter:
+    '''Writes the Parquet export of an artifact, each call to write_rows() adding a row group.
+       Columns typed 'datetime' or 'date' in data_headers are stored as such, values which are
+       not dates being left null, other columns are stored as text.'''
+    output_type = 'parquet'
+
+    def __init__(self, report_folder, artifact_name, data_headers):
+        parquet_report_folder = os.path.join(get_report_folder_base(report_folder), '_Parquet Exports')
+        os.makedirs(parquet_report_folder, exist_ok=True)
+        self.artifact_name = artifact_name
+        self.column_converters = []
+        fields = []
+        for header in data_headers:
+            name, data_type = header[:2] if isinstance(header, tuple) else (header, '')
+            if data_type == 'datetime':
+                fields.append(pyarrow.field(name, pyarrow.timestamp('us', tz='UTC')))
+                self.column_converters.append(get_parquet_datetime)
+            elif data_type == 'date':
+                fields.append(pyarrow.field(name, pyarrow.date32()))
+                self.column_converters.append(get_parquet_date)
+            else:
+                fields.append(pyarrow.field(name, pyarrow.string()))
+                self.column_converters.append(str)
+        self.schema = pyarrow.schema(fields)
+        parquet_path = get_next_unused_name(os.path.join(parquet_report_folder, sanitize_file_name(artifact_name) + '.parquet'))
+        self.writer = pyarrow.parquet.ParquetWriter(parquet_path, self.schema, compression='zstd')
+        self.invalid_count = 0
+
+    def convert_column(self, values, converter):
+        converted = []
+        for value in values:
+            if value is None or (value == '' and converter is not str):
+                converted.append(None)
+                continue
+            try:
+                converted.append(converter(value))
+            except (ValueError, TypeError):
+                self.invalid_count += 1
+                converted.append(None)
+        return converted
+
+    def write_rows(self, data_list):
+        if not data_list:
+            return
+        columns = [pyarrow.array(self.convert_column([row[index] if index < len(row) else None for row in data_list],
+                                                     converter), type=field.type)
+                   for index, (converter, field) in enumerate(zip(self.column_converters, self.schema))]
+        self.writer.write_table(pyarrow.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        if self.invalid_count:
+            logfunc(f'{self.invalid_count:,} values of {self.artifact_name} were not dates, left empty in its Parquet export')
 
 def media_to_html(media_path, files_found, report_folder):
 
@@ -941,15 +1388,18 @@ def device_info(category, label, value, source_file=""):
     except:
         func_name = 'unknown'
     
-    values = identifiers.get(category, {})
-    
     # Create value object with both the value and source module
     value_obj = {
         'value': value,
         'source_file': source_file,
         'artifact': func_name
     }
-    
+    add_device_info_value(category, label, value_obj)
+
+def add_device_info_value(category, label, value_obj):
+    """Stores a value object created by device_info in the identifiers dictionary"""
+    values = identifiers.get(category, {})
+
     if label in values:
         # If the label exists, check if it's already a list
         if isinstance(values[label], list):
@@ -963,6 +1413,13 @@ def device_info(category, label, value, source_file=""):
         
     identifiers[category] = values
 
+def merge_device_info(device_identifiers):
+    """Merges the identifiers dictionary collected by another process into this one"""
+    for category, values in device_identifiers.items():
+        for label, value_objs in values.items():
+            for value_obj in value_objs if isinstance(value_objs, list) else [value_objs]:
+                add_device_info_value(category, label, value_obj)
+
 def write_lava_only_log():
     """Crates the lava_only_artifacts log file"""
     with open(OutputParameters.screen_output_file_path_lava_only, 'w', encoding='utf8') as lava_log:
@@ -9,6 +9,28 @@ import datetime
 lava_data = None
 lava_db = None
 
+# All the writes are done in one transaction, committed every LAVA_COMMIT_ROWS rows, after
+# each artifact and when other connections need to read the db (see lava_commit)
+LAVA_COMMIT_ROWS = 100000
+LAVA_CACHE_SIZE_KB = 65536
+lava_uncommitted_rows = 0
+
+# Media items and references are inserted in batches of LAVA_MEDIA_BATCH_SIZE
+LAVA_MEDIA_BATCH_SIZE = 1000
+lava_media_items_batch = {}
+lava_media_references_batch = {}
+# Ids of all the media items and references inserted in the db of this run, so that looking up
+# an id not inserted yet doesn't need a query
+lava_media_item_ids = set()
+lava_media_reference_ids = set()
+
+MEDIA_ITEM_INSERT_QUERY = '''INSERT OR IGNORE INTO _lava_media_items
+    ("id", "source_path", "extraction_path", "type", "metadata", "created_at", "updated_at")
+    VALUES (?, ?, ?, ?, ?, ?, ?)'''
+MEDIA_REFERENCE_INSERT_QUERY = '''INSERT INTO _lava_media_references
+    ("id", "media_item_id", "module_name", "artifact_name", "name", "media_path")
+    VALUES (?, ?, ?, ?, ?, ?)'''
+
 def sanitize_sql_name(name):
     # Remove non-alphanumeric characters and replace spaces with underscores
     sanitized = re.sub(r'[^\w\s]', '', name)
@@ -37,11 +59,20 @@ def initialize_lava(input_path, output_path, input_type):
         "artifacts": OrderedDict()
     }
     
+    lava_media_item_ids.clear()
+    lava_media_reference_ids.clear()
+
     db_path = os.path.join(output_path, '_lava_artifacts.db')
     lava_db = sqlite3.connect(db_path)
+    lava_db.execute('PRAGMA journal_mode=WAL')
+    # The WAL is synced on each commit, done once per artifact, so that a run interrupted by a
+    # crash or a power loss can be resumed with all the artifacts it completed (see run_manifest)
+    lava_db.execute('PRAGMA synchronous=FULL')
+    lava_db.execute(f'PRAGMA cache_size=-{LAVA_CACHE_SIZE_KB}')
     
     cursor = lava_db.cursor()
-    cursor.execute('''CREATE TABLE _lava_media_items (
+    # The tables exist when the db of a previous run is reused by --incremental
+    cursor.execute('''CREATE TABLE IF NOT EXISTS _lava_media_items (
                         id TEXT PRIMARY KEY, 
                         source_path TEXT, 
                         extraction_path TEXT, 
@@ -49,7 +80,7 @@ def initialize_lava(input_path, output_path, input_type):
                         metadata TEXT, 
                         created_at INTEGER, 
                         updated_at INTEGER)''')
-    cursor.execute('''CREATE TABLE _lava_media_references (
+    cursor.execute('''CREATE TABLE IF NOT EXISTS _lava_media_references (
                         id TEXT PRIMARY KEY, 
                         media_item_id TEXT, 
                         module_name TEXT, 
@@ -57,7 +88,7 @@ def initialize_lava(input_path, output_path, input_type):
                         name TEXT,
                         media_path TEXT,
                         FOREIGN KEY (media_item_id) REFERENCES _lava_media_items(id))''')
-    cursor.execute('''CREATE VIEW _lava_media_info AS 
+    cursor.execute('''CREATE VIEW IF NOT EXISTS _lava_media_info AS 
                         SELECT 
                             lmr.id as 'media_ref_id', 
                             lmr.media_item_id, 
@@ -73,7 +104,34 @@ def initialize_lava(input_path, output_path, input_type):
                             lmi.updated_at 
                         FROM _lava_media_references as lmr 
                         LEFT JOIN _lava_media_items as lmi ON lmr.media_item_id = lmi.id''')
-    
+    lava_media_item_ids.update(row[0] for row in cursor.execute('SELECT id FROM _lava_media_items'))
+    lava_media_reference_ids.update(row[0] for row in cursor.execute('SELECT id FROM _lava_media_references'))
+
+def lava_get_artifacts():
+    '''Returns the names of the tables of the artifacts and the module and artifact names of the
+    media references in the db'''
+    lava_flush_media()
+    cursor = lava_db.cursor()
+    table_names = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+                   if not row[0].startswith(('_lava_', 'sqlite_'))}
+    media_artifacts = set(cursor.execute('SELECT DISTINCT module_name, artifact_name FROM _lava_media_references'))
+    return table_names, media_artifacts
+
+def lava_remove_artifacts(table_names, media_artifacts):
+    '''Drops the tables and removes the media references, by module and artifact name, written by
+    artifacts in a previous run. Media items are kept, other artifacts may reference them.'''
+    lava_flush_media()
+    cursor = lava_db.cursor()
+    for table_name in table_names:
+        cursor.execute(f'DROP TABLE IF EXISTS {table_name}')
+    for module_name, artifact_name in media_artifacts:
+        query = 'SELECT id FROM _lava_media_references WHERE module_name = ? AND artifact_name = ?'
+        lava_media_reference_ids.difference_update(
+            row[0] for row in cursor.execute(query, (module_name, artifact_name)))
+        cursor.execute('DELETE FROM _lava_media_references WHERE module_name = ? AND artifact_name = ?',
+                       (module_name, artifact_name))
+    lava_commit()
+
 def lava_process_artifact(category, module_name, artifact_name, data, record_count=None, data_views=None, artifact_icon=None):
     global lava_data
     
@@ -129,6 +187,12 @@ def lava_process_artifact(category, module_name, artifact_name, data, record_cou
     
     return sanitized_table_name, object_columns, column_map
 
+def lava_set_record_count(category, table_name, record_count):
+    '''Sets the record count of an artifact processed before its number of records was known'''
+    for artifact in lava_data["artifacts"].get(category, []):
+        if artifact["tablename"] == table_name:
+            artifact["record_count"] = record_count
+
 def lava_add_module(module_name, module_status, file_count=None):
     global lava_data
     
@@ -169,7 +233,6 @@ def lava_create_sqlite_table(table_name, data):
 
     columns_sql = ', '.join(columns)
     cursor.execute(f"CREATE TABLE IF NOT EXISTS {sanitized_table_name} ({columns_sql})")
-    lava_db.commit()
 
     return sanitized_table_name, column_map, object_columns
 
@@ -211,57 +274,112 @@ def lava_insert_sqlite_data(table_name, data, object_columns, headers, column_ma
     
     # Execute the insert
     cursor.executemany(query, rows_to_insert)
+    lava_checkpoint(len(rows_to_insert))
+
+def lava_checkpoint(row_count):
+    '''Commits the transaction once LAVA_COMMIT_ROWS rows were written since the last commit'''
+    global lava_uncommitted_rows
+    lava_uncommitted_rows += row_count
+    if lava_uncommitted_rows >= LAVA_COMMIT_ROWS:
+        lava_commit()
+
+def lava_commit():
+    '''Writes the media batches and commits the transaction. Needed before other connections,
+    like the ones of artifacts using the LAVA db as source file, read the db.'''
+    global lava_uncommitted_rows
+    lava_flush_media()
     lava_db.commit()
+    lava_uncommitted_rows = 0
+
+def lava_flush_media():
+    '''Inserts the batched media items and references'''
+    global lava_db
+    if not lava_media_items_batch and not lava_media_references_batch:
+        return
+    cursor = lava_db.cursor()
+    # Items first, references point to them
+    cursor.executemany(MEDIA_ITEM_INSERT_QUERY, lava_media_items_batch.values())
+    cursor.executemany(MEDIA_REFERENCE_INSERT_QUERY, lava_media_references_batch.values())
+    row_count = len(lava_media_items_batch) + len(lava_media_references_batch)
+    lava_media_items_batch.clear()
+    lava_media_references_batch.clear()
+    lava_checkpoint(row_count)
 
 def lava_get_media_item(media_id):
     '''Returns a MediaItem object containing info of the media_id item stored  
     in the media_items table if exists or return None '''
     global lava_db
+    if media_id in lava_media_items_batch:
+        return lava_media_items_batch[media_id]
+    if media_id not in lava_media_item_ids:
+        return None
     cursor = lava_db.cursor()
-    query = f"SELECT * FROM _lava_media_items WHERE id='{media_id}'"
-    return cursor.execute(query).fetchone()
+    query = "SELECT * FROM _lava_media_items WHERE id = ?"
+    return cursor.execute(query, (media_id,)).fetchone()
     # return result.fetchone()
 
 def lava_insert_sqlite_media_item(media_item):
-    global lava_db
-    created_at = media_item.created_at if media_item.created_at else 'NULL'
-    updated_at = media_item.updated_at if media_item.updated_at else 'NULL'
-    cursor = lava_db.cursor()
-    try:
-        cursor.execute(f'''INSERT INTO _lava_media_items 
-                    ("id", "source_path", "extraction_path", "type", "metadata", "created_at", "updated_at") 
-                    VALUES ("{media_item.id}", "{media_item.source_path}", "{media_item.extraction_path}", 
-                    "{media_item.mimetype}", "{media_item.metadata}", {created_at}, {updated_at})''')
-        lava_db.commit()
-    except sqlite3.IntegrityError as e:
-        print(str(e))
+    created_at = media_item.created_at if media_item.created_at else None
+    updated_at = media_item.updated_at if media_item.updated_at else None
+    lava_media_items_batch[media_item.id] = (
+        media_item.id, str(media_item.source_path), str(media_item.extraction_path),
+        str(media_item.mimetype), str(media_item.metadata), created_at, updated_at)
+    lava_media_item_ids.add(media_item.id)
+    if len(lava_media_items_batch) >= LAVA_MEDIA_BATCH_SIZE:
+        lava_flush_media()
 
 def lava_get_media_references(media_ref):
     global lava_db
+    if media_ref in lava_media_references_batch:
+        return lava_media_references_batch[media_ref]
+    if media_ref not in lava_media_reference_ids:
+        return None
     cursor = lava_db.cursor()
-    query = f"SELECT * FROM _lava_media_references WHERE id='{media_ref}'"
-    return cursor.execute(query).fetchone()
+    query = "SELECT * FROM _lava_media_references WHERE id = ?"
+    return cursor.execute(query, (media_ref,)).fetchone()
 
 def lava_insert_sqlite_media_references(media_references):
-    global lava_db
-    cursor = lava_db.cursor()
-    cursor.execute(f'''INSERT INTO _lava_media_references 
-                ("id", "media_item_id", "module_name", "artifact_name", "name", "media_path")
-                VALUES ("{media_references.id}", "{media_references.media_item_id}", 
-                "{media_references.module_name}", "{media_references.artifact_name}", 
-                "{media_references.name}", "{media_references.media_path}")''')
-    lava_db.commit()
+    lava_media_references_batch[media_references.id] = (
+        media_references.id, str(media_references.media_item_id), str(media_references.module_name),
+        str(media_references.artifact_name), str(media_references.name), str(media_references.media_path))
+    lava_media_reference_ids.add(media_references.id)
+    if len(lava_media_references_batch) >= LAVA_MEDIA_BATCH_SIZE:
+        lava_flush_media()
 
 def lava_get_full_media_info(media_ref_id):
     global lava_db
-    lava_db.row_factory = sqlite3.Row
+    lava_flush_media()
     cursor = lava_db.cursor()
-    query = f'''
+    cursor.row_factory = sqlite3.Row
+    query = '''
     SELECT *
     FROM _lava_media_info
-    WHERE media_ref_id = '{media_ref_id}'
+    WHERE media_ref_id = ?
     '''
-    return cursor.execute(query).fetchone()
+    return cursor.execute(query, (media_ref_id,)).fetchone()
+
+# Number of ids looked up by each query of lava_get_full_media_infos, below the SQLite limit of variables
+LAVA_MEDIA_LOOKUP_SIZE = 500
+
+def lava_get_full_media_infos(media_ref_ids):
+    '''Returns a dict of the full media info of media_ref_ids, by media reference id. Ids not
+       found are left out.'''
+    global lava_db
+    lava_flush_media()
+    cursor = lava_db.cursor()
+    cursor.row_factory = sqlite3.Row
+    media_ref_ids = list(media_ref_ids)
+    media_infos = {}
+    for start in range(0, len(media_ref_ids), LAVA_MEDIA_LOOKUP_SIZE):
+        ids = media_ref_ids[start:start + LAVA_MEDIA_LOOKUP_SIZE]
+        query = f'''
+        SELECT *
+        FROM _lava_media_info
+        WHERE media_ref_id IN ({', '.join('?' * len(ids))})
+        '''
+        for media_info in cursor.execute(query, ids):
+            media_infos[media_info['media_ref_id']] = media_info
+    return media_infos
 
 def lava_finalize_output(output_path):
     global lava_data, lava_db
@@ -282,5 +400,18 @@ def lava_finalize_output(output_path):
     with open(os.path.join(output_path, '_lava_data.json'), 'w') as f:
         json.dump(lava_data, f, indent=4)
     
+    # Index the media references once all of them are inserted
+    lava_flush_media()
+    lava_db.execute('''CREATE INDEX IF NOT EXISTS _lava_media_references_media_item_id
+                       ON _lava_media_references (media_item_id)''')
+    lava_db.commit()
+
+    # Leave a single db file, readable without the WAL files
+    try:
+        lava_db.execute('PRAGMA journal_mode=DELETE')
+    except sqlite3.OperationalError:
+        # Connections opened by artifacts are still open, the WAL is merged when the last one is closed
+        pass
+
     # Close the SQLite database
     lava_db.close()
\ No newline at end of file
@@ -7,6 +7,9 @@ import importlib.util
 # a bit long-winded to make compatible with PyInstaller
 PLUGINPATH = pathlib.Path(__file__).resolve().parent / pathlib.Path("artifacts")
 
+# Resources all the artifacts depend on without declaring them in their 'depends_on' key
+COMMON_DEPENDENCIES = ('ios_version',)
+
 
 @dataclasses.dataclass(frozen=True)
 class PluginSpec:
@@ -16,13 +19,24 @@ class PluginSpec:
     search: str
     method: typing.Callable  # todo define callable signature
     artifact_info: dict  # Add this line to include artifact_info
+    depends_on: tuple = ()  # artifact names or resources provided by other artifacts
+    provides: tuple = ()  # resources made available to other artifacts
+
+    @property
+    def is_derived(self):
+        '''Derived artifacts have no paths, they read the data produced by the artifacts they depend on'''
+        return self.search is None and bool(self.depends_on)
 
 
 class PluginLoader:
     def __init__(self, plugin_path: typing.Optional[pathlib.Path] = None):
         self._plugin_path = plugin_path or PLUGINPATH
         self._plugins: dict[str, PluginSpec] = {}
+        self._providers: dict[str, list[str]] = {}
+        self._dependencies: dict[str, set[str]] = {}  # declared in depends_on
+        self._common_dependencies: dict[str, set[str]] = {}
         self._load_plugins()
+        self._build_dependency_graph()
 
     @staticmethod
     def load_module_lazy(path: pathlib.Path):
@@ -71,16 +85,82 @@ class PluginLoader:
                     if func:
                         func.artifact_info = artifact_info  # Attach artifact_info to the function
 
+                    depends_on = tuple(artifact.get('depends_on', ()))
+                    provides = tuple(artifact.get('provides', ()))
+
                 else:
                     # 4. If no v2, then use v1
                     category, search, func = artifact
                     artifact_info = {'category': category, 'paths': search}
+                    depends_on = provides = ()
 
                 if name in self._plugins:
                     raise KeyError(f"Duplicate plugin: '{name}' in module '{py_file.stem}'")
                 
                 # Add artifact_info to PluginSpec
-                self._plugins[name] = PluginSpec(name, py_file.stem, category, search, func, artifact_info)
+                self._plugins[name] = PluginSpec(name, py_file.stem, category, search, func, artifact_info,
+                                                 depends_on, provides)
+
+    def _build_dependency_graph(self):
+        '''Resolves the depends_on key of each plugin into the names of the plugins it depends on'''
+        for plugin in self._plugins.values():
+            for resource in dict.fromkeys((plugin.name,) + plugin.provides):
+                self._providers.setdefault(resource, []).append(plugin.name)
+
+        def resolve(plugin, resources):
+            dependencies = set()
+            for resource in resources:
+                if resource in plugin.provides:
+                    continue
+                if resource not in self._providers:
+                    raise KeyError(f"Unknown dependency '{resource}' for plugin '{plugin.name}' in module '{plugin.module_name}'")
+                dependencies.update(self._providers[resource])
+            dependencies.discard(plugin.name)
+            return dependencies
+
+        for plugin in self._plugins.values():
+            self._dependencies[plugin.name] = resolve(plugin, plugin.depends_on)
+            self._common_dependencies[plugin.name] = resolve(plugin, COMMON_DEPENDENCIES)
+
+        # Fail on cycles, they would keep the plugins involved from ever being run
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle involving plugin '{name}'")
+            visiting.add(name)
+            for dependency in self.dependencies(name):
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self._plugins:
+            visit(name)
+
+    def dependencies(self, name: str, include_common=True) -> set[str]:
+        '''Returns the names of the plugins that must be run before this one'''
+        if include_common:
+            return self._dependencies[name] | self._common_dependencies[name]
+        return self._dependencies[name]
+
+    def provides_common_dependency(self, plugin: PluginSpec) -> bool:
+        return any(resource in COMMON_DEPENDENCIES for resource in plugin.provides)
+
+    def with_derived_plugins(self, plugins: typing.Iterable[PluginSpec]) -> list[PluginSpec]:
+        '''Returns the plugins followed by the derived plugins depending on them, directly or not'''
+        plugins = list(plugins)
+        names = {plugin.name for plugin in plugins}
+        added = True
+        while added:
+            added = False
+            for plugin in self._plugins.values():
+                if plugin.is_derived and plugin.name not in names and self._dependencies[plugin.name] & names:
+                    plugins.append(plugin)
+                    names.add(plugin.name)
+                    added = True
+        return plugins
 
 
     @property
@@ -96,3 +176,39 @@ class PluginLoader:
     def __len__(self):
         return len(self._plugins)
 
+
+class PluginScheduler:
+    '''Hands out the plugins of a run in dependency order. A plugin is ready as soon as all the
+       plugins of the run it depends on are completed, ready plugins keep their original order.
+    '''
+    def __init__(self, plugins: typing.Iterable[PluginSpec], loader: PluginLoader):
+        self._plugins = list(plugins)
+        names = {plugin.name for plugin in self._plugins}
+        self._dependencies = {plugin.name: loader.dependencies(plugin.name) & names for plugin in self._plugins}
+        self._inputs = {plugin.name: loader.dependencies(plugin.name, include_common=False) & names
+                        for plugin in self._plugins}
+        self._waiting = list(self._plugins)
+        self._completed: dict[str, bool] = {}  # name -> True if the plugin produced data
+
+    def __len__(self):
+        return len(self._plugins)
+
+    def __bool__(self):
+        '''True while some plugins have not been completed'''
+        return len(self._completed) < len(self._plugins)
+
+    def ready(self) -> list[PluginSpec]:
+        '''Returns the plugins whose dependencies are completed. They are only returned once.'''
+        ready = [plugin for plugin in self._waiting
+                 if all(name in self._completed for name in self._dependencies[plugin.name])]
+        for plugin in ready:
+            self._waiting.remove(plugin)
+        return ready
+
+    def has_input(self, plugin: PluginSpec) -> bool:
+        '''Derived plugins have no input when none of the plugins they depend on produced data.
+           They are then skipped, and so is everything derived from them.'''
+        return not plugin.is_derived or any(self._completed[name] for name in self._inputs[plugin.name])
+
+    def complete(self, plugin: PluginSpec, produced_data=True):
+        self._completed[plugin.name] = produced_data
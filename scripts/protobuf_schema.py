@@ -0,0 +1,328 @@
+'''Compiled decoders for the blackboxprotobuf typedefs of the artifacts.
+
+   compile_typedef() turns a typedef into a CompiledTypedef, whose messages decode the fields
+   of the typedef with a lookup of their tag in a table built once, instead of copying the
+   typedef and walking it for each message like blackboxprotobuf.decode_message() does. The
+   decoded values are the same as the ones of blackboxprotobuf: fields keyed by number or name,
+   repeated fields as lists, and the fields missing from the typedef decoded with the types
+   blackboxprotobuf would guess for them.
+
+   decode_message(buf, typedef) can be used in place of blackboxprotobuf.decode_message(), the
+   typedefs are compiled once and cached.'''
+
+import struct
+
+import blackboxprotobuf
+
+# Types of the values of each wire type of the fields missing from the typedef, None for the
+# length delimited fields which are decoded as a message if they can be, else as bytes
+WIRE_TYPE_DEFAULTS = {0: 'int', 1: 'fixed64', 2: None, 3: 'group', 4: None, 5: 'fixed32'}
+WIRE_TYPES = {
+    'uint': 0, 'int': 0, 'sint': 0,
+    'fixed32': 5, 'sfixed32': 5, 'float': 5,
+    'fixed64': 1, 'sfixed64': 1, 'double': 1,
+    'bytes': 2, 'str': 2, 'message': 2, 'group': 3,
+    'packed_uint': 2, 'packed_int': 2, 'packed_sint': 2, 'packed_fixed32': 2, 'packed_sfixed32': 2,
+    'packed_float': 2, 'packed_fixed64': 2, 'packed_sfixed64': 2, 'packed_double': 2}
+MASK_64 = (1 << 64) - 1
+SIGN_BIT_64 = 1 << 63
+
+FIXED_STRUCTS = {'fixed32': struct.Struct('<I'), 'sfixed32': struct.Struct('<i'), 'float': struct.Struct('<f'),
+                 'fixed64': struct.Struct('<Q'), 'sfixed64': struct.Struct('<q'), 'double': struct.Struct('<d')}
+
+# Compiled message typedefs by id, the compiled typedefs keep a reference to their typedef
+compiled_messages = {}
+# Typedefs passed to compile_typedef() by id, with their compiled typedef, and compiled typedefs by repr
+typedef_ids = {}
+typedef_reprs = {}
+
+class UnsupportedMessage(Exception):
+    '''Raised for the messages whose decoding by blackboxprotobuf is not reproduced, the whole
+       message is then decoded by blackboxprotobuf'''
+
+class ProtobufDecodeError(Exception):
+    pass
+
+def decode_uvarint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        result |= (b & 0x7f) << shift
+        pos += 1
+        if not b & 0x80:
+            return result & MASK_64, pos
+        shift += 7
+        if shift >= 64:
+            raise ProtobufDecodeError('Too many bytes when decoding varint.')
+
+def decode_varint(buf, pos):
+    result, pos = decode_uvarint(buf, pos)
+    return (result ^ SIGN_BIT_64) - SIGN_BIT_64, pos
+
+def decode_svarint(buf, pos):
+    result, pos = decode_uvarint(buf, pos)
+    return (result >> 1) ^ -(result & 1), pos
+
+def decode_length(buf, pos):
+    length, pos = decode_varint(buf, pos)
+    if length < 0:
+        # blackboxprotobuf goes back in the buffer
+        raise UnsupportedMessage('Negative length')
+    return length, pos
+
+def make_fixed_decoder(fixed_struct):
+    size = fixed_struct.size
+    unpack_from = fixed_struct.unpack_from
+
+    def decode_fixed(buf, pos):
+        return unpack_from(buf, pos)[0], pos + size
+    return decode_fixed
+
+def decode_bytes(buf, pos):
+    length, pos = decode_length(buf, pos)
+    end = pos + length
+    return buf[pos:end], end
+
+def decode_str(buf, pos):
+    length, pos = decode_length(buf, pos)
+    end = pos + length
+    return buf[pos:end].decode('utf-8', 'backslashreplace'), end
+
+def make_packed_decoder(decode_value):
+    def decode_packed(buf, pos):
+        length, pos = decode_length(buf, pos)
+        end = pos + length
+        values = []
+        while pos < end:
+            value, pos = decode_value(buf, pos)
+            values.append(value)
+        if pos > end:
+            raise ProtobufDecodeError('Invalid Packed Field Length')
+        return values, pos
+    return decode_packed
+
+VALUE_DECODERS = {'uint': decode_uvarint, 'int': decode_varint, 'sint': decode_svarint,
+                  'bytes': decode_bytes, 'str': decode_str}
+VALUE_DECODERS.update((field_type, make_fixed_decoder(fixed_struct)) for field_type, fixed_struct in FIXED_STRUCTS.items())
+VALUE_DECODERS.update(('packed_' + field_type, make_packed_decoder(VALUE_DECODERS[field_type]))
+                      for field_type in ('uint', 'int', 'sint') + tuple(FIXED_STRUCTS))
+
+def decode_fields(buf, pos, end, typedef, output, group=False):
+    '''Decodes the fields of a message from pos like blackboxprotobuf does, the typedef being
+       extended with the types of the fields missing from it. The typedef passed is not modified,
+       it is copied before being extended. Returns the values, the typedef and the position after
+       the message.'''
+    typedef_copied = False
+    while pos < end:
+        tag, pos = decode_uvarint(buf, pos)
+        field_number = str(tag >> 3)
+        wire_type = tag & 7
+        orig_field_number = field_number
+
+        field_typedef = typedef.get(field_number)
+        from_typedef = field_typedef is not None
+        if from_typedef:
+            field_type = field_typedef['type']
+        else:
+            field_type = WIRE_TYPE_DEFAULTS[wire_type]
+            field_typedef = {'type': field_type}
+        field_typedef_copied = not from_typedef
+
+        if field_type is None:
+            if wire_type == 2:
+                try:
+                    field_out, message_typedef, pos = decode_message_field(buf, pos, {})
+                    field_type = 'message'
+                    field_typedef['message_typedef'] = message_typedef
+                except UnsupportedMessage:
+                    raise
+                except Exception:
+                    field_out, pos = decode_bytes(buf, pos)
+                    field_type = 'bytes'
+            elif wire_type == 4:
+                if not group:
+                    raise ValueError('Found END_GROUP before START_GROUP')
+                return output, typedef, pos
+            else:
+                raise ValueError(f'Could not find default type for wiretype: {wire_type}')
+        elif field_type == 'message':
+            if 'alt_typedefs' in field_typedef or 'message_type_name' in field_typedef:
+                raise UnsupportedMessage('Alternative or named message typedef')
+            field_out = None
+            try:
+                field_out, message_typedef, pos = decode_message_field(
+                    buf, pos, field_typedef.get('message_typedef'))
+                if message_typedef is not field_typedef.get('message_typedef'):
+                    if not field_typedef_copied:
+                        field_typedef = dict(field_typedef)
+                        field_typedef_copied = True
+                    field_typedef['message_typedef'] = message_typedef
+            except UnsupportedMessage:
+                raise
+            except Exception:
+                pass
+            if field_out is None:
+                # Not a message of this typedef, decoded as a message of any type
+                field_out, message_typedef, pos = decode_message_field(buf, pos, {})
+                if not field_typedef_copied:
+                    field_typedef = dict(field_typedef)
+                    field_typedef_copied = True
+                field_typedef['alt_typedefs'] = {'1': message_typedef}
+                field_number += '-1'
+        elif field_type == 'group':
+            group_typedef = field_typedef.get('group_typedef') or {}
+            field_out, new_group_typedef, pos = decode_fields(buf, pos, len(buf), group_typedef, {}, True)
+            if new_group_typedef is not field_typedef.get('group_typedef'):
+                if not field_typedef_copied:
+                    field_typedef = dict(field_typedef)
+                    field_typedef_copied = True
+                field_typedef['group_typedef'] = new_group_typedef
+        else:
+            if WIRE_TYPES[field_type] != wire_type:
+                raise ValueError(f'Invalid wiretype for field number {field_number}. '
+                                 f'{field_type} is not wiretype {wire_type}')
+            field_out, pos = VALUE_DECODERS[field_type](buf, pos)
+
+        if field_typedef.get('type') != field_type:
+            if not field_typedef_copied:
+                field_typedef = dict(field_typedef)
+                field_typedef_copied = True
+            field_typedef['type'] = field_type
+
+        # blackboxprotobuf sets the name of the fields without one to '', it is not set here so
+        # that the typedef is only copied when a type is learnt
+        field_key = field_number
+        if '-' not in field_number and field_typedef.get('name', '') != '':
+            field_key = field_typedef['name']
+        if field_key in output:
+            if isinstance(field_out, list) or field_key != field_number:
+                raise UnsupportedMessage('Repeated packed or named field')
+            if isinstance(output[field_key], list):
+                output[field_key].append(field_out)
+            else:
+                output[field_key] = [output[field_key], field_out]
+            store_typedef = from_typedef and field_typedef_copied
+        else:
+            output[field_key] = field_out
+            store_typedef = field_typedef is not typedef.get(orig_field_number)
+        if store_typedef:
+            if not typedef_copied:
+                typedef = dict(typedef)
+                typedef_copied = True
+            typedef[orig_field_number] = field_typedef
+
+    if pos > end:
+        raise ProtobufDecodeError('Invalid Message Length')
+    if group:
+        raise ValueError('Got START_GROUP with no END_GROUP.')
+    return output, typedef, pos
+
+def decode_message_field(buf, pos, typedef):
+    '''Decodes a length delimited message with the compiled decoder of its typedef when there
+       is one'''
+    length, pos = decode_length(buf, pos)
+    compiled = compiled_messages.get(id(typedef))
+    if compiled is not None and compiled.typedef is typedef:
+        return compiled.decode_fields(buf, pos, pos + length)
+    return decode_fields(buf, pos, pos + length, typedef if typedef is not None else {}, {})
+
+class CompiledTypedef:
+    '''The fields of a message typedef by tag, with the decoder of their value. The fields of
+       the types without a decoder, the groups and the messages without message_typedef, are
+       decoded by decode_fields().'''
+    def __init__(self, typedef):
+        self.typedef = typedef
+        self.fields = {}
+        compiled_messages[id(typedef)] = self
+        for field_number, field_typedef in typedef.items():
+            if not field_number.isdigit() or not isinstance(field_typedef, dict):
+                continue
+            field_type = field_typedef.get('type')
+            name = field_typedef.get('name', '')
+            # Repeated named fields are not decoded by blackboxprotobuf like the others
+            repeatable = name == ''
+            key = field_number if repeatable else name
+            tag = (int(field_number) << 3) | WIRE_TYPES.get(field_type, 7)
+            if field_type in VALUE_DECODERS:
+                self.fields[tag] = (key, VALUE_DECODERS[field_type], None, repeatable)
+            elif (field_type == 'message' and isinstance(field_typedef.get('message_typedef'), dict)
+                  and 'alt_typedefs' not in field_typedef and 'message_type_name' not in field_typedef):
+                message_typedef = field_typedef['message_typedef']
+                nested = compiled_messages.get(id(message_typedef))
+                if nested is None or nested.typedef is not message_typedef:
+                    nested = CompiledTypedef(message_typedef)
+                self.fields[tag] = (key, None, nested, repeatable)
+
+    def decode_fields(self, buf, pos, end):
+        '''Decodes the fields of a message from pos to end. Returns the values, the typedef,
+           extended when some fields were missing from it, and the position after the message.'''
+        fields = self.fields
+        output = {}
+        while pos < end:
+            field_start = pos
+            tag = buf[pos]
+            pos += 1
+            if tag & 0x80:
+                tag, pos = decode_uvarint(buf, field_start)
+            field = fields.get(tag)
+            if field is None:
+                # A field missing from the typedef, or not of its type
+                return decode_fields(buf, field_start, end, self.typedef, output)
+            key, decode_value, nested, repeatable = field
+            try:
+                if nested is None:
+                    value, pos = decode_value(buf, pos)
+                else:
+                    length, pos = decode_length(buf, pos)
+                    value, message_typedef, pos = nested.decode_fields(buf, pos, pos + length)
+            except UnsupportedMessage:
+                raise
+            except Exception:
+                # The message of the field is decoded as a message of any type, or the error raised again
+                return decode_fields(buf, field_start, end, self.typedef, output)
+            if nested is not None and message_typedef is not nested.typedef:
+                # The next values of the field are decoded with the types learnt from this one
+                return decode_fields(buf, field_start, end, self.typedef, output)
+            if key in output:
+                previous = output[key]
+                if isinstance(value, list) or not repeatable:
+                    return decode_fields(buf, field_start, end, self.typedef, output)
+                if isinstance(previous, list):
+                    previous.append(value)
+                else:
+                    output[key] = [previous, value]
+            else:
+                output[key] = value
+        if pos > end:
+            raise ProtobufDecodeError('Invalid Message Length')
+        return output, self.typedef, pos
+
+    def decode(self, buf):
+        '''Returns the values of a message, as blackboxprotobuf.decode_message() does'''
+        try:
+            return self.decode_fields(buf, 0, len(buf))[0]
+        except Exception:
+            # Unsupported or invalid message, blackboxprotobuf decodes it or raises its error
+            return blackboxprotobuf.decode_message(buf, self.typedef)[0]
+
+def compile_typedef(typedef):
+    '''Returns the compiled decoder of a typedef. The typedefs compiled are cached by id and by
+       value, the typedef dicts created by the artifacts for each call are compiled once.'''
+    cached = typedef_ids.get(id(typedef))
+    if cached is not None and cached[0] is typedef:
+        return cached[1]
+    typedef_repr = repr(typedef)
+    compiled = typedef_reprs.get(typedef_repr)
+    if compiled is None:
+        compiled = CompiledTypedef(typedef)
+        typedef_reprs[typedef_repr] = compiled
+    # The typedef is kept so that its id is not reused by another one
+    typedef_ids[id(typedef)] = (typedef, compiled)
+    return compiled
+
+def decode_message(buf, typedef=None):
+    '''Decodes a protobuf message like blackboxprotobuf.decode_message(). Returns the values and
+       the typedef, which must not be modified.'''
+    compiled = compile_typedef(typedef if typedef is not None else {})
+    return compiled.decode(buf), compiled.typedef
@@ -1,4 +1,5 @@
 import html
+import json
 import os
 from pathlib import Path
 import shutil
@@ -64,7 +65,10 @@ def get_search_mode_categories():
 search_set = get_search_mode_categories()
 
 
-def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, casedata, profile_filename, icons, lava_only):
+def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, image_input_path, casedata, profile_filename, icons, lava_only, reused_pages=()):
+    '''Writes the sidebar and the index page, and moves the artifact pages next to them.
+       reused_pages are the (category, file name) of the pages kept from a previous run by
+       --incremental, they are already in place.'''
     control = None
     side_heading = \
         """
@@ -86,6 +90,7 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
     # Get all files
     side_list = OrderedDict() # { Category1 : [path1, path2, ..], Cat2:[..] } Dictionary containing paths as values, key=category
 
+    pages = [(category, tail, None) for category, tail in reused_pages]
     for root, dirs, files in sorted(os.walk(reportfolderbase)):
         files = sorted(files)
         for file in files:
@@ -93,42 +98,34 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
                 continue
             if file.endswith(".temphtml"):
                 fullpath = (os.path.join(root, file))
-                head, tail = os.path.split(fullpath)
-                filename = tail.replace(".temphtml", "")
                 p = Path(fullpath)
-                SectionHeader = (p.parts[-2])
-                if SectionHeader == '_elements':
-                    pass
-                else:
-                    if control != SectionHeader:
-                        control = SectionHeader
-                        side_list[SectionHeader] = []
-                        nav_list_data += side_heading.format(SectionHeader)
-                    side_list[SectionHeader].append(fullpath)
-                    icon_name = icons.get(SectionHeader, {}).get(filename, "")
-                    icon = icon_name if icon_name else get_icon_name(SectionHeader, filename)
-                    icon = icon if icon in feather_icon_names else 'alert-triangle'
-                    nav_list_data += list_item.format('', tail.replace(".temphtml", ".html").replace(" ", "_"), 
-                                                      icon, filename.replace("_", " "))
-
-    # Now that we have all the file paths, start writing the files
+                if p.parts[-2] != '_elements':
+                    pages.append((p.parts[-2], file, fullpath))
+
+    for SectionHeader, tail, fullpath in sorted(pages, key=lambda page: page[:2]):
+        filename = tail.replace(".temphtml", "")
+        if control != SectionHeader:
+            control = SectionHeader
+            side_list[SectionHeader] = []
+            nav_list_data += side_heading.format(SectionHeader)
+        if fullpath:
+            side_list[SectionHeader].append(fullpath)
+        icon_name = icons.get(SectionHeader, {}).get(filename, "")
+        icon = icon_name if icon_name else get_icon_name(SectionHeader, filename)
+        icon = icon if icon in feather_icon_names else 'alert-triangle'
+        nav_list_data += list_item.format('', tail.replace(".temphtml", ".html").replace(" ", "_"),
+                                          icon, filename.replace("_", " "))
+
+    # Now that we have all the file paths, write the sidebar shared by the artifact pages,
+    # which are already complete and only need to be moved next to it
+    with open(os.path.join(reportfolderbase, '_HTML', 'nav.js'), 'w', encoding='utf8') as f:
+        f.write(nav_js.format(json.dumps(nav_list_data)))
 
     for category, path_list in side_list.items():
         for path in path_list:
             old_filename = os.path.basename(path)
             filename = old_filename.replace(".temphtml", ".html").replace(" ", "_")
-            # search for it in nav_list_data, then mark that one as 'active' tab
-            active_nav_list_data = mark_item_active(nav_list_data, filename) + nav_bar_script
-            artifact_data = get_file_content(path)
-
-            # Now write out entire html page for artifact
-            f = open(os.path.join(reportfolderbase, '_HTML', filename), 'w', encoding='utf8')
-            artifact_data = insert_sidebar_code(artifact_data, active_nav_list_data, path)
-            f.write(artifact_data)
-            f.close()
-
-            # Now delete .temphtml
-            os.remove(path)
+            os.replace(path, os.path.join(reportfolderbase, '_HTML', filename))
             # If dir is empty, delete it
             try:
                 os.rmdir(os.path.dirname(path))
@@ -146,7 +143,9 @@ def generate_report(reportfolderbase, time_in_secs, time_HMS, extraction_type, i
         return dst
 
     try:
-        shutil.copytree(os.path.join(__location__, "_elements"), elements_folder, copy_function=copy_no_perm)
+        # The folder exists when the report of a previous run is updated by --incremental
+        shutil.copytree(os.path.join(__location__, "_elements"), elements_folder, copy_function=copy_no_perm,
+                        dirs_exist_ok=True)
     except shutil.Error:
         print("shutil reported an error. Maybe due to recursive directory copying.")
         if os.path.exists(os.path.join(elements_folder, 'MDB-Free_4.13.0')):
@@ -321,15 +320,6 @@ def generate_key_val_table_without_headings(title, data_list, agency_logo_mimety
 
     return code
 
-def insert_sidebar_code(data, sidebar_code, filename):
-    pos = data.find(body_sidebar_dynamic_data_placeholder)
-    if pos < 0:
-        logfunc(f'Error, could not find {body_sidebar_dynamic_data_placeholder} in file {filename}')
-        return data
-    else:
-        ret = data[0: pos] + sidebar_code + data[pos + len(body_sidebar_dynamic_data_placeholder):]
-        return ret
-
 def mark_item_active(data, itemname):
     '''Finds itemname in data, then marks that node as active. Return value is changed data'''
     pos = data.find(f'" href="{itemname}"')
@@ -0,0 +1,375 @@
+'''Manifest of the artifacts run in a report folder, written to _run_manifest.json. For each
+   artifact it records the hash of its module, the input files it matched with their size and
+   modification date, and the outputs it wrote. With --incremental, the artifacts whose module,
+   input files and dependencies are unchanged since the previous run in the same report folder
+   are not run again, their outputs are kept, and the outputs of the others are removed before
+   they are run.
+
+   Each artifact completed is also checkpointed to _run_manifest.journal, once its LAVA and
+   timeline data are committed. A run interrupted by a crash is resumed with --resume: the
+   artifacts it completed are kept and the outputs of the one it was running are removed.'''
+
+import hashlib
+import inspect
+import json
+import os
+import time
+
+import scripts.ilapfuncs as ilapfuncs
+import scripts.lavafuncs as lavafuncs
+
+RUN_MANIFEST_NAME = '_run_manifest.json'
+RUN_JOURNAL_NAME = '_run_manifest.journal'
+RUN_MANIFEST_VERSION = 1
+
+# Folders of the report which don't hold outputs of artifacts, relative to the report folder
+UNTRACKED_FOLDERS = ('data', '_Profiles', os.path.join('_HTML', '_Script_Logs'), os.path.join('_HTML', '_elements'))
+# Files shared by all the artifacts, their rows are removed by activity instead
+SHARED_FILES = ('tl.db', 'tl.db-wal', 'tl.db-shm', '_latlong.db', '_latlong.db-wal', '_latlong.db-shm')
+# Directories modified less than this many seconds ago are always listed again, a file added
+# in the same tick of the file system clock doesn't change their modification time
+RACY_DIRECTORY_SECONDS = 2
+
+# SHA1 of the modules of the artifacts, by module path
+source_hashes = {}
+
+def get_source_hash(plugin):
+    '''Returns the SHA1 of the module of a plugin'''
+    module_path = inspect.getfile(inspect.unwrap(plugin.method))
+    if module_path not in source_hashes:
+        with open(module_path, 'rb') as module_file:
+            source_hashes[module_path] = hashlib.sha1(module_file.read()).hexdigest()
+    return source_hashes[module_path]
+
+def get_inputs(files_found, seeker):
+    '''Returns the source path, size and modification date of the files matched by an artifact'''
+    inputs = []
+    for path in files_found:
+        file_info = seeker.file_infos.get(path)
+        try:
+            stat = os.stat(path)
+            size, modification_date = stat.st_size, stat.st_mtime
+        except OSError:
+            size = modification_date = None
+        if file_info:
+            path, modification_date = file_info.source_path, file_info.modification_date
+        inputs.append([str(path), size, modification_date])
+    inputs.sort(key=lambda values: values[0])
+    return inputs
+
+def get_page_path(report_folder_base, page):
+    '''Returns the path of an artifact page once moved next to the sidebar by generate_report()'''
+    return os.path.join(report_folder_base, '_HTML', page.replace('.temphtml', '.html').replace(' ', '_'))
+
+def remove_files(paths):
+    '''Removes files and the folders they leave empty, e.g. the folder of the data shards of a page'''
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    for folder in {os.path.dirname(path) for path in paths}:
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+
+class OutputListing:
+    '''Files written by the artifacts in the report folder. A directory is only listed again when
+       its modification time changed, i.e. when files were added to or removed from it.'''
+    def __init__(self, report_folder_base):
+        self.report_folder_base = report_folder_base
+        self.directories = {}  # relative path -> (modification time, files, subdirectories)
+
+    def get_files(self, relative_path=''):
+        '''Returns the files of the report, or of one of its folders, relative to the report folder'''
+        files = set()
+        pending = [relative_path]
+        racy_time = time.time_ns() - RACY_DIRECTORY_SECONDS * 1000000000
+        while pending:
+            relative_path = pending.pop()
+            try:
+                modification_time = os.stat(os.path.join(self.report_folder_base, relative_path)).st_mtime_ns
+            except OSError:
+                continue
+            listing = self.directories.get(relative_path)
+            if listing is None or listing[0] != modification_time or modification_time > racy_time:
+                listing = (modification_time, *self.list_directory(relative_path))
+                self.directories[relative_path] = listing
+            files.update(listing[1])
+            pending.extend(listing[2])
+        return files
+
+    def list_directory(self, relative_path):
+        files = []
+        subdirectories = []
+        with os.scandir(os.path.join(self.report_folder_base, relative_path)) as entries:
+            for entry in entries:
+                entry_path = os.path.join(relative_path, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if entry_path not in UNTRACKED_FOLDERS:
+                        subdirectories.append(entry_path)
+                elif relative_path and entry.name not in SHARED_FILES:
+                    # Files at the root are the dbs and logs of the whole run
+                    files.append(entry_path)
+        return files, subdirectories
+
+class RunManifest:
+    '''Artifacts of this run and of the previous run in the same report folder. The outputs of an
+       artifact are the changes made to the report between start_outputs() and add_outputs().'''
+    def __init__(self, report_folder_base, run_parameters, incremental=False):
+        self.report_folder_base = report_folder_base
+        self.path = os.path.join(report_folder_base, RUN_MANIFEST_NAME)
+        self.journal_path = os.path.join(report_folder_base, RUN_JOURNAL_NAME)
+        # Artifacts write Parquet exports when enabled for the run
+        self.run_parameters = dict(run_parameters, parquet_export=ilapfuncs.parquet_export)
+        self.listing = OutputListing(report_folder_base)
+        self.artifacts = {}  # plugin name -> artifact entry of this run
+        self.previous = {}  # plugin name -> artifact entry of the previous run, until removed or reused
+        self.reused = set()
+        self.inputs = {}  # plugin name -> inputs, read before the artifact is run as some modify them
+        self.reusable = False
+        self.snapshot = None
+        # Category folders of the artifacts running in worker processes, relative to the report
+        # folder. The files written in them are credited to these artifacts by their worker.
+        self.worker_folders = set()
+        if incremental:
+            self.load()
+        # The artifacts of the previous run are kept in the manifest until this run is completed,
+        # the journal records the changes made to them by this run
+        self.write(self.previous)
+        self.journal = open(self.journal_path, 'wt', encoding='utf-8')
+        if incremental:
+            if not self.reusable:
+                self.remove_previous_outputs()
+            self.recover()
+
+    def load(self):
+        '''Loads the manifest of the previous run, with the artifacts checkpointed in its journal
+           when it was interrupted'''
+        manifest = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'rt', encoding='utf-8') as manifest_file:
+                    manifest = json.load(manifest_file)
+        except (OSError, ValueError) as ex:
+            ilapfuncs.logfunc(f'Could not read the manifest of the previous run ({ex}), all artifacts are run')
+        if manifest.get('version') == RUN_MANIFEST_VERSION:
+            self.previous = manifest['artifacts']
+            self.reusable = manifest['run_parameters'] == self.run_parameters
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rt', encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        checkpoint = json.loads(line)
+                    except ValueError:
+                        # Last line of a run interrupted while writing it
+                        break
+                    if checkpoint['entry'] is None:
+                        self.previous.pop(checkpoint['name'], None)
+                    else:
+                        self.previous[checkpoint['name']] = checkpoint['entry']
+            ilapfuncs.logfunc(f'Resuming the interrupted run, {len(self.previous)} artifacts were completed')
+        if self.previous and not self.reusable:
+            ilapfuncs.logfunc('The previous run had other parameters or another iLEAPP version, all artifacts are run')
+
+    def recover(self):
+        '''Moves the pages of the artifacts of an interrupted run next to the sidebar, like
+           generate_report() does, and removes the outputs of the artifacts it did not complete'''
+        files = set()
+        tables = set()
+        media_artifacts = set()
+        timeline_activities = set()
+        kml_activities = set()
+        for entry in self.previous.values():
+            outputs = entry['outputs']
+            files.update(outputs['files'])
+            for category, page in outputs['pages']:
+                page_path = get_page_path(self.report_folder_base, page)
+                temp_path = os.path.join(self.report_folder_base, '_HTML', category, page)
+                if os.path.exists(temp_path):
+                    os.replace(temp_path, page_path)
+                files.add(os.path.relpath(page_path, self.report_folder_base))
+            tables.update(artifact['tablename'] for _, artifact in outputs['lava_artifacts'])
+            media_artifacts.add((entry['module'], entry['artifact_name']))
+            timeline_activities.update(outputs['timeline'])
+            kml_activities.update(outputs['kml'])
+
+        # Including the index page and sidebar, written again once the artifacts are run
+        remove_files([os.path.join(self.report_folder_base, path) for path in self.listing.get_files() - files])
+        lava_tables, lava_media_artifacts = lavafuncs.lava_get_artifacts()
+        lavafuncs.lava_remove_artifacts(lava_tables - tables, lava_media_artifacts - media_artifacts)
+        ilapfuncs.timeline_remove_activities(
+            self.report_folder_base, ilapfuncs.timeline_get_activities(self.report_folder_base) - timeline_activities)
+        ilapfuncs.kml_remove_activities(
+            self.report_folder_base, ilapfuncs.kml_get_activities(self.report_folder_base) - kml_activities)
+
+    def write(self, artifacts):
+        manifest = {'version': RUN_MANIFEST_VERSION, 'run_parameters': self.run_parameters,
+                    'artifacts': artifacts}
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wt', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1)
+        os.replace(temp_path, self.path)
+
+    def checkpoint(self, plugin_name, entry):
+        '''Appends the entry of an artifact to the journal, or its removal when entry is None.
+           The data of the artifact must be committed first.'''
+        self.journal.write(json.dumps({'name': plugin_name, 'entry': entry}) + '\n')
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+
+    def save(self):
+        '''Writes the manifest of the completed run'''
+        self.journal.close()
+        self.write(self.artifacts)
+        os.remove(self.journal_path)
+
+    def get_reusable(self, plugin, files_found, seeker, loader):
+        '''Returns the entry of the previous run of an artifact if its module, input files and
+           dependencies are unchanged and its outputs still exist, None if it must be run'''
+        inputs = get_inputs(files_found, seeker) if plugin.search is not None else []
+        self.inputs[plugin.name] = inputs
+        entry = self.previous.get(plugin.name)
+        if not self.reusable or entry is None or entry['status'] != 'completed':
+            return None
+        if loader.provides_common_dependency(plugin):
+            # Sets the iOS version used by the other artifacts
+            return None
+        if plugin.search is None and not plugin.depends_on:
+            # Reads the LAVA db without declaring which artifacts wrote what it reads
+            return None
+        if any(name not in self.reused for name in loader.dependencies(plugin.name, include_common=False)):
+            return None
+        if entry['source_hash'] != get_source_hash(plugin) or entry['inputs'] != inputs:
+            return None
+        outputs = entry['outputs']
+        if not all(os.path.exists(os.path.join(self.report_folder_base, path)) for path in outputs['files']):
+            return None
+        if not all(os.path.exists(get_page_path(self.report_folder_base, page)) for _, page in outputs['pages']):
+            return None
+        return entry
+
+    def reuse(self, plugin, entry):
+        '''Keeps the outputs of the previous run of an artifact and restores what it added to the
+           LAVA data, device info and icons of the run'''
+        del self.previous[plugin.name]
+        outputs = entry['outputs']
+        for category, artifact in outputs['lava_artifacts']:
+            lavafuncs.lava_data['artifacts'].setdefault(category, []).append(artifact)
+        for category, artifact in outputs['lava_only']:
+            ilapfuncs.lava_only_artifacts.setdefault(category, []).append(artifact)
+        for category, label, value_obj in outputs['identifiers']:
+            ilapfuncs.add_device_info_value(category, label, value_obj)
+        for category, name, icon in outputs['icons']:
+            ilapfuncs.icons.setdefault(category, {})[name] = icon
+        ilapfuncs.timeline_activities.update(outputs['timeline'])
+        ilapfuncs.kml_activities.update(outputs['kml'])
+        self.artifacts[plugin.name] = entry
+        self.reused.add(plugin.name)
+
+    def remove_outputs(self, plugin_name):
+        '''Removes the outputs of the previous run of an artifact, before it is run again'''
+        entry = self.previous.pop(plugin_name, None)
+        if entry is None:
+            return
+        outputs = entry['outputs']
+        paths = [os.path.join(self.report_folder_base, path) for path in outputs['files']]
+        paths.extend(get_page_path(self.report_folder_base, page) for _, page in outputs['pages'])
+        remove_files(paths)
+        table_names = [artifact['tablename'] for _, artifact in outputs['lava_artifacts'] if artifact['tablename']]
+        lavafuncs.lava_remove_artifacts(table_names, [(entry['module'], entry['artifact_name'])])
+        if outputs['timeline']:
+            ilapfuncs.timeline_remove_activities(self.report_folder_base, outputs['timeline'])
+        if outputs['kml']:
+            ilapfuncs.kml_remove_activities(self.report_folder_base, outputs['kml'])
+        self.checkpoint(plugin_name, None)
+
+    def remove_previous_outputs(self):
+        '''Removes the outputs of the artifacts of the previous run which were not part of this one'''
+        for plugin_name in list(self.previous):
+            self.remove_outputs(plugin_name)
+
+    def start_outputs(self, plugin, files_found, seeker):
+        '''Takes a snapshot of the report before the outputs of an artifact are written'''
+        lava_artifacts = lavafuncs.lava_data['artifacts']
+        self.snapshot = {
+            'plugin': plugin.name,
+            'inputs': self.inputs.pop(plugin.name) if plugin.name in self.inputs else get_inputs(files_found, seeker),
+            'files': self.listing.get_files(),
+            'lava_artifacts': {category: len(artifacts) for category, artifacts in lava_artifacts.items()},
+            'lava_only': {category: len(artifacts) for category, artifacts in ilapfuncs.lava_only_artifacts.items()},
+            'identifiers': {(category, label): len(value) if isinstance(value, list) else 1
+                            for category, values in ilapfuncs.identifiers.items() for label, value in values.items()},
+            'icons': {(category, name): icon for category, names in ilapfuncs.icons.items() for name, icon in names.items()},
+            'timeline': set(ilapfuncs.timeline_activities),
+            'kml': set(ilapfuncs.kml_activities)}
+
+    def start_worker_outputs(self, category_folder):
+        '''Called when an artifact is run in a worker process, which writes in category_folder'''
+        self.worker_folders.add(os.path.relpath(category_folder, self.report_folder_base))
+
+    def end_worker_outputs(self, category_folder):
+        '''Called when the worker process running an artifact in category_folder has returned'''
+        self.worker_folders.discard(os.path.relpath(category_folder, self.report_folder_base))
+
+    def add_outputs(self, plugin, status, produced_data, worker_files=()):
+        '''Records the outputs written by an artifact since start_outputs(). The files written by
+           the artifacts running in worker processes meanwhile are not its outputs, worker_files
+           are the files the artifact wrote itself when it was run in a worker process.'''
+        snapshot = self.snapshot
+        self.snapshot = None
+        if snapshot is None or snapshot['plugin'] != plugin.name:
+            return
+        # The data of the artifact is committed before it is checkpointed
+        ilapfuncs.wait_for_media_copies()
+        lavafuncs.lava_commit()
+        files = []
+        pages = []
+        written_files = {path for path in self.listing.get_files() - snapshot['files']
+                         if not any(path.startswith(folder + os.sep) for folder in self.worker_folders)}
+        for path in sorted(written_files.union(worker_files)):
+            if path.endswith('.temphtml'):
+                pages.append([os.path.basename(os.path.dirname(path)), os.path.basename(path)])
+            else:
+                files.append(path)
+
+        lava_artifacts = [[category, artifact]
+                          for category, artifacts in lavafuncs.lava_data['artifacts'].items()
+                          for artifact in artifacts[snapshot['lava_artifacts'].get(category, 0):]]
+        lava_only = [[category, artifact]
+                     for category, artifacts in ilapfuncs.lava_only_artifacts.items()
+                     for artifact in artifacts[snapshot['lava_only'].get(category, 0):]]
+        identifiers = []
+        for category, values in ilapfuncs.identifiers.items():
+            for label, value in values.items():
+                value_objs = value if isinstance(value, list) else [value]
+                identifiers.extend([category, label, value_obj]
+                                   for value_obj in value_objs[snapshot['identifiers'].get((category, label), 0):])
+        icons = [[category, name, icon] for category, names in ilapfuncs.icons.items() for name, icon in names.items()
+                 if snapshot['icons'].get((category, name)) != icon]
+
+        entry = {
+            'module': plugin.module_name,
+            'category': plugin.category,
+            'artifact_name': plugin.artifact_info.get('name', plugin.name),
+            'source_hash': get_source_hash(plugin),
+            'inputs': snapshot['inputs'],
+            'status': status,
+            'produced_data': produced_data,
+            'outputs': {
+                'files': files,
+                'pages': pages,
+                'lava_artifacts': lava_artifacts,
+                'lava_only': lava_only,
+                'identifiers': identifiers,
+                'icons': icons,
+                'timeline': sorted(ilapfuncs.timeline_activities - snapshot['timeline']),
+                'kml': sorted(ilapfuncs.kml_activities - snapshot['kml'])}}
+        self.artifacts[plugin.name] = entry
+        self.checkpoint(plugin.name, entry)
+
+    def get_reused_pages(self):
+        '''Returns the category and file name of the pages of the reused artifacts, which are
+           already next to the sidebar'''
+        return [page for name in self.reused for page in self.artifacts[name]['outputs']['pages']]
@@ -1,13 +1,21 @@
 import time as timex
+import bisect
+import ctypes
+import errno
 import fnmatch
+import json
 import os
+import re
+import sqlite3
 import tarfile
+import zlib
 import hashlib
+import io
 import struct
 
 from pathlib import Path
 from scripts.ilapfuncs import *
-from shutil import copyfile
+from shutil import copyfile, copyfileobj
 from zipfile import ZipFile
 
 from fnmatch import _compile_pattern
@@ -16,38 +24,348 @@ from functools import lru_cache
 from scripts.builds_ids import get_root_path_from_domain
 normcase = lru_cache(maxsize=None)(os.path.normcase)
 
+try:
+    # Optional, records seek points in .gz archives (zran) so members can be read in any order
+    import indexed_gzip
+except ImportError:
+    indexed_gzip = None
+
+# Archive members are copied in chunks of this size instead of being read in memory at once
+COPY_BUFFER_SIZE = 1024 * 1024
+# Distance between the seek points recorded by indexed_gzip in the uncompressed stream
+GZIP_SEEK_POINT_SPACING = 4 * 1024 * 1024
+
+if is_platform_linux():
+    import fcntl
+    FICLONE = 0x40049409  # from linux/fs.h
+elif is_platform_macos():
+    try:
+        _clonefile = ctypes.CDLL(None, use_errno=True).clonefile
+    except AttributeError:
+        _clonefile = None
+
+# Errors telling that the file system (or the pair of file systems) doesn't support clones
+CLONE_UNSUPPORTED_ERRORS = (errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EOPNOTSUPP, errno.ENOTSUP)
+clone_supported = True
+
+
+def clone_file(source, destination):
+    '''Copies source to destination. On copy-on-write file systems (Btrfs, XFS, APFS...) the
+       copy is a clone sharing the data blocks of the source, made without reading or writing
+       the data. Hard links are never used instead: parsers may write to the files they open
+       (e.g. SQLite checkpoints) and that would change the source files.
+    '''
+    global clone_supported
+    if clone_supported and is_platform_linux():
+        try:
+            with open(source, 'rb') as fin, open(destination, 'wb') as fout:
+                fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return destination
+        except OSError as ex:
+            if ex.errno not in CLONE_UNSUPPORTED_ERRORS:
+                raise
+            clone_supported = False
+    elif clone_supported and is_platform_macos() and _clonefile:
+        # clonefile() does not overwrite existing files
+        if os.path.lexists(destination):
+            os.remove(destination)
+        if _clonefile(os.fsencode(source), os.fsencode(destination), 0) == 0:
+            return destination
+        if ctypes.get_errno() in CLONE_UNSUPPORTED_ERRORS:
+            clone_supported = False
+    return copyfile(source, destination)
+
+
+def get_listing_cache_path():
+    '''Returns the path of the file listing cache db in the cache folder of the user'''
+    if is_platform_windows():
+        cache_folder = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif is_platform_macos():
+        cache_folder = os.path.expanduser('~/Library/Caches')
+    else:
+        cache_folder = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_folder, 'iLEAPP', 'file_listings.db')
+
+
+class FileListingCache:
+    '''Keeps the file listings built by the seekers so that later runs on the same input load
+       them instead of walking the input again. A listing is stored as zlib compressed JSON
+       columns, keyed on the seeker and the input path. It is discarded when the size or mtime
+       of the input changes, or when the validate function given to load() returns False.
+    '''
+    MAX_LISTINGS = 20  # least recently used listings above this are deleted
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or get_listing_cache_path()
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            with sqlite3.connect(self.db_path) as db:
+                db.execute('''CREATE TABLE IF NOT EXISTS listings (seeker TEXT, source TEXT, size INTEGER,
+                              mtime INTEGER, last_used REAL, columns BLOB, PRIMARY KEY (seeker, source))''')
+            db.close()
+        except (OSError, sqlite3.Error) as ex:
+            logfunc(f'File listing cache not available at {self.db_path} ' + str(ex))
+            self.db_path = None
+
+    @staticmethod
+    def _source_stat(source):
+        stat = os.stat(source)
+        return stat.st_size, stat.st_mtime_ns
+
+    def load(self, seeker, source, validate=None):
+        '''Returns the columns saved for this seeker and source, or None'''
+        if not self.db_path:
+            return None
+        source = os.path.abspath(source)
+        try:
+            size, mtime = self._source_stat(source)
+            with sqlite3.connect(self.db_path) as db:
+                row = db.execute('''SELECT columns FROM listings WHERE seeker = ? AND source = ?
+                                    AND size = ? AND mtime = ?''', (seeker, source, size, mtime)).fetchone()
+                if row:
+                    db.execute('''UPDATE listings SET last_used = ? WHERE seeker = ? AND source = ?''',
+                               (timex.time(), seeker, source))
+            db.close()
+            if not row:
+                return None
+            columns = json.loads(zlib.decompress(row[0]))
+        except (OSError, sqlite3.Error, zlib.error, ValueError) as ex:
+            logfunc(f'Could not read the file listing cache {self.db_path} ' + str(ex))
+            return None
+        if validate and not validate(columns):
+            return None
+        return columns
+
+    def save(self, seeker, source, columns):
+        if not self.db_path:
+            return
+        source = os.path.abspath(source)
+        try:
+            size, mtime = self._source_stat(source)
+            data = zlib.compress(json.dumps(columns, separators=(',', ':')).encode('utf-8'), 1)
+            with sqlite3.connect(self.db_path) as db:
+                db.execute('''INSERT OR REPLACE INTO listings (seeker, source, size, mtime, last_used, columns)
+                              VALUES (?, ?, ?, ?, ?, ?)''', (seeker, source, size, mtime, timex.time(), data))
+                db.execute('''DELETE FROM listings WHERE rowid NOT IN
+                              (SELECT rowid FROM listings ORDER BY last_used DESC LIMIT ?)''', (self.MAX_LISTINGS,))
+            db.close()
+        except (OSError, sqlite3.Error, ValueError) as ex:
+            logfunc(f'Could not write the file listing cache {self.db_path} ' + str(ex))
+
+
 class FileInfo:
     def __init__(self, source_path, creation_date, modification_date):
         self.source_path = source_path
         self.creation_date = creation_date
         self.modification_date = modification_date
 
+class FilePathIndex:
+    '''Index over a seeker's file listing, built once, so that each search pattern is
+       only matched against the paths that can satisfy its literal parts.
+
+       Paths are matched the same way the seekers always did it, i.e. the compiled
+       fnmatch pattern is run against prefix + normcase(path). The index only narrows
+       down the candidates using:
+         - a basename lookup when the last component of the pattern is a literal
+         - a basename suffix lookup when the pattern ends with a literal (*.sqlite)
+         - a basename prefix lookup on the last component having a literal head,
+           plus all paths below the matching directories (sms.db*, local/*)
+       Other patterns fall back to a full scan filtered on their longest literal.
+    '''
+    WILDCARDS = '*?['
+
+    def __init__(self, paths, prefix='root/'):
+        self.sep = os.path.normcase('/')
+        prefix = os.path.normcase(prefix)
+        self._names = [prefix + os.path.normcase(path) for path in paths]
+        self._by_basename = {}  # basename -> positions of listed paths
+        self._dirs = {}  # basename -> directories (listed or implied by a path)
+        seen_dirs = set()
+        for position, name in enumerate(self._names):
+            parent, _, basename = name.rpartition(self.sep)
+            self._by_basename.setdefault(basename, []).append(position)
+            while parent and parent not in seen_dirs:
+                seen_dirs.add(parent)
+                grand_parent, sep, dir_name = parent.rpartition(self.sep)
+                self._dirs.setdefault(dir_name, []).append(parent)
+                if not sep:
+                    break
+                parent = grand_parent
+        self._sorted_positions = sorted(range(len(self._names)), key=self._names.__getitem__)
+        self._sorted_names = [self._names[position] for position in self._sorted_positions]
+        self._sorted_basenames = sorted(self._by_basename.keys() | self._dirs.keys())
+        self._reversed_basenames = None
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _literal_head(component):
+        for index, char in enumerate(component):
+            if char in FilePathIndex.WILDCARDS:
+                return component[:index]
+        return component
+
+    @staticmethod
+    def _literal_tail(component):
+        for index in range(len(component) - 1, -1, -1):
+            if component[index] in '*?[]':
+                return component[index + 1:]
+        return component
+
+    def _basenames_starting_with(self, head):
+        start = bisect.bisect_left(self._sorted_basenames, head)
+        for index in range(start, len(self._sorted_basenames)):
+            basename = self._sorted_basenames[index]
+            if not basename.startswith(head):
+                break
+            yield basename
+
+    def _basenames_ending_with(self, tail):
+        if self._reversed_basenames is None:
+            self._reversed_basenames = sorted(basename[::-1] for basename in self._by_basename)
+        reversed_tail = tail[::-1]
+        start = bisect.bisect_left(self._reversed_basenames, reversed_tail)
+        for index in range(start, len(self._reversed_basenames)):
+            reversed_basename = self._reversed_basenames[index]
+            if not reversed_basename.startswith(reversed_tail):
+                break
+            yield reversed_basename[::-1]
+
+    def _positions_below(self, directory):
+        dir_prefix = directory + self.sep
+        start = bisect.bisect_left(self._sorted_names, dir_prefix)
+        for index in range(start, len(self._sorted_names)):
+            if not self._sorted_names[index].startswith(dir_prefix):
+                break
+            yield self._sorted_positions[index]
+
+    def _candidates(self, normalized_pattern):
+        '''Returns the positions that may match the pattern or None if a full scan is needed'''
+        components = normalized_pattern.split(self.sep)
+        last = components[-1]
+        if last and not any(char in self.WILDCARDS for char in last):
+            return self._by_basename.get(last, [])
+        tail = self._literal_tail(last)
+        if tail:
+            return [position for basename in self._basenames_ending_with(tail)
+                    for position in self._by_basename[basename]]
+        for component in reversed(components[1:]):
+            head = self._literal_head(component)
+            if head:
+                candidates = set()
+                for basename in self._basenames_starting_with(head):
+                    candidates.update(self._by_basename.get(basename, []))
+                    for directory in self._dirs.get(basename, []):
+                        candidates.update(self._positions_below(directory))
+                return candidates
+        return None
+
+    def match(self, filepattern):
+        '''Returns the positions, in listing order, of the paths matching filepattern'''
+        pat = _compile_pattern(os.path.normcase(filepattern))
+        candidates = self._candidates(os.path.normcase(filepattern))
+        if candidates is None:
+            # No anchor on a path component, use the longest literal as a cheap substring filter
+            literals = re.split(r'[*?]', re.sub(r'\[[^\]]*\]?', '*', os.path.normcase(filepattern)))
+            literal = max(literals, key=len)
+            candidates = [position for position, name in enumerate(self._names) if literal in name]
+        else:
+            candidates = sorted(candidates)
+        return [position for position in candidates if pat(self._names[position]) is not None]
+
 class FileSeekerBase:
     # This is an abstract base class
     def search(self, filepattern_to_search, return_on_first_hit=False):
         '''Returns a list of paths for files/folders that matched'''
         pass
 
+    def search_many(self, filepatterns):
+        '''Returns a dict of pattern -> list of paths for files/folders that matched'''
+        return {filepattern: self.search(filepattern) for filepattern in filepatterns}
+
     def cleanup(self):
         '''close any open handles'''
         pass
 
-class FileSeekerDir(FileSeekerBase):
-    def __init__(self, directory, data_folder):
+    def reopen(self):
+        '''Opens new handles of the source, in a forked worker process, so that it doesn't share their
+           file offsets with the main process and the other workers'''
+        pass
+
+class FileSeekerIndexed(FileSeekerBase):
+    '''Base class for seekers searching a FilePathIndex built over their file listing.
+       Subclasses set self._index and implement extract(), which copies the item at a
+       position of the listing into the data folder and returns its path (or None).
+    '''
+    def extract(self, position, force=False):
+        pass
+
+    def search(self, filepattern, return_on_first_hit=False, force=False):
+        if filepattern in self.searched and not force:
+            pathlist = self.searched[filepattern]
+            return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
+        pathlist = []
+        for position in self._index.match(filepattern):
+            data_path = self.extract(position, force)
+            if data_path is None:
+                continue
+            pathlist.append(data_path)
+            if return_on_first_hit:
+                self.searched[filepattern] = pathlist
+                return data_path
+        self.searched[filepattern] = pathlist
+        return pathlist
+
+    def search_many(self, filepatterns):
+        '''Resolves all the patterns first, then extracts each matched item once, in listing
+           order, so archives are read in a single forward pass. Results are cached the same
+           way search() caches them.'''
+        matches = {filepattern: self._index.match(filepattern)
+                   for filepattern in filepatterns if filepattern not in self.searched}
+        extracted = {}
+        for position in sorted(set().union(*matches.values())):
+            extracted[position] = self.extract(position)
+        for filepattern, positions in matches.items():
+            self.searched[filepattern] = [extracted[position] for position in positions
+                                          if extracted[position] is not None]
+        return {filepattern: self.searched[filepattern] for filepattern in filepatterns}
+
+class FileSeekerDir(FileSeekerIndexed):
+    def __init__(self, directory, data_folder, listing_cache=None):
         FileSeekerBase.__init__(self)
         self.directory = directory
         self._all_files = []
+        self._directory_mtimes = {}
         self.data_folder = data_folder
-        logfunc('Building files listing...')
-        self.build_files_list(directory)
-        logfunc(f'File listing complete - {len(self._all_files)} files')
+        cached = listing_cache.load('dir', directory, self.is_listing_current) if listing_cache else None
+        if cached:
+            self._all_files = cached['paths']
+            logfunc(f'File listing loaded from cache - {len(self._all_files)} files')
+        else:
+            logfunc('Building files listing...')
+            self.build_files_list(directory)
+            logfunc(f'File listing complete - {len(self._all_files)} files')
+            if listing_cache:
+                listing_cache.save('dir', directory, {'paths': self._all_files, 'directories': self._directory_mtimes})
+        self._index = FilePathIndex(self._all_files)
         self.searched = {}
         self.copied = {}
         self.file_infos = {}        
 
+    @staticmethod
+    def is_listing_current(columns):
+        '''A cached listing is current when none of its directories were modified, adding,
+           removing or renaming an entry updates the mtime of its directory'''
+        try:
+            return all(os.stat(directory).st_mtime_ns == mtime for directory, mtime in columns['directories'].items())
+        except OSError:
+            return False
+
     def build_files_list(self, directory):
         '''Populates all paths in directory into _all_files'''
         try:
+            self._directory_mtimes[directory] = os.stat(directory).st_mtime_ns
             files_list = os.scandir(directory)
             for item in files_list:
                 self._all_files.append(item.path)
@@ -56,59 +374,62 @@ class FileSeekerDir(FileSeekerBase):
         except Exception as ex:
             logfunc(f'Error reading {directory} ' + str(ex))
 
-    def search(self, filepattern, return_on_first_hit=False, force=False):
-        if filepattern in self.searched and not force:
-            pathlist = self.searched[filepattern]
-            return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
-        pathlist = []
-        pat = _compile_pattern( normcase(filepattern) )
-        root = normcase("root/")
-        for item in self._all_files:
-            if pat( root + normcase(item) ) is not None:
-                item_rel_path = item.replace(self.directory, '')
-                data_path = os.path.join(self.data_folder, item_rel_path[1:])
-                if is_platform_windows():
-                    data_path = data_path.replace('/', '\\')
-                if item not in self.copied or force:
-                    try:
-                        if os.path.isdir(item):
-                            pathlist.append(data_path)
-                        elif os.path.isfile(item):
-                            os.makedirs(os.path.dirname(data_path), exist_ok=True)
-                            copyfile(item, data_path)
-                            self.copied[item] = data_path
-                            creation_date = Path(item).stat().st_ctime
-                            modification_date = Path(item).stat().st_mtime
-                            file_info = FileInfo(item, creation_date, modification_date)
-                            self.file_infos[data_path] = file_info
-                        else:
-                            logfunc(f"INFO: Item '{item}' is neither a file nor a directory (e.g. symlink not followed, or broken). Skipped.")
-                    except Exception as ex:
-                        logfunc(f'Could not copy {item} to {data_path} ' + str(ex))
-                else:
-                    data_path = self.copied[item]
-                pathlist.append(data_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return data_path
-        self.searched[filepattern] = pathlist
-        return pathlist
+    def extract(self, position, force=False):
+        item = self._all_files[position]
+        if item in self.copied and not force:
+            return self.copied[item]
+        item_rel_path = item.replace(self.directory, '')
+        data_path = os.path.join(self.data_folder, item_rel_path[1:])
+        if is_platform_windows():
+            data_path = data_path.replace('/', '\\')
+        try:
+            if os.path.isdir(item):
+                pass
+            elif os.path.isfile(item):
+                os.makedirs(os.path.dirname(data_path), exist_ok=True)
+                clone_file(item, data_path)
+                self.copied[item] = data_path
+                creation_date = Path(item).stat().st_ctime
+                modification_date = Path(item).stat().st_mtime
+                file_info = FileInfo(item, creation_date, modification_date)
+                self.file_infos[data_path] = file_info
+            else:
+                logfunc(f"INFO: Item '{item}' is neither a file nor a directory (e.g. symlink not followed, or broken). Skipped.")
+        except Exception as ex:
+            logfunc(f'Could not copy {item} to {data_path} ' + str(ex))
+        return data_path
 
-class FileSeekerItunes(FileSeekerBase):
-    def __init__(self, directory, data_folder):
+class FileSeekerItunes(FileSeekerIndexed):
+    def __init__(self, directory, data_folder, listing_cache=None):
         FileSeekerBase.__init__(self)
         self.directory = directory
         self._all_files = {}
         self.files_metadata = {}
+        self._manifest_db = None
         self.data_folder = data_folder
-        logfunc('Building files listing...')
+        self.backup_type = None
         if os.path.exists(os.path.join(directory, "Manifest.db")):
-            self.build_files_list_from_manifest_db(directory)
             self.backup_type = "Manifest.db"
         elif os.path.exists(os.path.join(directory, "Manifest.mbdb")):
-            self.build_files_list_from_manifest_mbdb(directory)
             self.backup_type = "Manifest.mbdb"
-        logfunc(f'File listing complete - {len(self._all_files)} files')
+        manifest_path = os.path.join(directory, self.backup_type) if self.backup_type else None
+        cached = listing_cache.load('itunes', manifest_path) if listing_cache and manifest_path else None
+        if cached:
+            # The metadata of the files is read from Manifest.db when they are extracted
+            self._all_files = dict(zip(cached['paths'], cached['hashes']))
+            logfunc(f'File listing loaded from cache - {len(self._all_files)} files')
+        else:
+            logfunc('Building files listing...')
+            if self.backup_type == "Manifest.db":
+                self.build_files_list_from_manifest_db(directory)
+            elif self.backup_type == "Manifest.mbdb":
+                self.build_files_list_from_manifest_mbdb(directory)
+            logfunc(f'File listing complete - {len(self._all_files)} files')
+            if listing_cache and manifest_path:
+                listing_cache.save('itunes', manifest_path,
+                                   {'paths': list(self._all_files), 'hashes': list(self._all_files.values())})
+        self._relative_paths = list(self._all_files)
+        self._index = FilePathIndex(self._relative_paths, prefix='')
         self.searched = {}
         self.copied = {}
         self.file_infos = {}
@@ -140,6 +461,15 @@ class FileSeekerItunes(FileSeekerBase):
             logfunc(f'Error opening Manifest.db from {directory}, ' + str(ex))
             raise ex
 
+    def get_file_metadata(self, hash_filename):
+        '''Returns the file blob of Manifest.db for a file, read from the db when the listing was cached'''
+        if hash_filename in self.files_metadata:
+            return self.files_metadata[hash_filename]
+        if self._manifest_db is None:
+            self._manifest_db = open_sqlite_db_readonly(os.path.join(self.directory, "Manifest.db"))
+        row = self._manifest_db.execute("SELECT file FROM Files WHERE fileID = ?", (hash_filename,)).fetchone()
+        return row[0] if row else None
+
     def build_files_list_from_manifest_mbdb(self, directory):
         '''Populates paths from Manifest.mbdb files into _all_files'''
         def getint(data, offset, intsize):
@@ -203,102 +533,181 @@ class FileSeekerItunes(FileSeekerBase):
             logfunc(f'Error opening Manifest.mbdb from {directory}, ' + str(ex))
             raise ex
 
-    def search(self, filepattern, return_on_first_hit=False, force=False):
-        if filepattern in self.searched and not force:
-            pathlist = self.searched[filepattern]
-            return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
-        pathlist = []
-        matching_keys = fnmatch.filter(self._all_files, filepattern)
-        for relative_path in matching_keys:
-            hash_filename = self._all_files[relative_path]
-            if self.backup_type == "Manifest.db":
-                original_location = os.path.join(self.directory, hash_filename[:2], hash_filename)
-                metadata = get_plist_content(self.files_metadata[hash_filename])
-                creation_date = metadata.get('Birth', 0)
-                modification_date = metadata.get('LastModified', 0)
-            else:
-                original_location = os.path.join(self.directory, hash_filename)
-                # TO DO: extract creation and modification dates from manifest.mbdb
-                creation_date = 0
-                modification_date = 0
-            data_path = os.path.join(self.data_folder, sanitize_file_path(relative_path))
-            if is_platform_windows():
-                data_path = data_path.replace('/', '\\')
-            if original_location not in self.copied or force:
-                try:
-                    os.makedirs(os.path.dirname(data_path), exist_ok=True)
-                    copyfile(original_location, data_path)
-                    file_info = FileInfo(original_location, creation_date, modification_date)
-                    self.file_infos[data_path] = file_info
-                    self.copied[original_location] = data_path
-                except Exception as ex:
-                    logfunc(f'Could not copy {original_location} to {data_path} ' + str(ex))
-            else:
-                data_path = self.copied[original_location]
-            pathlist.append(data_path)
-            if return_on_first_hit:
-                self.searched[filepattern] = pathlist
-                return data_path
-        self.searched[filepattern] = pathlist
-        return pathlist
-
+    def extract(self, position, force=False):
+        relative_path = self._relative_paths[position]
+        hash_filename = self._all_files[relative_path]
+        if self.backup_type == "Manifest.db":
+            original_location = os.path.join(self.directory, hash_filename[:2], hash_filename)
+        else:
+            original_location = os.path.join(self.directory, hash_filename)
+        if original_location in self.copied and not force:
+            return self.copied[original_location]
+        if self.backup_type == "Manifest.db":
+            metadata = get_plist_content(self.get_file_metadata(hash_filename))
+            creation_date = metadata.get('Birth', 0)
+            modification_date = metadata.get('LastModified', 0)
+        else:
+            # TO DO: extract creation and modification dates from manifest.mbdb
+            creation_date = 0
+            modification_date = 0
+        data_path = os.path.join(self.data_folder, sanitize_file_path(relative_path))
+        if is_platform_windows():
+            data_path = data_path.replace('/', '\\')
+        try:
+            os.makedirs(os.path.dirname(data_path), exist_ok=True)
+            clone_file(original_location, data_path)
+            file_info = FileInfo(original_location, creation_date, modification_date)
+            self.file_infos[data_path] = file_info
+            self.copied[original_location] = data_path
+        except Exception as ex:
+            logfunc(f'Could not copy {original_location} to {data_path} ' + str(ex))
+        return data_path
 
-class FileSeekerTar(FileSeekerBase):
-    def __init__(self, tar_file_path, data_folder):
+    def cleanup(self):
+        if self._manifest_db:
+            self._manifest_db.close()
+
+    def reopen(self):
+        # The connection of the main process is not closed here, it is opened again when needed
+        self._inherited_manifest_db = self._manifest_db
+        self._manifest_db = None
+
+
+class FileSeekerTar(FileSeekerIndexed):
+    '''Seeker for tar and tar.gz archives. The member index is built in a single pass when the
+       archive is opened. search_many() then extracts the matched members in archive order, so
+       the archive is read forward only and a .gz stream is decompressed once. When indexed_gzip
+       is installed, seek points are recorded in .gz archives while they are read, so members
+       extracted later by search() don't decompress the archive from its start again.
+    '''
+    # TarInfo attributes kept in the file listing cache, enough to extract the members
+    CACHED_MEMBER_ATTRIBUTES = ('name', 'type', 'size', 'mtime', 'mode', 'linkname', 'offset', 'offset_data', 'sparse')
+
+    def __init__(self, tar_file_path, data_folder, listing_cache=None):
         FileSeekerBase.__init__(self)
+        self.tar_file_path = tar_file_path
         self.is_gzip = tar_file_path.lower().endswith('gz')
-        mode ='r:gz' if self.is_gzip else 'r'
-        self.tar_file = tarfile.open(tar_file_path, mode)
+        self.open_archive()
+        cached = listing_cache.load('tar', tar_file_path) if listing_cache else None
+        if cached:
+            self.members = [self.member_from_cache(values) for values in cached['members']]
+            logfunc(f'File listing loaded from cache - {len(self.members)} files')
+        else:
+            self.members = self.tar_file.getmembers()
+            if listing_cache:
+                listing_cache.save('tar', tar_file_path, {'members': [self.member_to_cache(member)
+                                                                      for member in self.members]})
+        self._index = FilePathIndex(member.name for member in self.members)
+        # Positions of the members by normalized name, built when a link is first extracted
+        self._member_positions = None
         self.data_folder = data_folder
         self.searched = {}
         self.copied = {}
         self.file_infos = {}
 
-    def search(self, filepattern, return_on_first_hit=False, force=False):
-        if filepattern in self.searched and not force:
-            pathlist = self.searched[filepattern]
-            return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
-        pathlist = []
-        pat = _compile_pattern( normcase(filepattern) )
-        root = normcase("root/")
-        for member in self.tar_file.getmembers():
-            if pat( root + normcase(member.name) ) is not None:
-                clean_name = sanitize_file_path(member.name)
-                full_path = os.path.join(self.data_folder, Path(clean_name))
-                if member.name not in self.copied or force:
-                    try:
-                        if member.isdir():
-                            os.makedirs(full_path, exist_ok=True)
-                        else:
-                            parent_dir = os.path.dirname(full_path)
-                            if not os.path.exists(parent_dir):
-                                os.makedirs(parent_dir)
-                            with open(full_path, "wb") as fout:
-                                fout.write(tarfile.ExFileObject(self.tar_file, member).read())
-                                fout.close()
-                                file_info = FileInfo(member.name, 0, member.mtime)
-                                self.file_infos[full_path] = file_info
-                                self.copied[member.name] = full_path
-                            os.utime(full_path, (member.mtime, member.mtime))
-                    except Exception as ex:
-                        logfunc(f'Could not write file to filesystem, path was {member.name} ' + str(ex))
-                else:
-                    full_path = self.copied[member.name]
-                pathlist.append(full_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return full_path
-        self.searched[filepattern] = pathlist
-        return pathlist
+    def open_archive(self, seek_points=None):
+        self.gzip_file = None
+        if self.is_gzip and indexed_gzip:
+            self.gzip_file = indexed_gzip.IndexedGzipFile(self.tar_file_path, spacing=GZIP_SEEK_POINT_SPACING)
+            if seek_points is not None:
+                self.gzip_file.import_index(fileobj=seek_points)
+            self.tar_file = tarfile.open(fileobj=self.gzip_file, mode='r:')
+        else:
+            mode ='r:gz' if self.is_gzip else 'r'
+            self.tar_file = tarfile.open(self.tar_file_path, mode)
+
+    def reopen(self):
+        seek_points = None
+        if self.gzip_file:
+            # The seek points recorded so far are kept, they are in memory
+            seek_points = io.BytesIO()
+            self.gzip_file.export_index(fileobj=seek_points)
+            seek_points.seek(0)
+        self.open_archive(seek_points)
+
+    @classmethod
+    def member_to_cache(cls, member):
+        values = [getattr(member, attribute) for attribute in cls.CACHED_MEMBER_ATTRIBUTES]
+        values[1] = values[1].decode('latin-1')  # type
+        return values
+
+    @classmethod
+    def member_from_cache(cls, values):
+        member = tarfile.TarInfo()
+        for attribute, value in zip(cls.CACHED_MEMBER_ATTRIBUTES, values):
+            setattr(member, attribute, value)
+        member.type = member.type.encode('latin-1')
+        if member.sparse is not None:
+            member.sparse = [tuple(block) for block in member.sparse]
+        return member
+
+    def find_link_target(self, position):
+        '''Returns the member a hard or symbolic link points to, resolved against self.members so that
+           tarfile doesn't read the whole archive to list them again. As tarfile does, a symbolic link
+           points to the last member with its target name, and a hard link to the last one before it.
+           Raises KeyError if the target is not in the archive.'''
+        if self._member_positions is None:
+            self._member_positions = {}
+            for member_position, member in enumerate(self.members):
+                self._member_positions.setdefault(os.path.normpath(member.name), []).append(member_position)
+        visited = set()
+        member = self.members[position]
+        while member.islnk() or member.issym():
+            if position in visited:
+                raise KeyError(f'link loop at {member.name!r}')
+            visited.add(position)
+            if member.issym():
+                linkname = '/'.join(filter(None, (os.path.dirname(member.name), member.linkname)))
+                positions = self._member_positions.get(os.path.normpath(linkname), [])
+            else:
+                linkname = member.linkname
+                positions = [target_position for target_position
+                             in self._member_positions.get(os.path.normpath(linkname), []) if target_position < position]
+            if not positions:
+                raise KeyError(f'linkname {linkname!r} not found')
+            position = positions[-1]
+            member = self.members[position]
+        return member
+
+    def extract(self, position, force=False):
+        member = self.members[position]
+        if member.name in self.copied and not force:
+            return self.copied[member.name]
+        clean_name = sanitize_file_path(member.name)
+        full_path = os.path.join(self.data_folder, Path(clean_name))
+        try:
+            if member.isdir():
+                os.makedirs(full_path, exist_ok=True)
+            else:
+                parent_dir = os.path.dirname(full_path)
+                if not os.path.exists(parent_dir):
+                    os.makedirs(parent_dir)
+                with open(full_path, "wb") as fout:
+                    if member.islnk() or member.issym():
+                        member_file = self.tar_file.extractfile(self.find_link_target(position))
+                    else:
+                        member_file = self.tar_file.extractfile(member)
+                    if member_file is not None:
+                        copyfileobj(member_file, fout, COPY_BUFFER_SIZE)
+                    file_info = FileInfo(member.name, 0, member.mtime)
+                    self.file_infos[full_path] = file_info
+                    self.copied[member.name] = full_path
+                os.utime(full_path, (member.mtime, member.mtime))
+        except Exception as ex:
+            logfunc(f'Could not write file to filesystem, path was {member.name} ' + str(ex))
+        return full_path
 
     def cleanup(self):
         self.tar_file.close()
+        if self.gzip_file:
+            self.gzip_file.close()
 
-class FileSeekerZip(FileSeekerBase):
+class FileSeekerZip(FileSeekerIndexed):
     def __init__(self, zip_file_path, data_folder):
         FileSeekerBase.__init__(self)
         self.zip_file = ZipFile(zip_file_path)
-        self.name_list = self.zip_file.namelist()
+        self.name_list = [member for member in self.zip_file.namelist() if not member.startswith("__MACOSX")]
+        self._index = FilePathIndex(self.name_list)
         self.data_folder = data_folder
         self.searched = {}
         self.copied = {}
@@ -326,42 +735,31 @@ class FileSeekerZip(FileSeekerBase):
                 offset += data_size
         return None, None
 
-    def search(self, filepattern, return_on_first_hit=False, force=False):
-        if filepattern in self.searched and not force:
-            pathlist = self.searched[filepattern]
-            return self.searched[filepattern][0] if return_on_first_hit and pathlist else pathlist
-        pathlist = []
-        pat = _compile_pattern( normcase(filepattern) )
-        root = normcase("root/")
-        for member in self.name_list:
-            if member.startswith("__MACOSX"):
-                continue
-            if pat( root + normcase(member) ) is not None:
-                if member not in self.copied or force:
-                    try:
-                        extracted_path = self.zip_file.extract(member, path=self.data_folder) # already replaces illegal chars with _ when exporting
-                        f = self.zip_file.getinfo(member)
-                        creation_date, modification_date = self.decode_extended_timestamp(f.extra)
-                        file_info = FileInfo(member, creation_date, modification_date)
-                        self.file_infos[extracted_path] = file_info
-                        date_time = f.date_time
-                        date_time = timex.mktime(date_time + (0, 0, -1))
-                        os.utime(extracted_path, (date_time, date_time))
-                        self.copied[member] = extracted_path
-                    except Exception as ex:
-                        logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
-                else:
-                    extracted_path = self.copied[member]
-                pathlist.append(extracted_path)
-                if return_on_first_hit:
-                    self.searched[filepattern] = pathlist
-                    return extracted_path
-        self.searched[filepattern] = pathlist
-        return pathlist
+    def extract(self, position, force=False):
+        member = self.name_list[position]
+        if member in self.copied and not force:
+            return self.copied[member]
+        try:
+            extracted_path = self.zip_file.extract(member, path=self.data_folder) # already replaces illegal chars with _ when exporting
+            f = self.zip_file.getinfo(member)
+            creation_date, modification_date = self.decode_extended_timestamp(f.extra)
+            file_info = FileInfo(member, creation_date, modification_date)
+            self.file_infos[extracted_path] = file_info
+            date_time = f.date_time
+            date_time = timex.mktime(date_time + (0, 0, -1))
+            os.utime(extracted_path, (date_time, date_time))
+            self.copied[member] = extracted_path
+        except Exception as ex:
+            logfunc(f'Could not write file to filesystem, path was {member} ' + str(ex))
+            return None
+        return extracted_path
 
     def cleanup(self):
         self.zip_file.close()
 
+    def reopen(self):
+        self.zip_file = ZipFile(self.zip_file.filename)
+
 class FileSeekerFile(FileSeekerBase):
     def __init__(self, file_path, data_folder):
         FileSeekerBase.__init__(self)
@@ -431,7 +829,7 @@ class FileSeekerFile(FileSeekerBase):
             if self.single_file_abs_path not in self.copied or force:
                 try:
                     os.makedirs(self.data_folder, exist_ok=True)
-                    copyfile(self.single_file_abs_path, dest_data_path)
+                    clone_file(self.single_file_abs_path, dest_data_path)
                     self.copied[self.single_file_abs_path] = dest_data_path
                     s = Path(self.single_file_abs_path).stat()
                     file_info_obj = FileInfo(self.single_file_abs_path, s.st_ctime, s.st_mtime)